@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 28 09:36:52 2026
+
+This module draws the annotation file (-a or --annotationfile) of contour.py,
+mapplot.py, polplot.py and panels.py. The file has one row per line:
+	text, x, y, some text
+	arrow, x1, y1, x2, y2
+	annotation, x1, y1, x2, y2, some text
+	ellipse, x, y, major axis, minor axis, position angle
+The file is parsed once into arrays, and the arrays are kept until the size or
+the modification time of the file changes, so the maps of a panel or of the
+render service (vlpyd.py) with the same file do not parse it again.
+All ellipses are drawn as one EllipseCollection and all arrows (with the arrows
+of the annotations) as one quiver, instead of one artist per row, so a file of
+cc2annotation.py with thousands of components is drawn and saved quickly.
+The texts outside the window are not drawn. The artists have the gid
+'annotation', so they can be removed and drawn again (watch.py).
+
+Usage:
+	from annotation import read_annotation, draw_annotation
+	ann = read_annotation('cta102.txt')
+	print(ann['ellipse'])
+	draw_annotation(ax, 'cta102.txt', ec='blue')
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import numpy as np
+
+# infile: ((size, mtime), annotation)
+cache = {}
+
+def read_annotation(infile):
+# {'text': (x, y) of the texts, 'label': texts, 'arrow': x1 y1 x2 y2, 'ellipse': x y major minor pa}
+	st = os.stat(infile)
+	key = (st.st_size, st.st_mtime_ns)
+	if infile in cache and cache[infile][0] == key:
+		return cache[infile][1]
+	text, label, arrow, ellipse = [], [], [], []
+	with open(infile, 'r') as f:
+		for line in f:
+			row = [col.strip() for col in line.split(',')]
+			typ = row[0]
+			args = row[1:]
+			if typ == 'text':
+				text.append(args[:2])
+				label.append(args[2])
+			elif typ == 'arrow':
+				arrow.append(args[:4])
+			elif typ == 'annotation':
+			# the text at (x2, y2) with an arrow to (x1, y1)
+				arrow.append(args[:4])
+				text.append(args[2:4])
+				label.append(args[-1])
+			elif typ == 'ellipse':
+				ellipse.append(args[:5])
+	ann = {'text': np.array(text, dtype='f8').reshape(-1, 2), 'label': label,
+		'arrow': np.array(arrow, dtype='f8').reshape(-1, 4),
+		'ellipse': np.array(ellipse, dtype='f8').reshape(-1, 5)}
+	cache[infile] = (key, ann)
+	return ann
+
+def draw_annotation(ax, infile='', win=None, ec='blue', lw=0.5):
+# win is the window of the texts, the limits of ax by default
+	if infile == '':
+		return
+	from matplotlib.collections import EllipseCollection
+	ann = read_annotation(infile)
+	e = ann['ellipse']
+	if len(e) > 0:
+		ax.add_collection(EllipseCollection(e[:,2], e[:,3], e[:,4], units='xy',
+			offsets=e[:,:2], offset_transform=ax.transData, facecolors='none',
+			edgecolors=ec, linewidths=lw, gid='annotation'), autolim=False)
+	a = ann['arrow']
+	if len(a) > 0:
+		ax.quiver(a[:,2], a[:,3], a[:,0]-a[:,2], a[:,1]-a[:,3], angles='xy',
+			scale_units='xy', scale=1, width=0.0025, headwidth=6, headlength=8,
+			headaxislength=7, color='k', gid='annotation')
+	if win == None:
+		win = ax.get_xlim() + ax.get_ylim()
+	x, y = ann['text'].T
+	inside = (x >= min(win[:2])) & (x <= max(win[:2])) & (y >= min(win[2:])) & (y <= max(win[2:]))
+	for i in np.flatnonzero(inside):
+		ax.text(x[i], y[i], ann['label'][i], gid='annotation')
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 09:31:52 2026
+
+This program is a benchmark of the imaging and table programs of vlpy.
+It makes synthetic VLBI products: images of a core-jet source (a few Gaussian
+components convolved with the beam, plus noise) of 512x512 to 16384x16384
+pixels with the headers of AIPS/Difmap images, I/Q/U images of the source,
+AIPS CC tables of 1000 to 1000000 components and uvfits files with an AN table.
+The images are written row by row, so a 16384x16384 image (1 GB) does not need
+the memory of the image. The products are made once and used by later runs.
+Every case (a program and a size) runs in a new python process, which measures
+the import time, the run time and the peak memory (maximum resident set size)
+of contour(), mapplot(), polplot(), cc2mod(), cc2tex() and prtan(), and the
+time and memory of every stage of contour(), mapplot() and polplot() (perflog.py).
+The results are appended to a history file (JSON lines, one line a case) with
+the date, git commit and host, and every case is compared with the last run of
+the same case on the same host, so a slower version is easy to find.
+You can specify the directory of data by -o or --outdir (default vlpy-bench),
+	history file by -H or --history (default <outdir>/history.jsonl),
+	programs by -t or --tools (default "contour map pol cc2mod cc2tex prtan"),
+	image sizes by -s or --sizes (default "512 2048 8192"),
+	rows of CC tables by -n or --rows (default "1000 100000 1000000"),
+	visibilities of uvfits files by -u or --nvis (default "10000 1000000"),
+	repeat times of a case by -r or --repeat (default 1, the fastest is used),
+	threshold of slower cases by -T or --threshold (default 0.1, 10%)
+A 16384x16384 image needs about 8 GB memory to plot.
+
+Installation:
+1. copy file
+	chmod a+x bench.py
+	cp bench.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	bench.py
+	bench.py -o /data/bench -t "contour map" -s "512 4096 16384" -r 3
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import json
+import time
+import getopt
+import platform
+import subprocess
+import numpy as np
+
+# 0.1 mas pixels, 1.0 x 0.5 mas beam, 0.1 mJy/beam noise
+pixel = 0.1
+beam = (1.0, 0.5, -5.0)
+noise = 1.0E-4
+# flux (Jy), x, y, fwhm (mas) and fractional polarization of the components
+comps = [(1.5, 0.0, 0.0, 0.05, 0.02), (0.3, 0.8, -0.7, 0.2, 0.08), (0.3, 1.3, -1.7, 0.4, 0.10),
+	(0.1, 2.5, -5.6, 0.8, 0.15), (0.05, 4.0, -9.0, 1.5, 0.20)]
+TOOLS = ['contour', 'map', 'pol', 'cc2mod', 'cc2tex', 'prtan']
+# map sizes, rows of CC tables and visibilities of uvfits files of the cases
+SIZES = [512, 2048, 8192]
+ROWS = [1000, 100000, 1000000]
+NVIS = [10000, 1000000]
+
+def image_header(n, stokes=1):
+	from astropy.io import fits
+	h = fits.Header()
+	h['SIMPLE'] = True
+	h['BITPIX'] = -32
+	h['NAXIS'] = 4
+	for i, size in enumerate([n, n, 1, 1]):
+		h['NAXIS%d' % (i+1)] = size
+	h['EXTEND'] = True
+	h['OBJECT'] = 'BENCH'
+	h['TELESCOP'] = 'VLBA'
+	h['DATE-OBS'] = '2020-01-01'
+	h['BUNIT'] = 'JY/BEAM'
+	axes = [('RA---SIN', n//2+1, -pixel/3.6E6, 338.15), ('DEC--SIN', n//2+1, pixel/3.6E6, 11.73),
+		('FREQ', 1, 1.0E6, 15.3E9), ('STOKES', 1, 1, stokes)]
+	for i, (ctype, crpix, cdelt, crval) in enumerate(axes):
+		h['CTYPE%d' % (i+1)] = ctype
+		h['CRPIX%d' % (i+1)] = float(crpix)
+		h['CDELT%d' % (i+1)] = cdelt
+		h['CRVAL%d' % (i+1)] = crval
+	h['BMAJ'] = beam[0] / 3.6E6
+	h['BMIN'] = beam[1] / 3.6E6
+	h['BPA'] = beam[2]
+	return h
+
+def model_rows(n, y0, y1, stokes=1):
+# Jy/beam of rows y0:y1, components convolved with the beam
+	img = np.zeros((y1-y0, n))
+	pa = np.radians(beam[2])
+	for flux, cx, cy, fwhm, m in comps:
+		bmaj, bmin = np.hypot(beam[0], fwhm), np.hypot(beam[1], fwhm)
+		peak = flux * beam[0] * beam[1] / (bmaj * bmin)
+		if stokes == 2:
+			peak *= m * np.cos(2*(0.3 + 0.1*cy))
+		elif stokes == 3:
+			peak *= m * np.sin(2*(0.3 + 0.1*cy))
+	# only the pixels within 5 fwhm
+		X = n//2 - cx/pixel
+		Y = n//2 + cy/pixel
+		r = 5 * bmaj / pixel
+		a, b = max(int(Y-r), y0), min(int(Y+r)+1, y1)
+		c, d = max(int(X-r), 0), min(int(X+r)+1, n)
+		if a >= b or c >= d:
+			continue
+		x = (n//2 - np.arange(c, d)) * pixel - cx
+		y = (np.arange(a, b)[:, None] - n//2) * pixel - cy
+		u = x*np.sin(pa) + y*np.cos(pa)
+		v = x*np.cos(pa) - y*np.sin(pa)
+		img[a-y0:b-y0, c:d] += peak * np.exp(-4*np.log(2) * ((u/bmaj)**2 + (v/bmin)**2))
+	return img
+
+def make_image(outfile, n, stokes=1, block=512):
+	from astropy.io import fits
+	rng = np.random.default_rng(n + stokes)
+	out = fits.StreamingHDU(outfile, image_header(n, stokes))
+	for y0 in range(0, n, block):
+		y1 = min(y0 + block, n)
+		img = model_rows(n, y0, y1, stokes) + rng.normal(0.0, noise, (y1-y0, n))
+		out.write(img.astype('>f4').reshape((1, 1, y1-y0, n)))
+	out.close()
+
+def make_cc(outfile, nrow):
+# point components along the jet, brighter near the core
+	from astropy.io import fits
+	rng = np.random.default_rng(nrow)
+	t = rng.exponential(2.0, nrow)
+	x = 0.45*t + rng.normal(0.0, 0.1, nrow)
+	y = -t + rng.normal(0.0, 0.1, nrow)
+	flux = 1.0E-3 * np.exp(-t)
+	x[0], y[0], flux[0] = 0.0, 0.0, 1.0
+	zero = np.zeros(nrow)
+	cols = [('FLUX', flux), ('DELTAX', -x/3.6E6), ('DELTAY', y/3.6E6), ('MAJOR AX', zero),
+		('MINOR AX', zero), ('POSANGLE', zero), ('TYPE OBJ', zero)]
+	cc = fits.BinTableHDU.from_columns([fits.Column(name, 'E', array=a) for name, a in cols],
+		name='AIPS CC')
+	fits.HDUList([fits.PrimaryHDU(header=image_header(1)), cc]).writeto(outfile, overwrite=True)
+
+def make_uvfits(outfile, nvis, nant=10, nif=4):
+	from astropy.io import fits
+	rng = np.random.default_rng(nvis)
+	pars = ['UU', 'VV', 'WW', 'BASELINE', 'DATE']
+	a1 = rng.integers(1, nant, nvis)
+	a2 = np.minimum(a1 + rng.integers(1, nant, nvis), nant)
+	pdata = [rng.normal(0, 1.0E-4, nvis) for i in range(3)] + [256.0*a1 + a2,
+		np.full(nvis, 2458849.5)]
+	vis = rng.normal(0.0, 1.0, (nvis, 1, 1, nif, 1, 4, 3)).astype(np.float32)
+	vis[..., 2] = 1.0
+	uv = fits.GroupsHDU(fits.GroupData(vis, parnames=pars, pardata=pdata, bitpix=-32))
+	names = ['BR', 'FD', 'HN', 'KP', 'LA', 'MK', 'NL', 'OV', 'PT', 'SC', 'EF', 'GB']
+	an = fits.BinTableHDU.from_columns([
+		fits.Column('ANNAME', '8A', array=[names[i % len(names)] for i in range(nant)]),
+		fits.Column('STABXYZ', '3D', array=rng.normal(0.0, 3.0E6, (nant, 3))),
+		fits.Column('NOSTA', 'J', array=np.arange(1, nant+1)),
+		fits.Column('POLCALA', '%dE' % (2*nif), array=rng.normal(0.0, 0.03, (nant, 2*nif))),
+		fits.Column('POLCALB', '%dE' % (2*nif), array=rng.normal(0.0, 0.03, (nant, 2*nif)))],
+		name='AIPS AN')
+	an.header['EXTVER'] = 1
+	fits.HDUList([uv, an]).writeto(outfile, overwrite=True)
+
+def data_files(tool, size, outdir):
+# input files of a case, made if not exist
+	if tool in ('contour', 'map', 'pol'):
+		files = [os.path.join(outdir, 'image%d.%s.fits' % (size, s)) for s in 'iqu']
+		files = files[:3] if tool == 'pol' else files[:1]
+		maker = lambda f, i: make_image(f, size, i+1)
+	elif tool in ('cc2mod', 'cc2tex'):
+		files = [os.path.join(outdir, 'cc%d.fits' % size)]
+		maker = lambda f, i: make_cc(f, size)
+	else:
+		files = [os.path.join(outdir, 'uv%d.uvf' % size)]
+		maker = lambda f, i: make_uvfits(f, size)
+	for i, f in enumerate(files):
+		if not os.path.exists(f):
+			print('Make %s' % f)
+			maker(f + '.tmp', i)
+			os.replace(f + '.tmp', f)
+	return files
+
+def peak_memory():
+# MB, VmHWM of linux is not inherited from the parent process like ru_maxrss
+	try:
+		with open('/proc/self/status', 'r') as f:
+			for line in f:
+				if line.startswith('VmHWM:'):
+					return int(line.split()[1]) / 1024
+	except OSError:
+		pass
+	import resource
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_case(tool, size, outdir):
+# run in a new process, returns the times (s) and peak memory (MB)
+	files = data_files(tool, size, outdir)
+	out = os.path.join(outdir, 'out-%s' % tool)
+	for ext in ('.png', '.mod', '.tex', '.txt', '.prof'):
+		if os.path.exists(out + ext):
+			os.remove(out + ext)
+# stages of contour(), mapplot() and polplot() by perflog.py
+	os.environ['VLPY_PROFILE'] = out + '.prof'
+	t0 = time.perf_counter()
+	if tool == 'contour':
+		from contour import contour
+		run = lambda: contour(files[0], '', out + '.png')
+	elif tool == 'map':
+		from mapplot import mapplot
+		run = lambda: mapplot(files[0], 3*noise, out + '.png')
+	elif tool == 'pol':
+		from polplot import polplot
+		run = lambda: polplot(files[0], files[1], files[2], out + '.png', 3*noise, 5*noise,
+			5*noise, inc=max(size//128, 1), scale=max(size//128, 1)*3.0)
+	elif tool == 'cc2mod':
+		from cc2mod import cc2mod
+		run = lambda: cc2mod(files[0], out + '.mod')
+	elif tool == 'cc2tex':
+		from cc2tex import cc2tex
+		run = lambda: cc2tex(files[0], out + '.tex', 'latex')
+	elif tool == 'prtan':
+		from prtan import prtan
+		run = lambda: prtan(files[0], out + '.txt')
+	t1 = time.perf_counter()
+	mem1 = peak_memory()
+	run()
+	t2 = time.perf_counter()
+	mem2 = peak_memory()
+	res = {'import': t1 - t0, 'run': t2 - t1, 'import_mb': mem1, 'peak_mb': mem2}
+	if os.path.exists(out + '.prof'):
+		from perflog import read_records
+		res['stages'] = read_records([out + '.prof'])[-1]['stages']
+	return res
+
+def sizes_of(tool, sizes, rows, nvis):
+	if tool in ('contour', 'map', 'pol'):
+		return sizes
+	if tool in ('cc2mod', 'cc2tex'):
+		return rows
+	return nvis
+
+def git_commit():
+	try:
+		return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+			text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+	except OSError:
+		return ''
+
+def read_history(history):
+	res = []
+	if os.path.exists(history):
+		with open(history, 'r') as f:
+			for line in f:
+				if line.strip() != '':
+					res.append(json.loads(line))
+	return res
+
+def bench(outdir='vlpy-bench', history='', tools=None, sizes=None, rows=None, nvis=None,
+	repeat=1, threshold=0.1):
+	if tools == None:
+		tools = list(TOOLS)
+	if sizes == None:
+		sizes = list(SIZES)
+	if rows == None:
+		rows = list(ROWS)
+	if nvis == None:
+		nvis = list(NVIS)
+	if not os.path.exists(outdir):
+		os.makedirs(outdir, exist_ok=True)
+	if history == '':
+		history = os.path.join(outdir, 'history.jsonl')
+	last = {}
+	for rec in read_history(history):
+		last[(rec['host'], rec['tool'], rec['size'])] = rec
+	info = {'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': git_commit(),
+		'host': platform.node(), 'python': platform.python_version()}
+	cases = [(tool, size) for tool in tools for size in sizes_of(tool, sizes, rows, nvis)]
+	for tool, size in cases:
+		data_files(tool, size, outdir)
+	print('%-8s %8s %8s %8s %8s  %s' % ('tool', 'size', 'import', 'run', 'peak MB', 'change'))
+	for tool, size in cases:
+		res = []
+		for i in range(repeat):
+			p = subprocess.run([sys.executable, os.path.abspath(__file__), '--case',
+				'%s %d' % (tool, size), '-o', outdir], capture_output=True, text=True,
+				env=dict(os.environ, MPLBACKEND='Agg'))
+			lines = [line for line in p.stdout.splitlines() if line.startswith('{')]
+			if p.returncode != 0 or len(lines) == 0:
+				print('%-8s %8d failed:\n%s' % (tool, size, p.stderr[-2000:]))
+				break
+			res.append(json.loads(lines[-1]))
+		if len(res) == 0:
+			continue
+		rec = dict(info)
+		rec.update({'tool': tool, 'size': size, 'repeat': len(res),
+			'import': min([r['import'] for r in res]), 'run': min([r['run'] for r in res]),
+			'import_mb': max([r['import_mb'] for r in res]),
+			'peak_mb': max([r['peak_mb'] for r in res])})
+		best = min(res, key=lambda r: r['run'])
+		if 'stages' in best:
+			rec['stages'] = best['stages']
+		change = ''
+		old = last.get((rec['host'], tool, size))
+		if old is not None:
+			ratio = rec['run'] / old['run'] - 1
+			change = '%+.0f%% since %s' % (100*ratio, old['commit'] or old['date'])
+			if ratio > threshold:
+				change += ', slower'
+		print('%-8s %8d %8.3f %8.3f %8.1f  %s' % (tool, size, rec['import'], rec['run'],
+			rec['peak_mb'], change))
+		with open(history, 'a') as f:
+			f.write(json.dumps(rec) + '\n')
+
+def myhelp():
+	print('Help: bench.py')
+	print('  or: bench.py -o <vlpy-bench> -t "<contour map pol>" -s "<512 2048 8192>" -r <3>')
+	print('  or: bench.py -t "<cc2mod cc2tex prtan>" -n "<1000 1000000>" -u "<10000>"')
+
+def main(argv):
+	outdir = 'vlpy-bench'
+	history = ''
+	tools = list(TOOLS)
+	sizes = list(SIZES)
+	rows = list(ROWS)
+	nvis = list(NVIS)
+	repeat = 1
+	threshold = 0.1
+	case = ''
+
+	try:
+		opts, args = getopt.getopt(argv, "ho:H:t:s:n:u:r:T:",
+							 ['help', 'outdir=', 'history=', 'tools=', 'sizes=', 'rows=',
+							 'nvis=', 'repeat=', 'threshold=', 'case='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-o', '--outdir'):
+			outdir = arg
+		elif opt in ('-H', '--history'):
+			history = arg
+		elif opt in ('-t', '--tools'):
+			tools = arg.split()
+		elif opt in ('-s', '--sizes'):
+			sizes = [int(s) for s in arg.split()]
+		elif opt in ('-n', '--rows'):
+			rows = [int(s) for s in arg.split()]
+		elif opt in ('-u', '--nvis'):
+			nvis = [int(s) for s in arg.split()]
+		elif opt in ('-r', '--repeat'):
+			repeat = int(arg)
+		elif opt in ('-T', '--threshold'):
+			threshold = float(arg)
+		elif opt == '--case':
+			case = arg
+	if case != '':
+	# a case in a new process, called by bench()
+		tool, size = case.split()
+		print(json.dumps(run_case(tool, int(size), outdir)))
+		return
+	for tool in tools:
+		if tool not in TOOLS:
+			print('Unknown program: %s (%s)' % (tool, ' '.join(TOOLS)))
+			sys.exit(2)
+	bench(outdir, history, tools, sizes, rows, nvis, repeat, threshold)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -8,14 +8,16 @@ Created on Tue Oct 20 22:44:01 2020
 
 import sys
 import getopt
-from astropy.coordinates import Angle
-import astropy.units as u
 import numpy as np
 from astropy.table import Table
 
-def cc2tex(infile, outfile='', dx=4.0, dy=1.0, theta=45.0, domodel=0):
+def cc2tex(infile, outfile='', dx=4.0, dy=1.0, theta=45.0, domodel=0, dbfile=''):
 	# Read AIPS CC table
-	cc = Table.read(infile, hdu=1)
+	if dbfile != '':
+		from ccdb import read_cc
+		cc = read_cc(dbfile, infile)
+	else:
+		cc = Table.read(infile, hdu=1)
 #	print(cc.columns)
 	# Change units from degree to mas
 	cc['DELTAX'] = cc['DELTAX'] * 3.6E6
@@ -29,8 +31,7 @@ def cc2tex(infile, outfile='', dx=4.0, dy=1.0, theta=45.0, domodel=0):
 	cc['r'] = np.sqrt(cc['DELTAX']**2+cc['DELTAY']**2)
 	pa = np.arctan2(cc['DELTAX'], cc['DELTAY'])
 	pa = np.degrees(pa)
-	pa = Angle(pa.data * u.deg)
-	pa.wrap_at('360d', inplace=True)
+	pa = np.mod(np.asarray(pa), 360.0)
 	#print(pa)
 	cc['pa'] = pa
 	cc.sort(['r'])
@@ -42,7 +43,7 @@ def cc2tex(infile, outfile='', dx=4.0, dy=1.0, theta=45.0, domodel=0):
 	t['x'] = cc['DELTAX'].data
 	t['y'] = cc['DELTAY'].data
 	t['r'] = cc['r'].data
-	t['pa'] = pa.degree
+	t['pa'] = pa
 	t['d'] = cc['MAJOR AX'].data
 	t['comp'][0] = 'C'
 	# set formats
@@ -77,6 +78,7 @@ def myhelp():
 	print('cc2note.py <input.fits>')
 	print('  or: cc2note.py <input.fits> <out.tex>')
 	print('  or: cc2note.py -i <input.fits> -o <out.tex>')
+	print('  or: cc2note.py -D <comps.db> -i <input.fits> -o <out.tex>')
 	
 def main(argv):
 	infile = ''
@@ -84,9 +86,10 @@ def main(argv):
 	dx, dy = 4.0, 1.0
 	theta = 45.0
 	domodel = 0
+	dbfile = ''
 	
 	try:
-		opts, args = getopt.getopt(argv, "hi:o:x:y:t:d:", ['help', 'infile=', 'outfile=', 'dx=', 'dy=', 'theta=', 'domodel='])
+		opts, args = getopt.getopt(argv, "hi:o:x:y:t:d:D:", ['help', 'infile=', 'outfile=', 'dx=', 'dy=', 'theta=', 'domodel=', 'db='])
 	except getopt.GetoptError:
 		myhelp()
 		sys.exit(2)
@@ -107,13 +110,15 @@ def main(argv):
 			theta = float(arg)
 		elif opt in ('-d', '--domodel'):
 			domodel = int(arg)
+		elif opt in ('-D', '--db'):
+			dbfile = arg
 	if len(args) == 1:
 		infile = args[0]
 	if len(args) == 2:
 		infile, outfile = args
 	if outfile == '':
 		outfile = infile.split('.')[0] + '.tex'
-	cc2tex(infile, outfile, dx, dy, theta, domodel)
+	cc2tex(infile, outfile, dx, dy, theta, domodel, dbfile)
 
 if __name__ == '__main__':
 	main(sys.argv[1:])
\ No newline at end of file
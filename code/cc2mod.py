@@ -18,6 +18,7 @@ Installation:
 Running like this:
 	cc2mod.py <input.fits> <output.mod>
 	cc2mod.py <input.fits>
+	cc2mod.py -D <comps.db> <input.fits> <output.mod>
 
 @author: Li, Xiaofeng
 Shanghai Astronomical Observatory, Chinese Academy of Sciences
@@ -25,64 +26,80 @@ E-mail: lixf@shao.ac.cn; 1650152531@qq.com
 """
 
 import sys
+import getopt
 import numpy as np
-from astropy.table import Table
+
+def myhelp():
+	print('cc2mod.py <input.fits> <output.mod>')
+	print('or : cc2mod.py <input.fits>')
+	print('or : cc2mod.py -D <comps.db> <input.fits> <output.mod>')
 
 def main(argv):
 	infile = ''
 	outfile = ''
+	dbfile = ''
+	try:
+		opts, argv = getopt.getopt(argv, "hD:", ['help', 'db='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-D', '--db'):
+			dbfile = arg
 	if len(argv) == 1:
 		infile = argv[0]
 		outfile = '%s-py.mod' % infile.split('.')[0]
 	elif len(argv) == 2:
 		infile, outfile = argv
 	else:
-		print('cc2mod.py <input.fits> <output.mod>')
-		print('or : cc2mod.py <input.fits>')
+		myhelp()
 		sys.exit(2)
 		
-	cc2mod(infile, outfile)
+	cc2mod(infile, outfile, dbfile)
    
-def cc2mod(infile, outfile=''):
-	cc = Table.read(infile, format='fits', hdu=1)
+def write_mod(outfile, cols):
+# the same as Table.write(format='ascii.no_header'), without importing astropy
+	with open(outfile, 'w') as f:
+		for row in zip(*cols):
+			f.write(' '.join([str(float(v)) for v in row]) + '\n')
+
+def cc2mod(infile, outfile='', dbfile=''):
+	if dbfile != '':
+		from ccdb import read_cc
+		cc = read_cc(dbfile, infile)
+	else:
+		from fitstab import read_table
+		cc = read_table(infile, 1)
 	type_obj = np.unique(cc['TYPE OBJ'])
+	x, y = cc['DELTAX']*3.6E6, cc['DELTAY']*3.6E6
+	r = np.sqrt(x**2+y**2)
+	theta = np.arctan2(x, y)
+	theta = np.degrees(theta)
 	if type_obj.size == 1 and type_obj[0]==0 :
 #		print('cc mode')
 		names = ('flux', 'r', 'theta')
-		x, y = cc['DELTAX']*3.6E6, cc['DELTAY']*3.6E6
-		r = np.sqrt(x**2+y**2)
-		theta = np.arctan2(x, y)
-		theta = np.degrees(theta)
-		t = Table([cc['FLUX'], r, theta], names=names)
-	elif type_obj.size == 1 and type_obj[0]== 1:
-#		print('Gaussian mod')
-		names = ('flux', 'r', 'theta', 'maj', 'ratio', 'pa', 'type')
-		x, y = cc['DELTAX']*3.6E6, cc['DELTAY']*3.6E6
-		r = np.sqrt(x**2+y**2)
-		theta = np.arctan2(x, y)
-		theta = np.degrees(theta)
-		maj = cc['MAJOR AX'] * 3.6e6
-		ratio = cc['MINOR AX'] * 3.6e6 / maj
-		t = Table([cc['FLUX'], r, theta, maj, ratio, cc['POSANGLE'], cc['TYPE OBJ']], names=names)
+		cols = [cc['FLUX'], r, theta]
 	else:
-#		print('cc+gaussian mod')
+#		print('Gaussian mod')
 		names = ('flux', 'r', 'theta', 'maj', 'ratio', 'pa', 'type')
-		x, y = cc['DELTAX']*3.6E6, cc['DELTAY']*3.6E6
-		r = np.sqrt(x**2+y**2)
-		theta = np.arctan2(x, y)
-		theta = np.degrees(theta)
 		maj = cc['MAJOR AX'] * 3.6e6
 		ratio = cc['MINOR AX'] * 3.6e6 / maj
-		t = Table([cc['FLUX'], r, theta, maj, ratio, cc['POSANGLE'], cc['TYPE OBJ']], names=names)
-		for i in range(len(t)) :
-			if t['type'][i] == 0.0 :
-				t['maj'][i] = 0.0
-				t['ratio'][i] = 0.0
-				t['pa'][i] = 0.0
+		pa = np.array(cc['POSANGLE'])
+		if type_obj.size > 1 :
+#			print('cc+gaussian mod')
+			point = np.asarray(cc['TYPE OBJ']) == 0.0
+			maj[point] = 0.0
+			ratio[point] = 0.0
+			pa[point] = 0.0
+		cols = [cc['FLUX'], r, theta, maj, ratio, pa, cc['TYPE OBJ']]
 	if len(outfile) == 0 :
-		print(t)
+		from astropy.table import Table
+		print(Table(cols, names=names))
 	else:
-		t.write(outfile, format='ascii.no_header', overwrite=True)
+		write_mod(outfile, cols)
 	
 if __name__ == '__main__' :
 	main(sys.argv[1:])
@@ -7,19 +7,21 @@ Created on Tue Oct 20 12:17:04 2020
 """
 import sys
 import getopt
-from astropy.coordinates import Angle
-import astropy.units as u
 import numpy as np
 from astropy.table import Table
 
 
-def cc2tex(infile, outfile='', fmt=''):
+def cc2tex(infile, outfile='', fmt='', dbfile=''):
 	if fmt in ['l', 'latex']:
 		fmt = 'ascii.latex'
 	elif fmt in ['a', 'aas', 'aastex']:
 		fmt = 'ascii.aastex'
 	# Read AIPS CC table
-	cc = Table.read(infile, hdu=1)
+	if dbfile != '':
+		from ccdb import read_cc
+		cc = read_cc(dbfile, infile)
+	else:
+		cc = Table.read(infile, hdu=1)
 #	print(cc.columns)
 	# Change units from degree to mas
 	cc['DELTAX'] = cc['DELTAX'] * 3.6E6
@@ -33,8 +35,7 @@ def cc2tex(infile, outfile='', fmt=''):
 	cc['r'] = np.sqrt(cc['DELTAX']**2+cc['DELTAY']**2)
 	pa = np.arctan2(cc['DELTAX'], cc['DELTAY'])
 	pa = np.degrees(pa)
-	pa = Angle(pa.data * u.deg)
-	pa.wrap_at('360d', inplace=True)
+	pa = np.mod(np.asarray(pa), 360.0)
 	#print(pa)
 	cc['pa'] = pa
 	cc.sort(['r'])
@@ -46,7 +47,7 @@ def cc2tex(infile, outfile='', fmt=''):
 	t['x'] = cc['DELTAX'].data
 	t['y'] = cc['DELTAY'].data
 	t['r'] = cc['r'].data
-	t['pa'] = pa.degree
+	t['pa'] = pa
 	t['d'] = cc['MAJOR AX'].data
 	t['comp'][0] = 'C'
 	# set formats
@@ -71,14 +72,16 @@ def myhelp():
 	print('cc2tex.py <input.fits>')
 	print('  or: cc2tex.py <input.fits> <out.tex>')
 	print('  or: cc2tex.py -f latex -i <input.fits> -o <out.tex>')
+	print('  or: cc2tex.py -D <comps.db> -i <input.fits> -o <out.tex>')
 	
 def main(argv):
 	infile = ''
 	outfile = ''
 	fmt = ''
+	dbfile = ''
 	
 	try:
-		opts, args = getopt.getopt(argv, "hi:o:f:", ['help', 'infile', 'outfile', 'format'])
+		opts, args = getopt.getopt(argv, "hi:o:f:D:", ['help', 'infile', 'outfile', 'format', 'db='])
 	except getopt.GetoptError:
 		myhelp()
 		sys.exit(2)
@@ -93,6 +96,8 @@ def main(argv):
 			outfile = arg
 		elif opt in ('-f', '--format'):
 			fmt = arg
+		elif opt in ('-D', '--db'):
+			dbfile = arg
 	if len(args) == 1:
 		infile = args[0]
 	if len(args) == 2:
@@ -101,7 +106,7 @@ def main(argv):
 		outfile = infile.split('.')[0] + '.tex'
 	if fmt == '':
 		fmt = 'ascii.latex'
-	cc2tex(infile, outfile, fmt)
+	cc2tex(infile, outfile, fmt, dbfile)
 
 if __name__ == '__main__':
 	main(sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:03:51 2026
+
+This program is use to store the model components (AIPS CC table) of many fits
+files in a local SQLite database, so that they can be queried without reading
+the fits files again. cc2tex.py, cc2mod.py, cc2annotation.py and kinematics.py
+can read the components from the database with the -D option.
+Every component is saved with source, epoch, frequency, flux, x/y, r, pa,
+size and type. x, y, r and pa are relative to the core (the first component),
+in mas and degree.
+
+Commands:
+	ingest	add fits files to the database, unchanged files are skipped
+	query	print the components selected by source, epoch, frequency, r or box
+
+Installation:
+1. copy file
+	chmod a+x ccdb.py
+	cp ccdb.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	ccdb.py ingest -D <comps.db> <file1.fits> <file2.fits> ...
+	ccdb.py query -D <comps.db> -s <source> -e "<2010 2020>" -r <2>
+	ccdb.py query -D <comps.db> -s CTA102 -b "<left right bottom top>" -o <out.txt>
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import getopt
+import sqlite3
+import numpy as np
+from astropy.io import fits
+from astropy.table import Table
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+	id INTEGER PRIMARY KEY,
+	path TEXT UNIQUE,
+	mtime REAL,
+	source TEXT,
+	epoch REAL,
+	date_obs TEXT,
+	freq REAL,
+	core_x REAL,
+	core_y REAL
+);
+CREATE TABLE IF NOT EXISTS components (
+	id INTEGER PRIMARY KEY,
+	file_id INTEGER REFERENCES files(id) ON DELETE CASCADE,
+	row INTEGER,
+	source TEXT,
+	epoch REAL,
+	freq REAL,
+	flux REAL,
+	x REAL,
+	y REAL,
+	r REAL,
+	pa REAL,
+	major REAL,
+	minor REAL,
+	posangle REAL,
+	type REAL
+);
+CREATE INDEX IF NOT EXISTS comp_file ON components(file_id, row);
+CREATE INDEX IF NOT EXISTS comp_epoch ON components(source, epoch, r);
+CREATE INDEX IF NOT EXISTS comp_r ON components(source, r, epoch);
+CREATE INDEX IF NOT EXISTS file_source ON files(source, epoch);
+'''
+
+RTREE = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS comp_box USING rtree(id, xmin, xmax, ymin, ymax);
+'''
+
+def connect(dbfile):
+	con = sqlite3.connect(dbfile)
+	con.execute('PRAGMA foreign_keys = ON')
+	con.executescript(SCHEMA)
+	try:
+		con.executescript(RTREE)
+	except sqlite3.OperationalError:
+		pass	# sqlite3 compiled without rtree, box queries use comp_epoch
+	return con
+
+def has_rtree(con):
+	row = con.execute("SELECT name FROM sqlite_master WHERE name='comp_box'").fetchone()
+	return row is not None
+
+def epoch_of(date_obs):
+	from astropy.time import Time
+	return Time(date_obs).decimalyear
+
+def read_fits(infile):
+	with fits.open(infile) as hdul:
+		h = hdul[0].header
+		cc = Table(hdul[1].data)
+	source = str(h.get('object', '')).strip()
+	date_obs = str(h.get('date-obs', '')).strip()
+	freq = h.get('crval3', 0.0)
+	return source, date_obs, freq, cc
+
+def ingest_file(con, infile, force=False):
+	path = os.path.abspath(infile)
+	mtime = os.path.getmtime(path)
+	row = con.execute('SELECT id, mtime FROM files WHERE path=?', (path,)).fetchone()
+	if row is not None:
+		if row[1] == mtime and not force:
+			return None
+		delete_file(con, row[0])
+
+	source, date_obs, freq, cc = read_fits(path)
+	epoch = epoch_of(date_obs) if date_obs != '' else np.nan
+	x = cc['DELTAX'] * 3.6E6
+	y = cc['DELTAY'] * 3.6E6
+	if len(cc) > 0:
+		core_x, core_y = float(x[0]), float(y[0])
+	else:
+	# a file without components is kept, so it is not read again
+		core_x, core_y = 0.0, 0.0
+	x, y = x - core_x, y - core_y
+	r = np.sqrt(x**2 + y**2)
+	pa = np.degrees(np.arctan2(x, y)) % 360.0
+	cur = con.execute('INSERT INTO files (path, mtime, source, epoch, date_obs, freq, core_x, core_y) '
+				   'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+				   (path, mtime, source, float(epoch), date_obs, float(freq), core_x, core_y))
+	file_id = cur.lastrowid
+	n = len(cc)
+	cols = [cc['FLUX'], x, y, r, pa, cc['MAJOR AX'] * 3.6E6, cc['MINOR AX'] * 3.6E6,
+		 cc['POSANGLE'], cc['TYPE OBJ']]
+	cols = [np.asarray(col, dtype=np.float64).tolist() for col in cols]
+	rows = zip([file_id]*n, range(n), [source]*n, [float(epoch)]*n, [float(freq)]*n, *cols)
+	con.executemany('INSERT INTO components (file_id, row, source, epoch, freq, flux, x, y, r, pa, '
+				 'major, minor, posangle, type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+	if has_rtree(con):
+		con.execute('INSERT INTO comp_box (id, xmin, xmax, ymin, ymax) '
+			  'SELECT id, x, x, y, y FROM components WHERE file_id=?', (file_id,))
+	return n
+
+def delete_file(con, file_id):
+	if has_rtree(con):
+		con.execute('DELETE FROM comp_box WHERE id IN '
+			  '(SELECT id FROM components WHERE file_id=?)', (file_id,))
+	con.execute('DELETE FROM components WHERE file_id=?', (file_id,))
+	con.execute('DELETE FROM files WHERE id=?', (file_id,))
+
+def ingest(dbfile, infiles, force=False):
+	con = connect(dbfile)
+	nfile, ncomp, nempty, nskip = 0, 0, 0, 0
+	with con:
+		for infile in infiles:
+			n = ingest_file(con, infile, force)
+			if n is None:
+			# not changed since the last ingest
+				nskip += 1
+				continue
+			nfile += 1
+			ncomp += n
+			nempty += n == 0
+	con.close()
+	print('Ingest %d files (%d without components), %d components, skip %d unchanged files'
+		% (nfile, nempty, ncomp, nskip))
+
+def read_cc(dbfile, infile):
+# return the CC table of infile in the units of the AIPS CC table (degree)
+	con = connect(dbfile)
+	path = os.path.abspath(infile)
+	if os.path.exists(path):
+		with con:
+			ingest_file(con, path)
+	rows = con.execute('SELECT c.flux, c.x + f.core_x, c.y + f.core_y, c.major, c.minor, '
+					'c.posangle, c.type FROM components c JOIN files f ON c.file_id=f.id '
+					'WHERE f.path=? ORDER BY c.row', (path,)).fetchall()
+	con.close()
+	rows = np.array(rows, dtype=np.float64).reshape(-1, 7)
+	cc = Table()
+	cc['FLUX'] = rows[:, 0]
+	cc['DELTAX'] = rows[:, 1] / 3.6E6
+	cc['DELTAY'] = rows[:, 2] / 3.6E6
+	cc['MAJOR AX'] = rows[:, 3] / 3.6E6
+	cc['MINOR AX'] = rows[:, 4] / 3.6E6
+	cc['POSANGLE'] = rows[:, 5]
+	cc['TYPE OBJ'] = rows[:, 6]
+	return cc
+
+def query(dbfile, source='', epoch=None, freq=None, rmax=None, box=None):
+	con = connect(dbfile)
+	where = []
+	pars = []
+	table = 'components c'
+	if source != '':
+		where.append('c.source=?')
+		pars.append(source)
+	if epoch is not None:
+		where.append('c.epoch BETWEEN ? AND ?')
+		pars += list(epoch)
+	if freq is not None:
+		where.append('c.freq BETWEEN ? AND ?')
+		pars += list(freq)
+	if rmax is not None:
+		where.append('c.r <= ?')
+		pars.append(rmax)
+	if box is not None:
+		x1, x2, y1, y2 = min(box[:2]), max(box[:2]), min(box[2:]), max(box[2:])
+		if has_rtree(con):
+			table += ' JOIN comp_box b ON b.id=c.id'
+			where.append('b.xmin>=? AND b.xmax<=? AND b.ymin>=? AND b.ymax<=?')
+		else:
+			where.append('c.x>=? AND c.x<=? AND c.y>=? AND c.y<=?')
+		pars += [x1, x2, y1, y2]
+	sql = ('SELECT f.path, c.row, c.source, c.epoch, c.freq, c.flux, c.x, c.y, c.r, c.pa, '
+		'c.major, c.minor, c.type FROM %s JOIN files f ON c.file_id=f.id' % table)
+	if len(where) > 0:
+		sql += ' WHERE ' + ' AND '.join(where)
+	sql += ' ORDER BY c.epoch, c.row'
+	rows = con.execute(sql, pars).fetchall()
+	con.close()
+	names = ('file', 'row', 'source', 'epoch', 'freq', 'flux', 'x', 'y', 'r', 'pa',
+		  'major', 'minor', 'type')
+	if len(rows) == 0:
+		return Table(names=names, dtype=['U1', 'i8', 'U1'] + ['f8']*10)
+	t = Table(rows=rows, names=names)
+	t['epoch'].info.format = '%.3f'
+	for col in ('flux', 'x', 'y', 'r', 'major', 'minor'):
+		t[col].info.format = '%.3f'
+	t['pa'].info.format = '%.1f'
+	return t
+
+def read_epochs(dbfile, source, freq=None, epoch=None):
+# components of every epoch in the form used by kinematics.py
+	t = query(dbfile, source, epoch=epoch, freq=freq)
+	if len(t) == 0:
+		return []
+	t.sort(['file', 'row'])
+	path = t['file'].data
+	start = np.r_[0, np.flatnonzero(path[1:] != path[:-1]) + 1, len(t)]
+	epochs = []
+	for i0, i1 in zip(start[:-1], start[1:]):
+		epochs.append((t['epoch'][i0], t['x'].data[i0:i1], t['y'].data[i0:i1],
+				 t['flux'].data[i0:i1], t['major'].data[i0:i1]))
+	return epochs
+
+def myhelp():
+	print('Help: ccdb.py ingest -D <comps.db> <file1.fits> <file2.fits> ...')
+	print('  or: ccdb.py query -D <comps.db> -s <source> -e "<2010 2020>" -r <2>')
+	print('  or: ccdb.py query -D <comps.db> -s <source> -b "<left right bottom top>" -o <out.txt>')
+
+def main(argv):
+	dbfile = 'ccdb.sqlite'
+	outfile = ''
+	source = ''
+	epoch = None
+	freq = None
+	rmax = None
+	box = None
+	force = False
+
+	if len(argv) == 0 or argv[0] not in ('ingest', 'query'):
+		myhelp()
+		sys.exit(2)
+	cmd = argv[0]
+	try:
+		opts, args = getopt.getopt(argv[1:], "hD:o:s:e:f:r:b:F",
+							 ['help', 'db=', 'outfile=', 'source=', 'epoch=', 'freq=',
+		 'rmax=', 'box=', 'force'])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-D', '--db'):
+			dbfile = arg
+		elif opt in ('-o', '--outfile'):
+			outfile = arg
+		elif opt in ('-s', '--source'):
+			source = arg
+		elif opt in ('-e', '--epoch'):
+			epoch = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-f', '--freq'):
+			freq = (np.array(arg.split(), dtype=np.float64) * 1.0E9).tolist()
+		elif opt in ('-r', '--rmax'):
+			rmax = float(arg)
+		elif opt in ('-b', '--box'):
+			box = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-F', '--force'):
+			force = True
+
+	if cmd == 'ingest':
+		ingest(dbfile, args, force)
+	else:
+		t = query(dbfile, source, epoch, freq, rmax, box)
+		if outfile == '':
+			t.pprint(max_lines=-1, max_width=-1)
+		else:
+			t.write(outfile, format='ascii.fixed_width_two_line', overwrite=True)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
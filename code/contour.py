@@ -5,11 +5,20 @@ Created on Sat Oct 17 16:24:25 2020
 
 This program is use to plot contour map from vlbi fits image.
 You can specify the input fits image by -i or --infile,
-	output file by -o or --output,
+	output file by -o or --output, many files with their dpi: "a.pdf a.png:300 a.jpg:50",
 	contour levs by -l or --levs
 	contour base by -c or --cmul
 	plot window by -w or --win
 	restore beam position by -b or --bpos
+	contour base from the local rms map by -s or --snr
+	processes of tiled contour tracing by -j or --nproc,
+	cache the contours on disk by --cache,
+	simplify the contours to a tolerance (pixels of the output) by --simplify,
+	rasterize the low contours in pdf by --raster low, dpi of the output by -d or --dpi,
+	plane of a cube by --plane "chan stokes", moment map of a cube by --moment (cube.py)
+	time and memory of every stage by --profile <file> (JSON lines, perflog.py)
+	peak memory budget (MB) by --lowmem, the image is read in strips (lowmem.py)
+	plot again when the files or the parameters (file) change by --watch <params.txt> (watch.py)
 
 Installation:
 1. copy file
@@ -25,24 +34,28 @@ Running like this:
 	contour.py <input.fits> <output.pdf>
 	contour.py <input.fits> <output.jpg>
 	contour.py -i <input.fits> -o <output.png> -c <0.001> -w "15 -15 -25 5"
+	contour.py -i <input.fits> -o <output.png> -s 3 -w "15 -15 -25 5"
+	contour.py -i <input.fits> -o <output.pdf> -d 300 --simplify 0.5 --raster low
+	contour.py -i <cube.fits> -o <output.pdf> --plane "12 0"
+	contour.py -i <cube.fits> -o <output.pdf> --moment 0
+	contour.py -i <large.fits> -o <output.pdf> --lowmem 500
+	contour.py -i <input.fits> -o <output.png> --watch <params.txt>
 
 @author: Li, Xiaofeng
 Shanghai Astronomical Observatory, Chinese Academy of Sciences
 E-mail: lixf@shao.ac.cn; 1650152531@qq.com
 """
+import os
 import sys
 import getopt
 from astropy.io import fits
-from astropy.table import Table
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.patches import Ellipse
-from skimage import measure
 
 def detect_source(img, thresh, area=500):
-	mask = np.copy(img)
-	mask[mask<thresh] = 0
-	mask[mask>=thresh] = 1
+	from skimage import measure
+	mask = img >= thresh
 	label_image = measure.label(mask, background=0, connectivity=2)
 	
 	label = -1
@@ -88,10 +101,9 @@ def create_box(bbox, pad=0.2):
 	return int(x1), int(x2), int(y1), int(y2)
 
 def calc_rms(img):
-	data = img.flatten()
-	mid = np.median(data)
-	data = data[data<mid]
-	var = 2 * np.sum((data[data<mid]-mid)**2)
+	mid = np.median(img)
+	data = img[img<mid]
+	var = 2 * np.sum((data-mid)**2)
 	rms = np.sqrt(var/(data.size-1))
 	return rms
 
@@ -108,6 +120,7 @@ def add_beam(ax, win, h, bpos=None, pad=1.5):
 	
 def annotate(ax, notefile=''):
 	if notefile != '':
+		from astropy.table import Table
 		tab = Table.read(notefile, format='csv')
 		for t in tab:
 			ax.text(t['x'], t['y'], t['text'])
@@ -118,32 +131,9 @@ def add_default_annotation(ax, h):
 	ax.annotate('%s' % h['date-obs'], xy=(0.83, 0.12), xycoords='figure fraction')
 
 def add_annotation(ax, infile=''):
-	if infile == '':
-		return
-	
-	with open(infile, 'r') as f:
-		for line in f.readlines():
-			row = line.split(',')
-			row = [col.strip() for col in row]
-			typ = row[0]
-			args = row[1:]
-			if typ == 'text':
-				x, y, text = args
-				x, y = float(x), float(y)
-				ax.text(x, y, text)
-			elif typ == 'arrow':
-				x1, y1, x2, y2 = np.array(args, dtype='f4')
-				ax.annotate("", xy=(x1, y1), xytext=(x2, y2), 
-				arrowprops=dict(arrowstyle="->", connectionstyle="arc3"))
-			elif typ == 'annotation':
-				x1, y1, x2, y2 = np.array(args[:-1], dtype='f4')
-				text = args[-1]
-				ax.annotate(text, xy=(x1, y1), xytext=(x2, y2),
-				 arrowprops=dict(arrowstyle="->", connectionstyle="arc3"))
-			elif typ == 'ellipse':
-				x, y, majax, minax, pa = np.array(args, dtype='f4')
-				e = Ellipse((x,y), majax, minax, angle=pa, lw=0.5, fc='none', ec='blue')
-				ax.add_artist(e)
+# all ellipses and arrows in two collections, the texts in the window (annotation.py)
+	from annotation import draw_annotation
+	draw_annotation(ax, infile, ec='blue')
 
 def set_axis(ax, w):
 	ax.set_aspect('equal')
@@ -179,23 +169,51 @@ def pix2world(W, h):
 	return w
 
 def savefig(outfile, dpi=100):
-	if outfile.lower().endswith('.pdf') :
-		plt.savefig(outfile)
-	elif outfile.lower().endswith('.jpg') or outfile.lower().endswith('.jpeg'):
-		plt.savefig(outfile, dpi=dpi)
-	elif outfile.lower().endswith('.png'):
-		plt.savefig(outfile, dpi=dpi)
-	
-def contour(infile, cmul, outfile='', win=None, levs=None, bpos=None, figsize=None, annotationfile=''):
-	hdul = fits.open(infile)
-	h = hdul[0].header
-	img = hdul[0].data[0, 0, :, :]
+# outfile can be many files with their dpi, e.g. "a.pdf a.png:300 a.jpg:50"
+	from multisave import save_all
+	save_all(plt.gcf(), outfile, dpi)
+
+def contour(infile, cmul, outfile='', win=None, levs=None, bpos=None, figsize=None, annotationfile='', snr=None, nproc=None, cache=False, dpi=100, simplify=0.0, raster=None, plane=(0, 0), moment=None, profile='', lowmem=None):
+	if raster == None:
+		raster = []
+	from perflog import get_profile
+	prof = get_profile('contour', infile, profile)
+	prof.stage('read')
+	if moment != None:
+		from cube import moments
+		infile = moments(infile, [moment])[0]
+		plane = (0, 0)
+	budget = None
+	if lowmem != None or os.environ.get('VLPY_MEMORY', '') != '':
+		from lowmem import get_budget, check_budget, Plane, window_shape, min_factor, read_window, \
+			median as lowmem_median, calc_rms as lowmem_rms, detect_source as lowmem_detect
+		budget = get_budget(lowmem)
+	if budget != None:
+	# low memory mode, the image is read in strips
+		p = Plane(infile, plane, budget)
+		h = p.header
+		if snr != None:
+			from noisemap import local_rms
+			rp = Plane(local_rms(infile), budget=budget)
+		prof.set(shape=(p.ny, p.nx), budget=budget)
+	else:
+		hdul = fits.open(infile)
+		h = hdul[0].header
+		img = hdul[0].data[plane[1], plane[0], :, :]
+		if snr != None:
+			from noisemap import read_rms
+			rms = read_rms(infile)
+		prof.set(shape=img.shape)
 	
+	prof.stage('rms')
 	if type(cmul) == str:
 		if cmul != '':
 			cmul = float(cmul)
+		elif snr != None:
+			cmul = snr * (lowmem_median(rp) if budget != None else np.median(rms))
+			print('Set cmul = %.2f mJy/beam' % (cmul*1000))
 		else:
-			cmul = 3 * calc_rms(img)
+			cmul = 3 * (lowmem_rms(p) if budget != None else calc_rms(img))
 			print('Set cmul = %.2f mJy/beam' % (cmul*1000))
 	if levs==None:
 		levs = cmul*np.array([-1,1,2,4,8,16,32,64,128,256,512,1024,2048,4096])
@@ -204,7 +222,11 @@ def contour(infile, cmul, outfile='', win=None, levs=None, bpos=None, figsize=No
 		figsize = (6, 6)
 	
 	if win == None:
-		label_image, bbox = detect_source(img, cmul)
+		prof.stage('detect')
+		if budget != None:
+			bbox = lowmem_detect(p, cmul)
+		else:
+			label_image, bbox = detect_source(img, cmul)
 		W = create_box(bbox, 0.15)
 		win = pix2world(W, h)
 		print('Set win = %.1f %.1f %.1f %.1f' % tuple(win))
@@ -213,6 +235,7 @@ def contour(infile, cmul, outfile='', win=None, levs=None, bpos=None, figsize=No
 	else:
 		W = world2pix(win, h)
 	
+	prof.stage('figure')
 	fig, ax = plt.subplots()
 	fig.set_size_inches(figsize)
 	set_axis(ax, win)
@@ -221,18 +244,60 @@ def contour(infile, cmul, outfile='', win=None, levs=None, bpos=None, figsize=No
 		add_default_annotation(ax, h)
 	else:
 		add_annotation(ax, annotationfile)
-	ax.contour(img[W[2]:W[3], W[0]:W[1]], levs, extent=win, 
+	prof.stage('contour')
+	if budget != None:
+	# the window reduced by g x g blocks if it is too big for the budget
+		from mapplot import reduce_extent
+		shape = window_shape(p, W)
+		g = min_factor(p, shape, 48)
+		if g > 1:
+			print('Low memory: reduce the image by %d x %d blocks' % (g, g))
+		cimg = read_window(p, W, g)
+		extent = reduce_extent(win, shape, g)
+		if snr != None:
+			rms = read_window(rp, W, g)
+			cimg = np.ma.masked_where(np.abs(cimg) < snr*rms, cimg)
+	else:
+		g = 1
+		cimg = img[W[2]:W[3], W[0]:W[1]]
+		extent = win
+		if snr != None:
+		# hide the contours where the image is below snr times of the local rms
+			cimg = np.ma.masked_where(np.abs(cimg) < snr*rms[W[2]:W[3], W[0]:W[1]], cimg)
+	if nproc != None or cache or simplify > 0.0 or 'low' in raster:
+		from ctrace import contour as tcontour
+		key = (infile, W, 'snr %s g %d plane %d %d' % (snr, g, plane[0], plane[1])) if cache else None
+		from multisave import max_dpi
+		tcontour(ax, cimg, levs, extent, nproc=nproc, cache=key, tol=simplify, dpi=max_dpi(outfile, dpi),
+			rasterlow='low' in raster, linewidths=0.5, colors='k')
+	else:
+		ax.contour(cimg, levs, extent=extent, 
 			linewidths=0.5, colors='k')
+	prof.stage('layout')
 	fig.tight_layout(pad=0.5)
 	if outfile != '':
-		savefig(outfile)
-	hdul.close()
+		prof.stage('save')
+		savefig(outfile, dpi)
+	if budget != None:
+		check_budget(budget)
+	else:
+		hdul.close()
+	prof.close()
+	return fig, ax
 
 def myhelp():
 	print('Error: coutour.py <test.fits> <cmul>')
 	print('  or: coutour.py <test.fits> <out.pdf> <cmul>')
 	print('  or: coutour.py <test.fits> <out.pdf> <cmul> <win>')
 	print('  or: coutour.py -i <test.fits> -o <out.pdf> -c <0.002> -w "left right bottom top"')
+	print('  or: coutour.py -i <test.fits> -o <out.pdf> -s <3> -w "left right bottom top"')
+	print('  or: coutour.py -i <test.fits> -o <out.pdf> -c <0.002> -j <8> --cache')
+	print('  or: coutour.py -i <test.fits> -o <out.pdf> -d <300> --simplify <0.5> --raster low')
+	print('  or: coutour.py -i <cube.fits> -o <out.pdf> --plane "<chan> <stokes>"')
+	print('  or: coutour.py -i <cube.fits> -o <out.pdf> --moment <0>')
+	print('  or: coutour.py -i <cube.fits> -o <out.pdf> --profile <prof.jsonl>')
+	print('  or: coutour.py -i <large.fits> -o <out.pdf> --lowmem <500>')
+	print('  or: coutour.py -i <test.fits> -o <out.png> --watch <params.txt>')
 
 def main(argv):
 #	infile = r'3c66a-calib/circe-beam.fits'
@@ -244,10 +309,21 @@ def main(argv):
 	levs = None
 	bpos = None
 	figsize = None
+	snr = None
+	nproc = None
+	cache = False
+	dpi = 100
+	simplify = 0.0
+	raster = []
+	plane = (0, 0)
+	moment = None
+	profile = ''
+	lowmem = None
+	watchfile = ''
 
 	try:
-		opts, args = getopt.getopt(argv, "hi:c:o:w:l:b:f:a:", 
-							 ['help', 'infile', 'cmul', 'outfile', 'win', 'bpos', 'figsize', 'annotationfile', 'levs'])
+		opts, args = getopt.getopt(argv, "hi:c:o:w:l:b:f:a:s:j:d:", 
+							 ['help', 'infile', 'cmul', 'outfile', 'win', 'bpos', 'figsize', 'annotationfile', 'levs', 'snr=', 'nproc=', 'cache', 'dpi=', 'simplify=', 'raster=', 'plane=', 'moment=', 'profile=', 'lowmem=', 'watch='])
 	except getopt.GetoptError:
 		myhelp()
 		sys.exit(2)
@@ -271,6 +347,28 @@ def main(argv):
 			figsize = np.array(arg.split(), dtype=np.float64).tolist()
 		elif opt in ('-a', '--annotationfile'):
 			annotationfile = arg
+		elif opt in ('-s', '--snr'):
+			snr = float(arg)
+		elif opt in ('-j', '--nproc'):
+			nproc = int(arg)
+		elif opt in ('--cache', ):
+			cache = True
+		elif opt in ('-d', '--dpi'):
+			dpi = int(arg)
+		elif opt in ('--simplify', ):
+			simplify = float(arg)
+		elif opt in ('--raster', ):
+			raster = arg.split()
+		elif opt in ('--plane', ):
+			plane = tuple((list(map(int, arg.split())) + [0])[:2])
+		elif opt in ('--moment', ):
+			moment = int(arg)
+		elif opt in ('--profile', ):
+			profile = arg
+		elif opt in ('--lowmem', ):
+			lowmem = float(arg)
+		elif opt in ('--watch', ):
+			watchfile = arg
 	if infile=='' and len(args)==1:
 		infile = args[0]
 	if infile=='' and len(args)==2:
@@ -282,7 +380,12 @@ def main(argv):
 #	cmul = float(cmul)
 	if type(win) == str:
 		win = np.array(win.split(), dtype=np.float64).tolist()
-	contour(infile, cmul, outfile=outfile, win=win, levs=levs, bpos=bpos, figsize=figsize, annotationfile=annotationfile)
+	kw = dict(infile=infile, cmul=cmul, outfile=outfile, win=win, levs=levs, bpos=bpos, figsize=figsize, annotationfile=annotationfile, snr=snr, nproc=nproc, cache=cache, dpi=dpi, simplify=simplify, raster=raster, plane=plane, moment=moment, profile=profile, lowmem=lowmem)
+	if watchfile != '':
+		from watch import watch
+		watch('contour', kw, watchfile)
+	else:
+		contour(**kw)
 
 if __name__ == '__main__' :
 	main(sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 10:22:13 2026
+
+This module is use to trace the contours of very large maps in parallel.
+The image is split into tiles which share one row or column of pixels with their
+neighbours, the contours of all levels are traced in every tile by a pool of
+processes (marching squares), and the pieces are joined at the tile seams.
+Because the squares on a seam are the same in both tiles, the joined contours
+are the same as the contours traced on the whole image.
+The contours of every level are drawn as one compound path, negative levels
+are dashed as ax.contour does.
+The traced paths can be cached on disk, keyed by the checksum of the fits file,
+the window and the levels, so the contours are read back instead of traced again
+when a map is plotted with other annotations, colormap or figsize. The cache
+directory is ~/.cache/vlpy/contours (or $VLPY_CACHE), and the oldest used files
+are removed when it is bigger than $VLPY_CACHE_SIZE (MB, default 1024).
+The paths can be simplified to a tolerance in pixels of the output, and the
+low levels can be rasterized in vector output (pdf).
+contour.py, mapplot.py and polplot.py use this module with -j or --nproc,
+the cache with --cache, the simplification with --simplify and the
+rasterization with --raster.
+
+Usage:
+	from ctrace import trace, draw, cached_trace
+	paths = trace(img, levs, nproc=8)
+	draw(ax, paths, levs, win, img.shape, colors='k', linewidths=0.5)
+	paths = cached_trace(infile, W, img, levs, nproc=8)
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+from multiprocessing import Pool
+
+def trace_tile(args):
+# contourpy (the marching squares of matplotlib) returns x (column) and y (row)
+	img, mask, levs, r0, c0 = args
+	import contourpy
+	if mask is not None:
+		img = np.ma.array(img, mask=~mask)
+	gen = contourpy.contour_generator(z=img, line_type='Separate')
+	res = []
+	for k, lev in enumerate(levs):
+		for p in gen.lines(lev):
+			res.append((k, p[:, ::-1] + (r0, c0)))
+	return res
+
+def split(shape, tile):
+	tiles = []
+	for r0 in range(0, max(shape[0]-1, 1), tile):
+		for c0 in range(0, max(shape[1]-1, 1), tile):
+			tiles.append((r0, min(r0+tile, shape[0]-1), c0, min(c0+tile, shape[1]-1)))
+	return tiles
+
+def stitch(segs, ndigit=6):
+# join the pieces of a level whose end points are the same
+	ends = {}
+	keys = []
+	for i, p in enumerate(segs):
+		a = tuple(np.round(p[0], ndigit))
+		b = tuple(np.round(p[-1], ndigit))
+		keys.append((a, b))
+		if a == b:
+			continue
+		ends.setdefault(a, []).append(i)
+		ends.setdefault(b, []).append(i)
+	used = np.zeros(len(segs), dtype=bool)
+
+	def next_piece(key):
+		for j in ends.get(key, []):
+			if not used[j]:
+				return j
+		return None
+
+	paths = []
+	for i in range(len(segs)):
+		if used[i]:
+			continue
+		if keys[i][0] == keys[i][1]:
+			paths.append(segs[i])
+			continue
+		used[i] = True
+		chain = [segs[i]]
+		head, tail = keys[i]
+		while tail != head:
+			j = next_piece(tail)
+			if j is None:
+				break
+			used[j] = True
+			p = segs[j] if keys[j][0] == tail else segs[j][::-1]
+			chain.append(p[1:])
+			tail = tuple(np.round(p[-1], ndigit))
+		while tail != head:
+			j = next_piece(head)
+			if j is None:
+				break
+			used[j] = True
+			p = segs[j] if keys[j][1] == head else segs[j][::-1]
+			chain.insert(0, p[:-1])
+			head = tuple(np.round(p[0], ndigit))
+		paths.append(np.concatenate(chain))
+	return paths
+
+def trace(img, levs, nproc=1, tile=1024):
+# contours of all levels, a list of (level index, (N, 2) array of row and column)
+	mask = None
+	if np.ma.isMaskedArray(img):
+		mask = ~np.ma.getmaskarray(img)
+		img = np.ma.getdata(img)
+	if not np.all(np.isfinite(img)):
+		good = np.isfinite(img)
+		mask = good if mask is None else mask & good
+		img = np.where(good, img, 0.0)
+	if nproc is None:
+		nproc = 1
+	elif nproc < 1:
+		nproc = os.cpu_count()
+	if nproc == 1 and tile >= max(img.shape):
+		tiles = [(0, img.shape[0]-1, 0, img.shape[1]-1)]
+	else:
+		tile = min(tile, max(64, int(np.ceil(max(img.shape) / np.sqrt(4*nproc)))))
+		tiles = split(img.shape, tile)
+	jobs = []
+	for r0, r1, c0, c1 in tiles:
+		m = None if mask is None else mask[r0:r1+1, c0:c1+1]
+		jobs.append((img[r0:r1+1, c0:c1+1], m, levs, r0, c0))
+	if nproc > 1 and len(jobs) > 1:
+		with Pool(min(nproc, len(jobs))) as pool:
+			res = pool.map(trace_tile, jobs)
+	else:
+		res = [trace_tile(job) for job in jobs]
+	pieces = [[] for lev in levs]
+	for r in res:
+		for k, p in r:
+			pieces[k].append(p)
+	paths = []
+	for k in range(len(levs)):
+		if len(tiles) > 1:
+			joined = stitch(pieces[k])
+		else:
+			joined = pieces[k]
+		paths += [(k, p) for p in joined]
+	return paths
+
+def to_world(paths, extent, shape):
+# the same coordinates as ax.contour(img, extent=extent)
+	x0, x1, y0, y1 = extent
+	sx = (x1 - x0) / max(shape[1] - 1, 1)
+	sy = (y1 - y0) / max(shape[0] - 1, 1)
+	return [(k, np.c_[x0 + p[:, 1]*sx, y0 + p[:, 0]*sy]) for k, p in paths]
+
+def simplify(paths, tol):
+# drop the vertices closer than tol (pixels of img) to the last kept vertex along the
+# path, so the simplified path is within tol of the traced one. The paths smaller than
+# tol are dropped. Returns the paths and the number of dropped vertices.
+	if tol <= 0.0 or len(paths) == 0:
+		return paths, 0
+	n = np.array([len(p) for k, p in paths])
+	start = np.concatenate([[0], np.cumsum(n)[:-1]])
+	rc = np.concatenate([p for k, p in paths])
+	d = np.concatenate([[0.0], np.hypot(*np.diff(rc, axis=0).T)])
+	d[start] = 0.0
+	s = np.cumsum(d)
+	s -= np.repeat(s[start], n)
+	b = np.floor(s / tol)
+	keep = np.concatenate([[True], b[1:] != b[:-1]])
+	keep[start] = True
+	keep[start + n - 1] = True
+	size = np.max(np.maximum.reduceat(rc, start) - np.minimum.reduceat(rc, start), axis=1)
+	keep[np.repeat(size < tol, n)] = False
+	idx = np.repeat(np.arange(len(paths)), n)[keep]
+	end = np.cumsum(np.bincount(idx, minlength=len(paths)))
+	res = [(k, p) for (k, q), p in zip(paths, np.split(rc[keep], end[:-1])) if len(p) > 1]
+	return res, int(np.sum(n) - np.sum([len(p) for k, p in res]))
+
+def pixel_scale(ax, shape, dpi):
+# pixels of img in one pixel of the output
+	width = ax.get_position().width * ax.figure.get_figwidth() * dpi
+	return max(shape[1] - 1, 1) / width
+
+def draw(ax, paths, levs, extent, shape, colors='k', linewidths=0.5, rasterlow=False, **kwargs):
+# one compound path of every level, as the ContourSet of matplotlib.
+# The negative and the lowest positive levels are rasterized in vector output by rasterlow.
+	import matplotlib as mpl
+	from matplotlib.path import Path
+	from matplotlib.collections import PathCollection
+	x0, x1, y0, y1 = extent
+	sx = (x1 - x0) / max(shape[1] - 1, 1)
+	sy = (y1 - y0) / max(shape[0] - 1, 1)
+	pieces = {}
+	for k, p in paths:
+		pieces.setdefault(k, []).append(p)
+	neg = mpl.rcParams['contour.negative_linestyle']
+	low = min([lev for lev in levs if lev > 0], default=0.0)
+	groups = {False: ([], []), True: ([], [])}
+	for k in sorted(pieces):
+		rc = np.concatenate(pieces[k])
+		codes = np.full(len(rc), Path.LINETO, dtype=Path.code_type)
+		codes[np.cumsum([0] + [len(p) for p in pieces[k][:-1]])] = Path.MOVETO
+		cpaths, styles = groups[bool(rasterlow and levs[k] <= low)]
+		cpaths.append(Path(np.c_[x0 + rc[:, 1]*sx, y0 + rc[:, 0]*sy], codes))
+		styles.append(neg if levs[k] < 0 else 'solid')
+	res = []
+	for rasterized in (True, False):
+		cpaths, styles = groups[rasterized]
+		if len(cpaths) == 0:
+			continue
+		pc = PathCollection(cpaths, facecolors='none', edgecolors=colors, linewidths=linewidths,
+						 linestyles=styles, rasterized=rasterized, **kwargs)
+		ax.add_collection(pc, autolim=False)
+		res.append(pc)
+	return res
+
+def cache_dir():
+	d = os.environ.get('VLPY_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'vlpy'))
+	d = os.path.join(d, 'contours')
+	if not os.path.exists(d):
+		os.makedirs(d, exist_ok=True)
+	return d
+
+def read_sums():
+# {path: [size, mtime, sha1]} of the files seen
+	sumfile = os.path.join(cache_dir(), 'checksums.json')
+	if not os.path.exists(sumfile):
+		return {}
+	try:
+		with open(sumfile, 'r') as f:
+			sums = json.load(f)
+	except ValueError:
+		return {}
+	return {path: v for path, v in sums.items() if isinstance(v, list) and len(v) == 3}
+
+def write_sums(sums):
+	sumfile = os.path.join(cache_dir(), 'checksums.json')
+	tmp = '%s.%d' % (sumfile, os.getpid())
+	with open(tmp, 'w') as f:
+		json.dump(sums, f)
+	os.replace(tmp, sumfile)
+
+def file_state(path):
+	try:
+		st = os.stat(path)
+	except OSError:
+		return None
+	return [st.st_size, st.st_mtime_ns]
+
+def file_checksum(infile):
+# sha1 of the file, remembered for the same path, size and mtime
+	path = os.path.abspath(infile)
+	state = file_state(path)
+	sums = read_sums()
+	if path in sums and sums[path][:2] == state:
+		return sums[path][2]
+	sha = hashlib.sha1()
+	with open(infile, 'rb') as f:
+		for block in iter(lambda: f.read(1 << 22), b''):
+			sha.update(block)
+	sums[path] = state + [sha.hexdigest()]
+	write_sums(sums)
+	return sums[path][2]
+
+def cache_key(infile, W, levs, tag='', shape=()):
+# the shape of the traced image too, a window reduced by blocks is another key
+	levs = ' '.join('%.6e' % lev for lev in levs)
+	key = '%s|%s|%s|%s|%s' % (file_checksum(infile), ' '.join(str(int(w)) for w in W), levs, tag,
+		' '.join(str(int(n)) for n in shape))
+	return hashlib.sha1(key.encode()).hexdigest()
+
+def save_paths(cachefile, paths):
+# all vertices in one float32 array, with the level and the end of every path
+	if len(paths) > 0:
+		xy = np.concatenate([p for k, p in paths]).astype(np.float32)
+	else:
+		xy = np.zeros((0, 2), dtype=np.float32)
+	lev = np.array([k for k, p in paths], dtype=np.int16)
+	end = np.cumsum([len(p) for k, p in paths]).astype(np.int64)
+	tmp = '%s.%d.npz' % (cachefile[:-4], os.getpid())
+	np.savez(tmp, xy=xy, lev=lev, end=end)
+	os.replace(tmp, cachefile)
+
+def load_paths(cachefile):
+	with np.load(cachefile) as d:
+		xy, lev, end = d['xy'].astype(np.float64), d['lev'], d['end']
+	return list(zip(lev.tolist(), np.split(xy, end[:-1])))
+
+def evict(maxsize=None):
+# remove the least recently used files until the cache is smaller than maxsize (MB)
+	if maxsize is None:
+		maxsize = float(os.environ.get('VLPY_CACHE_SIZE', 1024))
+	d = cache_dir()
+	files = []
+	for name in os.listdir(d):
+		if name.endswith('.npz'):
+			st = os.stat(os.path.join(d, name))
+			files.append((st.st_mtime, st.st_size, name))
+	total = sum(size for t, size, name in files)
+	for t, size, name in sorted(files):
+		if total <= maxsize * 1024**2:
+			break
+		try:
+			os.remove(os.path.join(d, name))
+		except FileNotFoundError:
+			pass
+		total -= size
+# forget the checksums of the files removed or changed
+	sums = read_sums()
+	keep = {path: v for path, v in sums.items() if file_state(path) == v[:2]}
+	if len(keep) < len(sums):
+		write_sums(keep)
+
+def cached_trace(infile, W, img, levs, nproc=1, tile=1024, tag=''):
+# the same as trace(), but the paths are read from the cache if they were traced before
+	cachefile = os.path.join(cache_dir(), cache_key(infile, W, levs, tag, np.shape(img)) + '.npz')
+	if os.path.exists(cachefile):
+		try:
+			paths = load_paths(cachefile)
+			os.utime(cachefile)
+			return paths
+		except (OSError, ValueError, KeyError):
+			pass
+	paths = trace(img, levs, nproc, tile)
+	save_paths(cachefile, paths)
+	evict()
+# the same float32 vertices as the later renders
+	return [(k, p.astype(np.float32).astype(np.float64)) for k, p in paths]
+
+def contour(ax, img, levs, extent, nproc=None, tile=1024, cache=None, tol=0.0, dpi=100,
+			rasterlow=False, **kwargs):
+# cache is None or (infile, W, tag), W is the pixel window of img in infile.
+# tol is the simplification tolerance in pixels of the output at dpi.
+	if cache is None:
+		paths = trace(img, levs, nproc, tile)
+	else:
+		infile, W, tag = cache
+		paths = cached_trace(infile, W, img, levs, nproc, tile, tag)
+	if tol > 0.0:
+		nvert = sum([len(p) for k, p in paths])
+		paths, ndrop = simplify(paths, tol * pixel_scale(ax, np.shape(img), dpi))
+		print('Simplify contours: %d of %d vertices dropped' % (ndrop, nvert))
+	return draw(ax, paths, levs, extent, np.shape(img), rasterlow=rasterlow, **kwargs)
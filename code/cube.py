@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 10:04:51 2026
+
+This program is use to plot the channel maps and to calculate the moment maps
+of a spectral line (or multi-frequency) cube.
+The moments 0, 1 and 2 are calculated in one pass over the channels: every
+channel is read from the memory mapped file, and only the sums of I, I*v and
+I*v**2 are kept in memory, so the cube can be bigger than the memory. Pixels
+below clip times the rms of the channel are not used. The moment maps are
+saved beside the cube as xxx.mom0.fits, xxx.mom1.fits and xxx.mom2.fits, and
+they are plotted by contour.py or mapplot.py (--moment) as other images.
+The channel maps are plotted on a grid of panels. The figure, axes, beam and
+colorbar are made once, and only the images, contours and labels are changed
+for every page, so a cube of many channels makes a multi-page pdf file or
+numbered png files quickly.
+You can specify the input cube by -i or --infile,
+	output channel maps by -o or --outfile,
+	moment maps by -m or --moments, e.g. "0 1 2",
+	clip level of the moments by --clip,
+	channels by -C or --chans: "first last step",
+	Stokes plane by -S or --stokes,
+	grid of panels by -g or --grid: "rows cols",
+	contour base by -c or --cmul, plot window by -w or --win,
+	normalize by -n or --norm and colormap by --colormap, the same as mapplot.py,
+	figsize by -f or --figsize and dpi by -d or --dpi
+contour.py and mapplot.py plot a plane of the cube by --plane "chan stokes".
+
+Installation:
+1. copy file
+	chmod a+x cube.py
+	cp cube.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	cube.py -m "0 1 2" <cube.fits>
+	cube.py -i <cube.fits> -o <chans.pdf> -g "4 4" -C "10 40 2" -c 3e-3 -w "10 -10 -10 10"
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import getopt
+import numpy as np
+from astropy.io import fits
+
+def plane(data, chan=0, stokes=0):
+# a plane of a cube of 2, 3 or 4 axes (stokes, chan, y, x)
+	if data.ndim == 2:
+		return data
+	if data.ndim == 3:
+		return data[chan]
+	return data[stokes, chan]
+
+def nchan(h):
+	return h['naxis3'] if h['naxis'] >= 3 else 1
+
+def spectral_axis(h):
+# value and unit of every channel, radio velocity (km/s) if the rest frequency is known
+	n = nchan(h)
+	if h['naxis'] < 3:
+		return np.zeros(1), ''
+	v = h['crval3'] + (np.arange(n) + 1 - h['crpix3']) * h['cdelt3']
+	ctype = str(h.get('ctype3', '')).upper()
+	rest = h.get('restfreq', h.get('restfrq', 0.0))
+	if ctype.startswith('FREQ') and rest > 0:
+		return 2.99792458E5 * (1.0 - v / rest), 'km/s'
+	if ctype.startswith('FREQ'):
+		return v / 1.0E9, 'GHz'
+	if ctype.startswith('VELO') or ctype.startswith('VRAD') or ctype.startswith('FELO'):
+		return v / 1.0E3, 'km/s'
+	return v, ctype
+
+def moment_file(infile, k):
+	base = infile[:-5] if infile.lower().endswith('.fits') else infile
+	return base + '.mom%d.fits' % k
+
+def chans_card(chans):
+# "first last step" of the channels, or the sha1 of the list if they are not evenly spaced
+	chans = list(chans)
+	step = np.unique(np.diff(chans))
+	if len(chans) == 1 or (len(step) == 1 and step[0] > 0):
+		return '%d %d %d' % (chans[0], chans[-1], step[0] if len(chans) > 1 else 1)
+	import hashlib
+	return 'sha1 ' + hashlib.sha1(' '.join(map(str, chans)).encode()).hexdigest()[:16]
+
+def moments(infile, orders=(0, 1, 2), stokes=0, chans=None, clip=3.0, force=False):
+# moment maps in one pass over the channels, the maps are used again if they are of the
+# same cube (mtime), clip, channels, stokes and order
+	from contour import calc_rms
+	outfiles = [moment_file(infile, k) for k in orders]
+	st = os.stat(infile)
+	if chans is None:
+		chans = range(nchan(fits.getheader(infile)))
+	cards = {'MOMMTIME': st.st_mtime, 'MOMCLIP': clip, 'MOMCHANS': chans_card(chans),
+		'MOMSTOKE': stokes}
+	if not force and all([os.path.exists(f) for f in outfiles]):
+		hms = [fits.getheader(f) for f in outfiles]
+		if all([hm.get(key) == cards[key] for hm in hms for key in cards]) \
+			and [hm.get('MOMORDER') for hm in hms] == list(orders):
+			return outfiles
+	with fits.open(infile, memmap=True) as hdul:
+		h = hdul[0].header
+		data = hdul[0].data
+		vel, unit = spectral_axis(h)
+		dv = abs(vel[1] - vel[0]) if len(vel) > 1 else 1.0
+	# velocities relative to the middle channel, to keep the sums accurate
+		v0 = vel[len(vel)//2]
+		s0 = np.zeros((h['naxis2'], h['naxis1']))
+		s1 = np.zeros_like(s0)
+		s2 = np.zeros_like(s0)
+		for c in chans:
+			img = np.array(plane(data, c, stokes), dtype=np.float64)
+			rms = calc_rms(img[np.isfinite(img)])
+			img[~(img > clip*rms)] = 0.0
+			v = vel[c] - v0
+			s0 += img
+			s1 += img * v
+			s2 += img * v * v
+	with np.errstate(invalid='ignore', divide='ignore'):
+		m1 = s1 / s0
+		m2 = np.sqrt(np.maximum(s2 / s0 - m1**2, 0.0))
+	maps = {0: s0 * dv, 1: m1 + v0, 2: m2}
+	units = {0: 'JY/BEAM.%s' % unit, 1: unit, 2: unit}
+	for k, outfile in zip(orders, outfiles):
+		hout = h.copy()
+		hout['BITPIX'] = -32
+		for key in ('BSCALE', 'BZERO', 'BLANK'):
+			hout.remove(key, ignore_missing=True)
+	# keep 4 axes, so the other programs read data[0, 0]
+		if h['naxis'] >= 3:
+			hout['NAXIS3'] = 1
+			hout['CRPIX3'] = 1.0
+			hout['CRVAL3'] = h['crval3'] + (len(vel)//2 + 1 - h['crpix3']) * h['cdelt3']
+		hout['BUNIT'] = units[k]
+		hout['MOMMTIME'] = (st.st_mtime, 'mtime of the cube')
+		hout['MOMCLIP'] = (clip, 'clip level')
+		hout['MOMCHANS'] = (cards['MOMCHANS'], 'channels: first last step')
+		hout['MOMSTOKE'] = (stokes, 'stokes plane')
+		hout['MOMORDER'] = (k, 'order of the moment')
+		shape = (1,) * (h['naxis'] - 2) + s0.shape
+		fits.writeto(outfile, maps[k].astype(np.float32).reshape(shape), hout, overwrite=True)
+	return outfiles
+
+def channel_maps(infile, outfile, chans=None, stokes=0, grid=(4, 4), cmul=None, win=None,
+				 norm='', cmap='', ncut=0, figsize=None, dpi=100):
+	import matplotlib.pyplot as plt
+	from matplotlib.backends.backend_pdf import PdfPages
+	from contour import calc_rms
+	from mapplot import add_beam, set_axis, word2pix, pix2word, cut_cmap, get_normalize
+	from ctrace import trace, draw
+	rows, cols = grid
+	with fits.open(infile, memmap=True) as hdul:
+		h = hdul[0].header
+		data = hdul[0].data
+		if chans is None:
+			chans = range(nchan(h))
+		chans = list(chans)
+		vel, unit = spectral_axis(h)
+		fmt = '%.4f %s' if unit == 'GHz' else '%.2f %s'
+		W = word2pix(win, h)
+		if win is None:
+			win = pix2word(W, h)
+		first = np.array(plane(data, chans[0], stokes)[W[2]:W[3], W[0]:W[1]], dtype=np.float64)
+		if cmul is None:
+			cmul = 3 * calc_rms(first)
+		levs = cmul*np.array([-1,1,2,4,8,16,32,64,128,256,512,1024,2048,4096])
+	# one color scale for all channels, from the peaks of the channels
+		vmin, vmax = np.inf, -np.inf
+		for c in chans:
+			img = plane(data, c, stokes)[W[2]:W[3], W[0]:W[1]]
+			vmin, vmax = min(vmin, np.nanmin(img)), max(vmax, np.nanmax(img))
+		if norm == '':
+			norm = 'linear %.3f %.3f' % (vmin, vmax)
+		norm = get_normalize(norm, vmin, vmax)
+		cmap = cut_cmap(cmap if cmap != '' else 'rainbow', ncut)
+		if figsize is None:
+			figsize = (2.5*cols + 1.0, 2.5*rows)
+
+	# the template: axes, beam and colorbar are made once
+		fig, axes = plt.subplots(rows, cols, sharex=True, sharey=True, squeeze=False,
+			figsize=figsize, layout='constrained')
+		images, labels = [], []
+		for ax in axes.ravel():
+			set_axis(ax, win)
+			ax.label_outer()
+			add_beam(ax, win, h)
+			images.append(ax.imshow(np.zeros_like(first), extent=win, origin='lower',
+				interpolation='none', cmap=cmap, norm=norm))
+			labels.append(ax.text(0.05, 0.95, '', transform=ax.transAxes, va='top'))
+		cbar = fig.colorbar(images[0], ax=axes.ravel().tolist(), fraction=0.05/cols, pad=0.02)
+		cbar.ax.tick_params('both', direction='in', right=True, top=True, which='both')
+
+		npanel = rows * cols
+		pages = [chans[i:i+npanel] for i in range(0, len(chans), npanel)]
+		pdf = PdfPages(outfile) if outfile.lower().endswith('.pdf') else None
+		base, ext = os.path.splitext(outfile)
+		collections = []
+		for p, page in enumerate(pages):
+			for pc in collections:
+				pc.remove()
+			collections = []
+			for k, ax in enumerate(axes.ravel()):
+				if k >= len(page):
+					images[k].set_visible(False)
+					labels[k].set_text('')
+					continue
+				c = page[k]
+				img = np.array(plane(data, c, stokes)[W[2]:W[3], W[0]:W[1]], dtype=np.float64)
+				images[k].set_data(img)
+				images[k].set_visible(True)
+				labels[k].set_text(fmt % (vel[c], unit))
+				collections += draw(ax, trace(img, levs, 1), levs, win, img.shape,
+					colors='k', linewidths=0.5)
+			if pdf is not None:
+				pdf.savefig(fig, dpi=dpi)
+			else:
+				fig.savefig('%s-%03d%s' % (base, p+1, ext), dpi=dpi)
+		if pdf is not None:
+			pdf.close()
+		plt.close(fig)
+	return len(pages)
+
+def myhelp():
+	print('Help: cube.py -m "0 1 2" <cube.fits>')
+	print('  or: cube.py -i <cube.fits> -o <chans.pdf> -g "4 4" -C "10 40 2" -c <3e-3> -w "10 -10 -10 10"')
+
+def main(argv):
+	infile = ''
+	outfile = ''
+	orders = []
+	clip = 3.0
+	chans = None
+	stokes = 0
+	grid = (4, 4)
+	cmul = None
+	win = None
+	norm = ''
+	colormap = ''
+	ncut = 0
+	figsize = None
+	dpi = 100
+
+	try:
+		opts, args = getopt.getopt(argv, "hi:o:m:C:S:g:c:w:n:N:f:d:",
+							 ['help', 'infile=', 'outfile=', 'moments=', 'clip=', 'chans=',
+		 'stokes=', 'grid=', 'cmul=', 'win=', 'norm=', 'colormap=', 'ncut=', 'figsize=', 'dpi='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-i', '--infile'):
+			infile = arg
+		elif opt in ('-o', '--outfile'):
+			outfile = arg
+		elif opt in ('-m', '--moments'):
+			orders = [int(k) for k in arg.split()]
+		elif opt in ('--clip', ):
+			clip = float(arg)
+		elif opt in ('-C', '--chans'):
+			first, last, step = (list(map(int, arg.split())) + [1])[:3]
+			chans = range(first, last+1, step)
+		elif opt in ('-S', '--stokes'):
+			stokes = int(arg)
+		elif opt in ('-g', '--grid'):
+			grid = tuple(int(n) for n in arg.split())
+		elif opt in ('-c', '--cmul'):
+			cmul = float(arg)
+		elif opt in ('-w', '--win'):
+			win = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-n', '--norm'):
+			norm = arg
+		elif opt in ('--colormap', ):
+			colormap = arg
+		elif opt in ('-N', '--ncut'):
+			ncut = int(arg)
+		elif opt in ('-f', '--figsize'):
+			figsize = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-d', '--dpi'):
+			dpi = int(arg)
+	if infile == '' and len(args) == 1:
+		infile = args[0]
+	if infile == '' and len(args) == 2:
+		infile, outfile = args
+	if infile == '':
+		myhelp()
+		sys.exit(2)
+	if len(orders) > 0:
+		for f in moments(infile, orders, stokes, chans, clip, force=True):
+			print('Write %s' % f)
+	if outfile != '' or len(orders) == 0:
+		if outfile == '':
+			outfile = os.path.splitext(infile)[0] + '.chans.pdf'
+		n = channel_maps(infile, outfile, chans, stokes, grid, cmul, win, norm, colormap,
+					   ncut, figsize, dpi)
+		if not outfile.lower().endswith('.pdf'):
+			base, ext = os.path.splitext(outfile)
+			outfile = '%s-001%s ... %s-%03d%s' % (base, ext, base, n, ext)
+		print('Write %s (%d pages)' % (outfile, n))
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 31 15:08:44 2026
+
+This program is use to plot the difference maps of two fits images, e.g. two
+epochs of a source, or an image and its restored model (residual map).
+The difference is the later (second) image minus the earlier (first) one, so
+the model is given first for the residual, image - model.
+The second image is put on the grid (pixel size, reference pixel, size) of
+the first image by bilinear interpolation, relative to the reference pixels,
+and both images are convolved to a common beam (the circular beam of the
+largest major axis, or -b) and scaled to Jy per common beam. Their rms (the
+same as contour.py) is propagated to the difference, rms = sqrt(rms1^2+rms2^2).
+The difference is plotted with a diverging colormap and the twoslope norm of
+mapplot.py (center 0), and the contours of the later image.
+With more than 2 images (a series of epochs), the differences of consecutive
+epochs are plotted in one pass, and only two epochs are in memory. All
+differences of a series have the same grid (the first image) and beam.
+You can specify the input fits images by -i or --infile,
+	output file by -o or --output (image-1.png, image-2.png ... for a series),
+	write the difference fits files (the same name as the output) by -F or --fits,
+	contour base of the later image by -c or --cmul (default 3 rms),
+	common beam by -b or --beam "bmaj bmin bpa" (mas, deg),
+	plot window by -w or --win, figsize by -f or --figsize, dpi by -d or --dpi,
+	normalize by -n or --norm (default "twoslope 0 -max max"),
+	colormap by --colormap (default RdBu_r)
+
+Installation:
+1. copy file
+	chmod a+x diffmap.py
+	cp diffmap.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	diffmap.py <epoch1.fits> <epoch2.fits> <diff.png>
+	diffmap.py -i "<model.fits> <image.fits>" -o <residual.pdf> -w "10 -10 -10 10"
+	diffmap.py -i "<e1.fits> <e2.fits> <e3.fits> <e4.fits>" -o <diff.png> -F -b "1.0 1.0 0"
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import getopt
+import numpy as np
+from astropy.io import fits
+
+def beam_of(h):
+# bmaj bmin (mas) bpa (deg) of a header
+	return h['bmaj']*3.6E6, h['bmin']*3.6E6, h['bpa']
+
+def common_beam(headers):
+	bmaj = max([h['bmaj'] for h in headers]) * 3.6E6
+	return bmaj, bmaj, 0.0
+
+def covariance(beam):
+# covariance (mas^2) of a gaussian beam, x to the east and y to the north
+	bmaj, bmin, bpa = beam
+	s = 1.0 / np.sqrt(8*np.log(2))
+	pa = np.radians(bpa)
+	u = np.array([np.sin(pa), np.cos(pa)])
+	v = np.array([np.cos(pa), -np.sin(pa)])
+	return (bmaj*s)**2 * np.outer(u, u) + (bmin*s)**2 * np.outer(v, v)
+
+def regrid(img, h, ht):
+# the image of header h on the grid of header ht, bilinear, nan outside
+	sx = ht['cdelt1'] / h['cdelt1']
+	sy = ht['cdelt2'] / h['cdelt2']
+# 0-based pixels of h at the 0-based pixels of ht, crpix is 1-based
+	x = (h['crpix1'] - 1) + (np.arange(ht['naxis1']) + 1 - ht['crpix1']) * sx
+	y = (h['crpix2'] - 1) + (np.arange(ht['naxis2']) + 1 - ht['crpix2']) * sy
+	if img.shape == (ht['naxis2'], ht['naxis1']) and np.allclose(x, np.arange(img.shape[1])) \
+		and np.allclose(y, np.arange(img.shape[0])):
+		return img
+	def weights(p, n):
+		i = np.clip(np.floor(p).astype(int), 0, n-2)
+		w = p - i
+		w[(p < 0) | (p > n-1)] = np.nan
+		return i, w
+	ix, wx = weights(x, img.shape[1])
+	iy, wy = weights(y, img.shape[0])
+	rows = img[iy] * (1-wy)[:, None] + img[iy+1] * wy[:, None]
+	return rows[:, ix] * (1-wx) + rows[:, ix+1] * wx
+
+def convolve(img, h, beam, target):
+# the image (Jy/beam) convolved from beam to target (Jy/target beam)
+	cov = covariance(target) - covariance(beam)
+	w, v = np.linalg.eigh(cov)
+	tol = 1e-6 * np.max(covariance(target))
+	if np.min(w) < -tol:
+		print('Warning: the beam %.3f x %.3f mas is larger than the common beam' % beam[:2])
+	if np.all(w < tol):
+		return img
+	cov = v @ np.diag(np.clip(w, 0, None)) @ v.T
+# covariance in pixels
+	d = np.diag([1.0 / (h['cdelt1']*3.6E6), 1.0 / (h['cdelt2']*3.6E6)])
+	cov = d @ cov @ d
+	pad = int(4 * np.sqrt(np.max(np.diag(cov)))) + 1
+	ny, nx = img.shape
+	data = np.zeros((ny + 2*pad, nx + 2*pad))
+	bad = ~np.isfinite(img)
+	data[pad:pad+ny, pad:pad+nx] = np.where(bad, 0.0, img)
+	ky = np.fft.fftfreq(data.shape[0])[:, None]
+	kx = np.fft.rfftfreq(data.shape[1])[None, :]
+	g = np.exp(-2*np.pi**2 * (cov[0, 0]*kx**2 + 2*cov[0, 1]*kx*ky + cov[1, 1]*ky**2))
+	data = np.fft.irfft2(np.fft.rfft2(data) * g, data.shape)[pad:pad+ny, pad:pad+nx]
+	data[bad] = np.nan
+	return data * (target[0]*target[1]) / (beam[0]*beam[1])
+
+def load(infile, ht, beam):
+# the image on the grid ht and the common beam, and its rms
+	from contour import calc_rms
+	with fits.open(infile) as hdul:
+		h = hdul[0].header
+		img = np.array(hdul[0].data[0, 0], dtype=np.float64)
+	img = convolve(img, h, beam_of(h), beam)
+	img = regrid(img, h, ht)
+	rms = calc_rms(img[np.isfinite(img)])
+	return img, rms, h
+
+def plot_diff(diff, img, ht, win, cmul, outfile, figsize=(6, 6), dpi=100, norm='', cmap='',
+			  title='', rms=0.0):
+	import matplotlib.pyplot as plt
+	from mapplot import add_beam, set_axis, word2pix, pix2word, cut_cmap, get_normalize, savefig
+	if win == None:
+		win = pix2word(None, ht)
+		W = word2pix(None, ht)
+	else:
+		W = word2pix(win, ht)
+	d = diff[W[2]:W[3], W[0]:W[1]]
+	vmax = np.nanmax(np.abs(d)) if np.any(np.isfinite(d)) else np.nan
+	if not np.isfinite(vmax) or vmax <= 0:
+	# no difference (the same images) or no pixel in the window, the range of the noise
+		vmax = 3*rms if np.isfinite(rms) and rms > 0 else 1.0
+	if norm == '':
+		norm = 'twoslope 0 %.6g %.6g' % (-vmax, vmax)
+	norm = get_normalize(norm, -vmax, vmax)
+	if cmap == '':
+		cmap = 'RdBu_r'
+	fig, ax = plt.subplots()
+	fig.set_size_inches(figsize)
+	set_axis(ax, win)
+	add_beam(ax, win, ht)
+	pcm = ax.imshow(d, extent=win, origin='lower', interpolation='none',
+				 cmap=cut_cmap(cmap), norm=norm)
+	levs = cmul*np.array([-1,1,2,4,8,16,32,64,128,256,512,1024,2048,4096])
+	ax.contour(img[W[2]:W[3], W[0]:W[1]], levs, extent=win, linewidths=0.5, colors='k')
+	ax.text(0.03, 0.95, title, transform=ax.transAxes)
+	cbar = fig.colorbar(pcm, ax=ax, fraction=0.05)
+	cbar.ax.tick_params('both',direction='in',right=True,top=True,which='both')
+	cbar.ax.tick_params(axis='y', labelrotation=90)
+	fig.tight_layout(pad=0.5)
+	savefig(outfile, dpi)
+	plt.close(fig)
+
+def write_diff(outfile, diff, ht, rms, names):
+	h = ht.copy()
+	h['noise'] = (rms, 'propagated rms of the difference (Jy/beam)')
+	h.add_history('diffmap.py: %s - %s' % names)
+	fits.writeto(outfile, diff.astype(np.float32).reshape((1, 1) + diff.shape), h, overwrite=True)
+
+def out_name(outfile, i, n):
+	base, ext = os.path.splitext(outfile)
+	return outfile if n == 2 else '%s-%d%s' % (base, i, ext)
+
+def diffmap(infiles, outfile, cmul=None, beam=None, win=None, figsize=(6, 6), dpi=100,
+			norm='', cmap='', save_fits=False):
+# differences of consecutive images, only two images in memory
+	from contour import calc_rms
+	headers = [fits.getheader(f) for f in infiles]
+	if beam == None:
+		beam = common_beam(headers)
+	ht = headers[0].copy()
+	ht['bmaj'], ht['bmin'], ht['bpa'] = beam[0]/3.6E6, beam[1]/3.6E6, beam[2]
+	print('Common beam: %.3f x %.3f mas, %.1f deg' % tuple(beam))
+	res = []
+	prev, rms0, h0 = load(infiles[0], ht, beam)
+	for i in range(1, len(infiles)):
+		img, rms1, h1 = load(infiles[i], ht, beam)
+		diff = img - prev
+		rms = np.hypot(rms0, rms1)
+		d = diff[np.isfinite(diff)]
+		print('%s - %s: rms %.3f %.3f mJy/beam, difference rms %.3f (measured %.3f), min %.3f max %.3f mJy/beam'
+			% (os.path.basename(infiles[i]), os.path.basename(infiles[i-1]), rms1*1e3, rms0*1e3,
+			rms*1e3, calc_rms(d)*1e3, np.min(d)*1e3, np.max(d)*1e3))
+		out = out_name(outfile, i, len(infiles))
+		title = '%s - %s' % (h1.get('date-obs', os.path.basename(infiles[i])),
+			h0.get('date-obs', os.path.basename(infiles[i-1])))
+		plot_diff(diff, img, ht, win, 3*rms1 if cmul == None else cmul, out, figsize, dpi,
+			norm, cmap, title, rms)
+		if save_fits:
+			write_diff(os.path.splitext(out)[0] + '.fits', diff, ht, rms, (infiles[i], infiles[i-1]))
+		res.append((out, rms))
+		prev, rms0, h0 = img, rms1, h1
+	return res
+
+def myhelp():
+	print('Help: diffmap.py <epoch1.fits> <epoch2.fits> <diff.png>')
+	print('  or: diffmap.py -i "<model.fits> <image.fits>" -o <residual.pdf> -w "10 -10 -10 10"')
+	print('  or: diffmap.py -i "<e1.fits> <e2.fits> <e3.fits>" -o <diff.png> -F -b "1.0 1.0 0" -n "twoslope 0 -0.01 0.01"')
+
+def main(argv):
+	infiles = []
+	outfile = ''
+	cmul = None
+	beam = None
+	win = None
+	figsize = (6, 6)
+	dpi = 100
+	norm = ''
+	colormap = ''
+	save_fits = False
+
+	try:
+		opts, args = getopt.getopt(argv, "hi:o:c:b:w:f:d:n:F",
+							 ['help', 'infile=', 'outfile=', 'cmul=', 'beam=', 'win=',
+		 'figsize=', 'dpi=', 'norm=', 'colormap=', 'fits'])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-i', '--infile'):
+			infiles = arg.split()
+		elif opt in ('-o', '--outfile'):
+			outfile = arg
+		elif opt in ('-c', '--cmul'):
+			cmul = float(arg)
+		elif opt in ('-b', '--beam'):
+			beam = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-w', '--win'):
+			win = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-f', '--figsize'):
+			figsize = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-d', '--dpi'):
+			dpi = int(arg)
+		elif opt in ('-n', '--norm'):
+			norm = arg
+		elif opt in ('--colormap', ):
+			colormap = arg
+		elif opt in ('-F', '--fits'):
+			save_fits = True
+	if len(infiles) == 0 and len(args) >= 2:
+		infiles = args
+		if len(args) > 2 and not args[-1].lower().endswith('.fits'):
+			infiles, outfile = args[:-1], args[-1]
+	if len(infiles) < 2:
+		myhelp()
+		sys.exit(2)
+	if outfile == '':
+		outfile = 'diff.pdf'
+	diffmap(infiles, outfile, cmul, beam, win, figsize, dpi, norm, colormap, save_fits)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -7,7 +7,7 @@ Created on Sun Oct 18 23:25:01 2020
 """
 
 import os, sys, getopt
-import wget, gzip
+import gzip
 import re
 
 def freq_to_band(nu):	
@@ -48,6 +48,7 @@ def unzip(fgzip, fout):
 			f_out.write(f_in.read())
 
 def mojave_download(source, path=''):
+	import wget
 	if path != '' :
 		os.chdir(path)
 		
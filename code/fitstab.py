@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 15:20:46 2026
+
+This module is use to read a binary table (e.g. AIPS CC or AN table) of a fits
+or uvfits file with numpy only. Importing astropy takes more time than reading
+a small table, so cc2mod.py and prtan.py read their tables by this module and
+start quickly. The headers are read block by block, and the data of other HDUs
+(e.g. the visibilities of a uvfits file) are skipped without reading.
+Columns of variable length (P, Q) are not supported.
+
+Usage:
+	from fitstab import read_table
+	cc = read_table('cta102.fits', 1)
+	an = read_table('cta102.uvf', 'AIPS AN', ver=1)
+	print(cc['FLUX'], an['ANNAME'])
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import numpy as np
+
+block = 2880
+formats = {'L': 'i1', 'X': 'u1', 'B': 'u1', 'I': '>i2', 'J': '>i4', 'K': '>i8', 'A': 'S',
+	'E': '>f4', 'D': '>f8', 'C': '>c8', 'M': '>c16'}
+
+def card_value(s):
+	s = s.strip()
+	if s.startswith("'"):
+		return s[1:].split("'")[0].rstrip()
+	s = s.split('/')[0].strip()
+	if s in ('T', 'F'):
+		return s == 'T'
+	for conv in (int, lambda s: float(s.replace('D', 'E'))):
+		try:
+			return conv(s)
+		except ValueError:
+			pass
+	return s
+
+def read_header(f):
+# dict of the keywords, None at the end of file
+	h = {}
+	while True:
+		buf = f.read(block)
+		if len(buf) < block:
+			return None
+		for i in range(0, block, 80):
+			card = buf[i:i+80].decode('ascii', 'replace')
+			key = card[:8].strip()
+			if key == 'END':
+				return h
+			if card[8:10] == '= ' and key not in h:
+				h[key] = card_value(card[10:])
+
+def data_size(h):
+	naxis = [h.get('NAXIS%d' % i, 0) for i in range(1, h.get('NAXIS', 0)+1)]
+	if len(naxis) == 0:
+		return 0
+	if h.get('GROUPS', False) and naxis[0] == 0:
+		naxis = naxis[1:]
+	n = h.get('PCOUNT', 0) + int(np.prod(naxis))
+	size = abs(h['BITPIX']) // 8 * h.get('GCOUNT', 1) * n
+	return (size + block - 1) // block * block
+
+def table_dtype(h):
+	names = []
+	dtype = []
+	for i in range(1, h['TFIELDS']+1):
+		tform = h['TFORM%d' % i].strip()
+		r = tform.rstrip('ABCDEIJKLMPQX')
+		t = tform[len(r)]
+		r = int(r) if r != '' else 1
+		if t not in formats:
+			raise ValueError('Unsupported column %s' % tform)
+		name = h.get('TTYPE%d' % i, 'COL%d' % i)
+		if t == 'A':
+			dt = ('S%d' % r, ())
+		elif t == 'X':
+			dt = ('u1', ((r + 7) // 8,))
+		else:
+			dt = (formats[t], (r,) if r > 1 else ())
+		names.append(name)
+		dtype.append((name, dt[0], dt[1]))
+	return names, np.dtype(dtype)
+
+def read_table(infile, ext=1, ver=1):
+# ext is the number of the HDU or EXTNAME
+	with open(infile, 'rb') as f:
+		n = 0
+		while True:
+			h = read_header(f)
+			if h is None:
+				raise KeyError('%s not found in %s' % (ext, infile))
+			size = data_size(h)
+			if (ext == n) if isinstance(ext, int) else \
+				(h.get('EXTNAME', '') == ext and h.get('EXTVER', 1) == ver):
+				break
+			f.seek(size, 1)
+			n += 1
+		if h.get('XTENSION', '') != 'BINTABLE':
+			raise ValueError('HDU %s of %s is not a binary table' % (ext, infile))
+		names, dtype = table_dtype(h)
+		data = np.frombuffer(f.read(h['NAXIS1']*h['NAXIS2']), dtype=dtype)
+	tab = {}
+	for i, name in enumerate(names):
+		col = data[name]
+		if col.dtype.kind == 'S':
+			col = np.char.rstrip(np.char.decode(col, 'ascii'))
+		else:
+			col = col.astype(col.dtype.newbyteorder('='))
+		if 'TSCAL%d' % (i+1) in h or 'TZERO%d' % (i+1) in h:
+			col = col * h.get('TSCAL%d' % (i+1), 1.0) + h.get('TZERO%d' % (i+1), 0.0)
+		tab[name] = col
+	return tab
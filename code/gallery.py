@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 14:18:27 2026
+
+This program is use to make a static HTML gallery of a mirrored archive (dluv.py).
+It walks the archive directory, renders a thumbnail (thumb.py) and a full-size
+map (mapplot.py) of every fits image by a pool of processes, and writes an
+index.html for every source and for the whole archive, with epoch, frequency,
+peak, noise and beam of every image.
+The gallery is updated incrementally: only images changed since the last
+build (size or mtime) are rendered again. An image which can not be rendered
+(e.g. an empty or broken file) is skipped with its error in gallery.json, and
+it is tried again when it changes.
+You can specify the archive directory by -i or --indir,
+	output directory by -o or --outdir,
+	file pattern by -p or --pattern,
+	thumbnail size by -s or --size,
+	normalize by -n or --norm and colormap by --colormap, the same as mapplot.py,
+	number of processes by -j or --nproc,
+	rebuild all images by -F or --force
+
+Installation:
+1. copy file
+	chmod a+x gallery.py
+	cp gallery.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	gallery.py <archive> <gallery>
+	gallery.py -i <archive> -o <gallery> -p '*.icn.fits' -n 'power 0.5' --colormap gnuplot2 -j 8
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import json
+import html
+import fnmatch
+import getopt
+from multiprocessing import Pool
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from astropy.io import fits
+
+def find_fits(indir, pattern='*.icn.fits'):
+	files = []
+	for root, dirs, names in os.walk(indir):
+		dirs.sort()
+		for name in sorted(names):
+			if fnmatch.fnmatch(name, pattern):
+				files.append(os.path.join(root, name))
+	return files
+
+def safe_name(name):
+	return ''.join(c if c.isalnum() or c in '+-_.' else '_' for c in name)
+
+def render(args):
+	infile, outdir, size, norm, cmap = args
+	from contour import calc_rms, detect_source, create_box, pix2world
+	from mapplot import mapplot
+	from thumb import thumbnail
+	with fits.open(infile) as hdul:
+		h = hdul[0].header
+		img = hdul[0].data[0, 0, :, :]
+		rms = calc_rms(img)
+		peak = float(np.nanmax(img))
+		label_image, bbox = detect_source(img, 3*rms)
+	win = pix2world(list(create_box(bbox, 0.15)), h)
+	source = safe_name(str(h.get('object', 'unknown')).strip())
+	name = os.path.basename(infile)
+	name = name[:-5] if name.lower().endswith('.fits') else name
+	sdir = os.path.join(outdir, source)
+	if not os.path.exists(sdir):
+		os.makedirs(sdir, exist_ok=True)
+	thumbnail(infile, os.path.join(sdir, name + '.thumb.png'), size, win, norm, cmap,
+		   cmul=3*rms)
+	mapplot(infile, 3*rms, os.path.join(sdir, name + '.png'), win=win, norm=norm, cmap=cmap)
+	plt.close('all')
+	return {'source': source, 'name': name, 'file': os.path.abspath(infile),
+		 'date': str(h.get('date-obs', '')), 'freq': h.get('crval3', 0.0)/1.0E9,
+		 'peak': peak, 'rms': float(rms), 'bmaj': h['bmaj']*3.6E6,
+		 'bmin': h['bmin']*3.6E6, 'bpa': h['bpa']}
+
+def safe_render(args):
+# the error of a file instead of stopping the pool
+	try:
+		return render(args)
+	except Exception as e:
+		plt.close('all')
+		return {'error': '%s: %s' % (type(e).__name__, e)}
+
+def source_page(source, items):
+	rows = []
+	for it in sorted(items, key=lambda it: (it['date'], it['freq'])):
+		rows.append('<tr><td><a href="%s.png"><img src="%s.thumb.png"></a></td>'
+			  '<td>%s</td><td>%.1f</td><td>%.1f</td><td>%.3f</td><td>%.2f x %.2f, %.1f</td>'
+			  '<td>%s</td></tr>'
+			  % (html.escape(it['name']), html.escape(it['name']), html.escape(it['date']),
+			  it['freq'], it['peak']*1.0E3, it['rms']*1.0E3, it['bmaj'], it['bmin'],
+			  it['bpa'], html.escape(it['name'])))
+	return ('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>%s</title></head><body>\n'
+		 '<p><a href="../index.html">archive</a></p><h1>%s</h1>\n<table border="1" cellpadding="4">\n'
+		 '<tr><th>map</th><th>epoch</th><th>freq (GHz)</th><th>peak (mJy/beam)</th>'
+		 '<th>noise (mJy/beam)</th><th>beam (mas, mas, deg)</th><th>file</th></tr>\n%s\n'
+		 '</table></body></html>\n' % (html.escape(source), html.escape(source), '\n'.join(rows)))
+
+def archive_page(sources):
+	rows = []
+	for source in sorted(sources):
+		items = sorted(sources[source], key=lambda it: it['date'])
+		last = items[-1]
+		rows.append('<tr><td><a href="%s/index.html"><img src="%s/%s.thumb.png"></a></td>'
+			  '<td><a href="%s/index.html">%s</a></td><td>%d</td><td>%s</td><td>%s</td></tr>'
+			  % (source, source, html.escape(last['name']), source, html.escape(source),
+			  len(items), html.escape(items[0]['date']), html.escape(last['date'])))
+	return ('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>archive</title></head><body>\n'
+		 '<h1>archive</h1>\n<table border="1" cellpadding="4">\n'
+		 '<tr><th>latest</th><th>source</th><th>images</th><th>first epoch</th><th>last epoch</th></tr>\n'
+		 '%s\n</table></body></html>\n' % '\n'.join(rows))
+
+def gallery(indir, outdir, pattern='*.icn.fits', size=128, norm='', cmap='', nproc=None,
+			force=False):
+	if not os.path.exists(outdir):
+		os.makedirs(outdir)
+	manifest = os.path.join(outdir, 'gallery.json')
+	done = {}
+	if os.path.exists(manifest) and not force:
+		with open(manifest, 'r') as f:
+			done = json.load(f)
+	files = find_fits(indir, pattern)
+	todo = []
+	state = {}
+	for infile in files:
+		key = os.path.abspath(infile)
+		st = os.stat(infile)
+		stamp = [st.st_size, st.st_mtime]
+		old = done.get(key)
+		if old is not None and old['stamp'] == stamp and old.get('params') == [size, norm, cmap]:
+			state[key] = old
+		else:
+			todo.append(infile)
+			state[key] = {'stamp': stamp, 'params': [size, norm, cmap]}
+	print('%d images, %d to render' % (len(files), len(todo)))
+	if nproc is None:
+		nproc = os.cpu_count()
+	jobs = [(f, outdir, size, norm, cmap) for f in todo]
+	if nproc > 1 and len(jobs) > 1:
+		with Pool(min(nproc, len(jobs))) as pool:
+			metas = pool.map(safe_render, jobs, chunksize=1)
+	else:
+		metas = [safe_render(job) for job in jobs]
+	for infile, meta in zip(todo, metas):
+		if 'error' in meta:
+			print('Skip %s: %s' % (infile, meta['error']))
+			state[os.path.abspath(infile)]['error'] = meta['error']
+		else:
+			state[os.path.abspath(infile)]['meta'] = meta
+	with open(manifest, 'w') as f:
+		json.dump(state, f, indent=1)
+
+	sources = {}
+	for key in state:
+		if 'meta' not in state[key]:
+			continue
+		meta = state[key]['meta']
+		sources.setdefault(meta['source'], []).append(meta)
+	for source in sources:
+		with open(os.path.join(outdir, source, 'index.html'), 'w') as f:
+			f.write(source_page(source, sources[source]))
+	with open(os.path.join(outdir, 'index.html'), 'w') as f:
+		f.write(archive_page(sources))
+
+def myhelp():
+	print('Help: gallery.py <archive> <gallery>')
+	print("  or: gallery.py -i <archive> -o <gallery> -p '*.icn.fits' -n 'power 0.5' --colormap gnuplot2 -j 8")
+
+def main(argv):
+	indir = ''
+	outdir = ''
+	pattern = '*.icn.fits'
+	size = 128
+	norm = ''
+	colormap = ''
+	nproc = None
+	force = False
+
+	try:
+		opts, args = getopt.getopt(argv, "hi:o:p:s:n:j:F",
+							 ['help', 'indir=', 'outdir=', 'pattern=', 'size=', 'norm=',
+		 'colormap=', 'nproc=', 'force'])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-i', '--indir'):
+			indir = arg
+		elif opt in ('-o', '--outdir'):
+			outdir = arg
+		elif opt in ('-p', '--pattern'):
+			pattern = arg
+		elif opt in ('-s', '--size'):
+			size = int(arg)
+		elif opt in ('-n', '--norm'):
+			norm = arg
+		elif opt in ('--colormap', ):
+			colormap = arg
+		elif opt in ('-j', '--nproc'):
+			nproc = int(arg)
+		elif opt in ('-F', '--force'):
+			force = True
+	if indir == '' and len(args) == 2:
+		indir, outdir = args
+	if indir == '':
+		myhelp()
+		sys.exit(2)
+	if outdir == '':
+		outdir = 'gallery'
+	gallery(indir, outdir, pattern, size, norm, colormap, nproc, force)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 30 10:45:13 2026
+
+This program is use to process a whole archive (e.g. a mirror of dluv.py) on
+many nodes of a cluster with a shared file system. The work is a manifest of
+items, every fits file x every program x every parameter set:
+	jobs.py make ...	write the manifest <jobdir>/manifest.jsonl
+	jobs.py run ...		process the items, on every node
+	jobs.py status ...	print the progress and the throughput of every node
+The programs are the commands of vlpy.py (contour, map, thumb, noisemap ...),
+run in the worker process one after another, so python and the modules are
+started once. A parameter set is a line "name = options" of a file, where
+{infile} is the fits file, {base} the fits file without .fits and {out} the
+output in the output directory (same sub directories as the archive) without
+extension, e.g.
+	deep = -i {infile} -o {out}.png -c 1e-3 -n 'power 0.5'
+The default set is "default = -i {infile} -o {out}.png", and the default program
+is thumb. A set without the options a program needs (e.g. -c or -s of map) is
+rejected when the manifest is made.
+An item is claimed by creating <jobdir>/lock/<id>.lock exclusively (O_EXCL),
+so only one worker of all nodes processes it. A finished item is recorded in
+<jobdir>/done/<id>.json, and a failed one in <jobdir>/failed/<id>.<n>.json,
+and it is tried again up to -r or --retry times. The print of every item is
+in <jobdir>/log/<id>.log. A lock of a dead worker (on the same host) or older
+than --stale hours is broken, so an interrupted run is resumed by running
+"jobs.py run" again; the done items are skipped. The ids are the hash of the
+file, program and set, so the manifest can be made again for new files.
+A worker processes all items, or a shard of them by -s or --shard "k/n"
+(items k, k+n, k+2n ...). Its node name is the host name, or --node, so many
+local processes (-j or --nproc) or "--node n1" and "--node n2" can test it
+without a cluster. The local processes are not daemonic, so the programs can
+start their own pools (tiles, gallery, -j of contour ...).
+
+Installation:
+1. copy file
+	chmod a+x jobs.py
+	cp jobs.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	jobs.py make -i <archive> -o <outdir> -p '*.icn.fits' -t 'map thumb' -P <sets.txt> <jobdir>
+	jobs.py make -i <archive> -t 'contour thumb' <jobdir>
+	jobs.py run -j 8 <jobdir>
+	jobs.py run -s 0/4 -r 2 --node n1 <jobdir>
+	jobs.py status <jobdir>
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import getopt
+import hashlib
+
+# options of which a program needs one, for the check of the parameter sets
+REQUIRED = {
+	'map': ('-c', '--cmul', '-s', '--snr'),
+	'pol': ('-c', '--cmul'),
+}
+
+def read_sets(infile=''):
+# {name: options} of the parameter sets
+	if infile == '':
+		return {'default': '-i {infile} -o {out}.png'}
+	sets = {}
+	with open(infile, 'r') as f:
+		for line in f:
+			line = line.strip()
+			if line == '' or line.startswith('#') or '=' not in line:
+				continue
+			name, options = [s.strip() for s in line.split('=', 1)]
+			sets[name] = options
+	return sets
+
+def has_option(argv, options):
+	for arg in argv:
+		for opt in options:
+			if arg == opt or (opt.startswith('--') and arg.startswith(opt + '=')) \
+				or (not opt.startswith('--') and arg.startswith(opt) and len(arg) > 2):
+				return True
+	return False
+
+def check_sets(tools, sets):
+# a set without the required options fails on every item, so it is not queued
+	import shlex
+	for tool in tools:
+		for name, options in sets.items():
+			if tool in REQUIRED and not has_option(shlex.split(options), REQUIRED[tool]):
+				raise ValueError('The set %s of %s needs one of the options %s' % (name, tool,
+					' '.join(REQUIRED[tool])))
+
+def item_id(infile, tool, name):
+	return hashlib.sha1(('%s|%s|%s' % (infile, tool, name)).encode()).hexdigest()[:16]
+
+def make_manifest(jobdir, indir, outdir, tools, sets, pattern='*.icn.fits'):
+	import shlex
+	from gallery import find_fits
+	from vlpy import COMMANDS
+	for tool in tools:
+		if tool not in COMMANDS:
+			raise ValueError('Unknown program: %s' % tool)
+	check_sets(tools, sets)
+	items = []
+	for infile in find_fits(indir, pattern):
+		infile = os.path.abspath(infile)
+		base = infile[:-5] if infile.lower().endswith('.fits') else infile
+		rel = os.path.relpath(base, os.path.abspath(indir))
+		for tool in tools:
+			for name, options in sets.items():
+				out = os.path.join(os.path.abspath(outdir), '%s.%s.%s' % (rel, tool, name))
+				argv = [s.format(infile=infile, base=base, out=out) for s in shlex.split(options)]
+				items.append({'id': item_id(infile, tool, name), 'file': infile, 'tool': tool,
+					'set': name, 'out': out, 'argv': argv})
+	for sub in ('lock', 'done', 'failed', 'log'):
+		os.makedirs(os.path.join(jobdir, sub), exist_ok=True)
+	manifest = os.path.join(jobdir, 'manifest.jsonl')
+	with open(manifest + '.tmp', 'w') as f:
+		for item in items:
+			f.write(json.dumps(item) + '\n')
+	os.replace(manifest + '.tmp', manifest)
+	return items
+
+def read_manifest(jobdir):
+	with open(os.path.join(jobdir, 'manifest.jsonl'), 'r') as f:
+		return [json.loads(line) for line in f if line.strip() != '']
+
+def path(jobdir, sub, name):
+	return os.path.join(jobdir, sub, name)
+
+def attempts(jobdir, iid):
+	return len([f for f in os.listdir(os.path.join(jobdir, 'failed')) if f.startswith(iid + '.')])
+
+def write_json(infile, rec):
+# a record appears complete or not at all
+	with open(infile + '.tmp.%d' % os.getpid(), 'w') as f:
+		json.dump(rec, f)
+	os.replace(infile + '.tmp.%d' % os.getpid(), infile)
+
+def alive(pid):
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		return True
+# a killed worker may be a zombie
+	try:
+		with open('/proc/%d/stat' % pid, 'r') as f:
+			return f.read().rsplit(')', 1)[-1].split()[0] != 'Z'
+	except OSError:
+		return True
+
+def stale_lock(lock, stale):
+# the lock of a dead worker on this host, or an old lock
+	try:
+		with open(lock, 'r') as f:
+			text = f.read()
+		st = os.stat(lock)
+	except OSError:
+		return None
+	try:
+		info = json.loads(text)
+	except ValueError:
+	# a lock being written
+		return None if time.time() - st.st_mtime < 60 else text
+	if info.get('host') == socket.gethostname() and not alive(info['pid']):
+		return text
+	return text if time.time() - st.st_mtime > stale else None
+
+def break_lock(lock, text):
+	broken = lock + '.broken.%d' % os.getpid()
+	try:
+		os.rename(lock, broken)
+	except OSError:
+		return
+	with open(broken, 'r') as f:
+		if f.read() != text:
+		# another worker has claimed it again meanwhile, give it back
+			try:
+				os.link(broken, lock)
+			except OSError:
+				pass
+	os.remove(broken)
+
+def claim(jobdir, iid, node, stale=6*3600):
+	lock = path(jobdir, 'lock', iid + '.lock')
+	for i in range(2):
+		try:
+			fd = os.open(lock, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+		except FileExistsError:
+			text = stale_lock(lock, stale)
+			if text is None or i > 0:
+				return False
+			print('Break the lock of %s: %s' % (iid, text.strip()))
+			break_lock(lock, text)
+			continue
+		with os.fdopen(fd, 'w') as f:
+			json.dump({'node': node, 'host': socket.gethostname(), 'pid': os.getpid(),
+				'time': time.time()}, f)
+		return True
+	return False
+
+def release(jobdir, iid):
+	try:
+		os.remove(path(jobdir, 'lock', iid + '.lock'))
+	except FileNotFoundError:
+		pass
+
+def run_item(jobdir, item):
+# exit status of the program and the last lines of its print
+	import importlib
+	import contextlib
+	import traceback
+	import matplotlib.pyplot as plt
+	from vlpy import COMMANDS
+	os.makedirs(os.path.dirname(item['out']), exist_ok=True)
+	status = 0
+	logfile = path(jobdir, 'log', item['id'] + '.log')
+	with open(logfile, 'w') as log:
+		with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+			print('%s %s' % (item['tool'], ' '.join(item['argv'])))
+			try:
+				importlib.import_module(COMMANDS[item['tool']][0]).main(item['argv'])
+			except SystemExit as e:
+				status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+			except Exception:
+				traceback.print_exc()
+				status = 1
+			finally:
+				plt.close('all')
+	with open(logfile, 'r') as f:
+		return status, ''.join(f.readlines()[-5:])
+
+def worker(jobdir, node='', shard=None, retry=1, stale=6*3600):
+	import random
+	import matplotlib
+	matplotlib.use('Agg')
+	if node == '':
+		node = socket.gethostname()
+	items = read_manifest(jobdir)
+	if shard is not None:
+		items = items[shard[0]::shard[1]]
+# start at a random item, the workers do not claim the same items one by one
+	k = random.randrange(len(items)) if len(items) > 0 else 0
+	items = items[k:] + items[:k]
+	n = 0
+	for item in items:
+		iid = item['id']
+		if os.path.exists(path(jobdir, 'done', iid + '.json')):
+			continue
+		while attempts(jobdir, iid) <= retry:
+			if not claim(jobdir, iid, node, stale):
+				break
+		# done by another worker before the claim
+			if os.path.exists(path(jobdir, 'done', iid + '.json')):
+				release(jobdir, iid)
+				break
+			n_try = attempts(jobdir, iid)
+			start = time.time()
+			status, tail = run_item(jobdir, item)
+			rec = {'id': iid, 'node': node, 'pid': os.getpid(), 'start': start,
+				'end': time.time(), 'status': status, 'attempt': n_try + 1}
+			if status == 0:
+				write_json(path(jobdir, 'done', iid + '.json'), rec)
+				release(jobdir, iid)
+				n += 1
+				break
+			rec['error'] = tail
+			write_json(path(jobdir, 'failed', '%s.%d.json' % (iid, n_try + 1)), rec)
+			release(jobdir, iid)
+			print('%s failed (%d): %s %s' % (node, n_try + 1, item['tool'], item['file']))
+	return n
+
+def run(jobdir, nproc=1, node='', shard=None, retry=1, stale=6*3600):
+	if nproc <= 1:
+		n = worker(jobdir, node, shard, retry, stale)
+		print('%d items done' % n)
+		return
+# processes, not a pool: the workers of a pool are daemonic and can not start the pools
+# of the programs
+	from multiprocessing import Process
+	ndone = len(os.listdir(os.path.join(jobdir, 'done')))
+	procs = [Process(target=worker, args=(jobdir, node, shard, retry, stale)) for k in range(nproc)]
+	for p in procs:
+		p.start()
+	for p in procs:
+		p.join()
+	print('%d items done by %d processes' % (len(os.listdir(os.path.join(jobdir, 'done'))) - ndone,
+		nproc))
+
+def read_records(jobdir, sub):
+	recs = []
+	for name in sorted(os.listdir(os.path.join(jobdir, sub))):
+		if name.endswith('.json'):
+			with open(path(jobdir, sub, name), 'r') as f:
+				recs.append(json.load(f))
+	return recs
+
+def status(jobdir, retry=1):
+	items = read_manifest(jobdir)
+	ids = set([item['id'] for item in items])
+	done = [rec for rec in read_records(jobdir, 'done') if rec['id'] in ids]
+	failed = [rec for rec in read_records(jobdir, 'failed') if rec['id'] in ids]
+	done_ids = set([rec['id'] for rec in done])
+	locks = set([name[:-5] for name in os.listdir(os.path.join(jobdir, 'lock'))
+		if name.endswith('.lock')])
+	tries = {}
+	for rec in failed:
+		tries[rec['id']] = max(tries.get(rec['id'], 0), rec['attempt'])
+	given_up = set([iid for iid in tries if iid not in done_ids and tries[iid] > retry])
+	running = (locks & ids) - done_ids
+	print('%d items: %d done, %d running, %d failed, %d pending' % (len(items), len(done_ids),
+		len(running), len(given_up), len(ids - done_ids - running - given_up)))
+	nodes = {}
+	for rec in done + failed:
+		nodes.setdefault(rec['node'], []).append(rec)
+	if len(nodes) > 0:
+		print('  %-16s %7s %7s %9s %9s %9s %9s' % ('node', 'done', 'failed', 'busy(s)',
+			'wall(s)', 'items/h', 's/item'))
+	for node in sorted(nodes):
+		recs = nodes[node]
+		ndone = len([rec for rec in recs if rec['status'] == 0])
+		busy = sum([rec['end'] - rec['start'] for rec in recs])
+		wall = max([rec['end'] for rec in recs]) - min([rec['start'] for rec in recs])
+		print('  %-16s %7d %7d %9.1f %9.1f %9.1f %9.2f' % (node, ndone, len(recs) - ndone,
+			busy, wall, ndone/wall*3600 if wall > 0 else 0.0, busy/len(recs)))
+	if len(done) > 0:
+		wall = max([rec['end'] for rec in done + failed]) - min([rec['start'] for rec in done + failed])
+		print('  %-16s %7d %7d %9s %9.1f %9.1f' % ('all', len(done), len(failed), '', wall,
+			len(done)/wall*3600 if wall > 0 else 0.0))
+	for iid in sorted(given_up):
+		rec = [rec for rec in failed if rec['id'] == iid and rec['attempt'] == tries[iid]][0]
+		item = [item for item in items if item['id'] == iid][0]
+		print('Failed: %s %s (%s)' % (item['tool'], item['file'], rec['error'].strip().split('\n')[-1]))
+
+def myhelp():
+	print("Help: jobs.py make -i <archive> -o <outdir> -p '*.icn.fits' -t 'map thumb' -P <sets.txt> <jobdir>")
+	print('  or: jobs.py run -j <8> -s <0/4> -r <2> --node <n1> --stale <6> <jobdir>')
+	print('  or: jobs.py status <jobdir>')
+
+def main(argv):
+	indir = ''
+	outdir = ''
+	pattern = '*.icn.fits'
+	tools = ['thumb']
+	setfile = ''
+	nproc = 1
+	shard = None
+	retry = 1
+	node = ''
+	stale = 6.0
+
+	if len(argv) == 0 or argv[0] not in ('make', 'run', 'status'):
+		myhelp()
+		sys.exit(0 if len(argv) > 0 and argv[0] in ('-h', '--help') else 2)
+	try:
+		opts, args = getopt.getopt(argv[1:], "hi:o:p:t:P:j:s:r:",
+							 ['help', 'indir=', 'outdir=', 'pattern=', 'tools=', 'sets=',
+		 'nproc=', 'shard=', 'retry=', 'node=', 'stale='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-i', '--indir'):
+			indir = arg
+		elif opt in ('-o', '--outdir'):
+			outdir = arg
+		elif opt in ('-p', '--pattern'):
+			pattern = arg
+		elif opt in ('-t', '--tools'):
+			tools = arg.split()
+		elif opt in ('-P', '--sets'):
+			setfile = arg
+		elif opt in ('-j', '--nproc'):
+			nproc = int(arg)
+		elif opt in ('-s', '--shard'):
+			shard = tuple(map(int, arg.split('/')))
+		elif opt in ('-r', '--retry'):
+			retry = int(arg)
+		elif opt in ('--node', ):
+			node = arg
+		elif opt in ('--stale', ):
+			stale = float(arg)
+	if len(args) != 1:
+		myhelp()
+		sys.exit(2)
+	jobdir = args[0]
+	if argv[0] == 'make':
+		if indir == '':
+			myhelp()
+			sys.exit(2)
+		if outdir == '':
+			outdir = os.path.join(jobdir, 'out')
+		items = make_manifest(jobdir, indir, outdir, tools, read_sets(setfile), pattern)
+		print('%d items in %s' % (len(items), os.path.join(jobdir, 'manifest.jsonl')))
+	elif argv[0] == 'run':
+		run(jobdir, nproc, node, shard, retry, stale*3600)
+	else:
+		status(jobdir, retry)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
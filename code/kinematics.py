@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:12:37 2026
+
+This program is use to measure the jet kinematics from model fits of many epochs.
+It reads the AIPS CC table of every input file (the same files used by cc2tex.py),
+shifts every epoch so that the core is at (0, 0), links the components between
+epochs by nearest neighbour matching and fits the proper motion of every
+component with a linear model x(t), y(t).
+A component is linked within the radius of the position predicted by its
+velocity. A component seen in one epoch only has no velocity yet, so it is
+linked within radius + vmax * (time between the epochs), vmax is the largest
+proper motion expected (-v).
+You can specify the input files by -i or --infile,
+	separation vs time plot by -o or --outfile,
+	velocity table by -t or --table,
+	matching radius (mas) by -r or --radius,
+	largest proper motion (mas/yr) of the first link by -v or --vmax,
+	minimum number of epochs of a fitted component by -n or --nmin,
+	redshift by -z or --redshift
+	component database by -D or --db and source name by -s or --source
+
+Installation:
+1. copy file
+	chmod a+x kinematics.py
+	cp kinematics.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	kinematics.py <epoch1.fits> <epoch2.fits> ...
+	kinematics.py -i "<epoch1.fits> <epoch2.fits> ..." -o <sepvstime.pdf> -t <vel.txt>
+	kinematics.py -r 0.5 -v 1.0 -n 3 -z 1.037 -o sepvstime.png -t vel.tex -f latex 20*/*.fits
+	kinematics.py -D comps.db -s CTA102 -o sepvstime.png -t vel.txt
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import sys
+import getopt
+import numpy as np
+import matplotlib.pyplot as plt
+from astropy.io import fits
+from astropy.table import Table
+from astropy.time import Time
+from scipy.spatial import cKDTree
+
+def read_epoch(infile, core='first'):
+	with fits.open(infile) as hdul:
+		h = hdul[0].header
+		cc = hdul[1].data
+		x = cc['DELTAX'] * 3.6E6
+		y = cc['DELTAY'] * 3.6E6
+		flux = cc['FLUX'] * 1.0
+		d = cc['MAJOR AX'] * 3.6E6
+	epoch = Time(h['date-obs']).decimalyear
+	return set_core(epoch, x, y, flux, d, core)
+
+def set_core(epoch, x, y, flux, d, core='first'):
+	if x.size == 0:
+		return epoch, x, y, flux, d
+	if core == 'brightest':
+		i = np.argmax(flux)
+	else:
+		i = 0
+# move the core to (0, 0) and put it at the first row
+	x, y = x - x[i], y - y[i]
+	order = np.r_[i, np.delete(np.arange(x.size), i)]
+	return epoch, x[order], y[order], flux[order], d[order]
+
+def link_components(epochs, radius=0.5, maxgap=3.0, vmax=1.0):
+	nepoch = len(epochs)
+	cid = [np.full(ep[1].size, -1, dtype=int) for ep in epochs]
+	# track state: last position, last epoch, velocity and epochs of every component
+	last_xy = np.zeros((0, 2))
+	last_t = np.zeros(0)
+	vel = np.zeros((0, 2))
+	seen = np.zeros(0, dtype=int)
+	ntrack = 1 	# track 0 is the core
+	for k in range(nepoch):
+		t, x, y = epochs[k][:3]
+		if x.size == 0:
+			continue
+		cid[k][0] = 0
+		xy = np.c_[x[1:], y[1:]]
+		if xy.shape[0] == 0:
+			continue
+		match = np.full(xy.shape[0], -1, dtype=int)
+		alive = np.flatnonzero(t - last_t <= maxgap)
+		if alive.size > 0:
+			pred = last_xy[alive] + vel[alive] * (t - last_t[alive])[:, None]
+		# no velocity of the components seen once, search within the largest motion
+			r = np.where(seen[alive] > 1, radius, radius + vmax * (t - last_t[alive]))
+			tree = cKDTree(xy)
+			kmax = min(3, xy.shape[0])
+			dist, idx = tree.query(pred, k=kmax, distance_upper_bound=r.max())
+			dist, idx = dist.reshape(alive.size, kmax), idx.reshape(alive.size, kmax)
+			ok = dist <= r[:, None]
+			trk = np.repeat(alive, kmax).reshape(alive.size, kmax)[ok]
+			comp, dist = idx[ok], dist[ok]
+			# greedy one-to-one assignment, closest pairs first
+			used_trk = set()
+			for j in np.argsort(dist, kind='stable'):
+				if match[comp[j]] >= 0 or trk[j] in used_trk:
+					continue
+				match[comp[j]] = trk[j]
+				used_trk.add(trk[j])
+		new = np.flatnonzero(match < 0)
+		match[new] = np.arange(ntrack, ntrack + new.size) - 1
+		ntrack += new.size
+		last_xy = np.r_[last_xy, np.zeros((new.size, 2))]
+		last_t = np.r_[last_t, np.full(new.size, t)]
+		vel = np.r_[vel, np.zeros((new.size, 2))]
+		seen = np.r_[seen, np.zeros(new.size, dtype=int)]
+		old = np.setdiff1d(np.arange(xy.shape[0]), new)
+		dt = t - last_t[match[old]]
+		dt[dt == 0] = np.inf
+		vel[match[old]] = (xy[old] - last_xy[match[old]]) / dt[:, None]
+		last_xy[match] = xy
+		last_t[match] = t
+		seen[match] += 1
+		cid[k][1:] = match + 1
+	return cid
+
+def fit_motion(tid, t, x, y, nmin=3):
+# fit x = x0 + mux * (t-tm) and y = y0 + muy * (t-tm) for all components at once
+	ntrack = tid.max() + 1
+	n = np.bincount(tid, minlength=ntrack).astype(float)
+	with np.errstate(invalid='ignore', divide='ignore'):
+		tm = np.bincount(tid, t, ntrack) / n
+		dt = t - tm[tid]
+		stt = np.bincount(tid, dt*dt, ntrack)
+		x0 = np.bincount(tid, x, ntrack) / n
+		y0 = np.bincount(tid, y, ntrack) / n
+		mux = np.bincount(tid, dt*x, ntrack) / stt
+		muy = np.bincount(tid, dt*y, ntrack) / stt
+		rx = x - x0[tid] - mux[tid]*dt
+		ry = y - y0[tid] - muy[tid]*dt
+		dof = np.maximum(n - 2, 1)
+		emux = np.sqrt(np.bincount(tid, rx*rx, ntrack) / dof / stt)
+		emuy = np.sqrt(np.bincount(tid, ry*ry, ntrack) / dof / stt)
+		mu = np.hypot(mux, muy)
+		emu = np.hypot(mux*emux, muy*emuy) / mu
+		pa = np.degrees(np.arctan2(mux, muy)) % 360.0
+	# epoch of the closest approach to the core
+		t0 = tm - (x0*mux + y0*muy) / mu**2
+	t = Table()
+	t['comp'] = ['C'] + ['J%d' % i for i in range(1, ntrack)]
+	t['n'] = n.astype(int)
+	t['epoch'] = tm
+	t['x'] = x0
+	t['y'] = y0
+	t['mux'] = mux
+	t['muy'] = muy
+	t['mu'] = mu
+	t['emu'] = emu
+	t['pa'] = pa
+	t['t0'] = t0
+	t = t[(n >= nmin) & (np.arange(ntrack) > 0)]
+	for col in ('epoch', 't0'):
+		t[col].info.format = '%.2f'
+	for col in ('x', 'y', 'mux', 'muy', 'mu', 'emu'):
+		t[col].info.format = '%.3f'
+	t['pa'].info.format = '%.1f'
+	t['x'].unit = 'mas'
+	t['y'].unit = 'mas'
+	t['mux'].unit = 'mas/yr'
+	t['muy'].unit = 'mas/yr'
+	t['mu'].unit = 'mas/yr'
+	t['emu'].unit = 'mas/yr'
+	t['pa'].unit = 'deg'
+	return t
+
+def beta_app(mu, z):
+	from astropy.cosmology import Planck18
+	import astropy.units as u
+	import astropy.constants as const
+	dl = Planck18.luminosity_distance(z)
+	mu = (mu * u.mas / u.yr).to(u.rad / u.s) / u.rad
+	beta = mu * dl / (const.c * (1 + z))
+	return beta.decompose().value
+
+def plot_sepvstime(ax, tid, t, r, vt):
+	for row in vt:
+		i = int(row['comp'][1:])
+		sel = tid == i
+		p = ax.plot(t[sel], r[sel], 'o', ms=4, label=row['comp'])
+		tt = np.array([t[sel].min(), t[sel].max()])
+		dt = tt - row['epoch']
+		rr = np.hypot(row['x'] + row['mux']*dt, row['y'] + row['muy']*dt)
+		ax.plot(tt, rr, '-', lw=1, color=p[0].get_color())
+	ax.set_xlabel('Epoch (yr)')
+	ax.set_ylabel('Separation from core (mas)')
+	ax.tick_params(which='both', direction='in', right=True, top=True)
+	ax.minorticks_on()
+	if len(vt) <= 20:
+		ax.legend(fontsize='small', ncol=2)
+
+def kinematics(infiles, outfile='', tabfile='', radius=0.5, nmin=3, z=None,
+			   fmt='', core='first', figsize=None, dpi=100, epochs=None, vmax=1.0):
+	if epochs is None:
+		epochs = [read_epoch(f, core) for f in infiles]
+	empty = [ep[0] for ep in epochs if ep[1].size == 0]
+	if len(empty) > 0:
+		print('Skip %d epochs without components: %s' % (len(empty),
+			' '.join('%.2f' % t for t in empty)))
+	epochs = sorted([ep for ep in epochs if ep[1].size > 0], key=lambda ep: ep[0])
+	if len(epochs) == 0:
+		print('No components')
+		return None
+	cid = link_components(epochs, radius, vmax=vmax)
+	tid = np.concatenate(cid)
+	t = np.concatenate([np.full(ep[1].size, ep[0]) for ep in epochs])
+	x = np.concatenate([ep[1] for ep in epochs])
+	y = np.concatenate([ep[2] for ep in epochs])
+	vt = fit_motion(tid, t, x, y, nmin)
+	if z is not None:
+		vt['beta'] = beta_app(vt['mu'].data, z)
+		vt['beta'].info.format = '%.2f'
+	print('%d epochs, %d components, %d moving components'
+	   % (len(epochs), tid.size, len(vt)))
+
+	if outfile != '':
+		if figsize is None:
+			figsize = (7, 5)
+		fig, ax = plt.subplots()
+		fig.set_size_inches(figsize)
+		plot_sepvstime(ax, tid, t, np.hypot(x, y), vt)
+		fig.tight_layout(pad=0.5)
+		if outfile.lower().endswith('.pdf'):
+			plt.savefig(outfile)
+		else:
+			plt.savefig(outfile, dpi=dpi)
+	if tabfile != '':
+		if fmt in ['l', 'latex']:
+			fmt = 'ascii.latex'
+		elif fmt in ['a', 'aas', 'aastex']:
+			fmt = 'ascii.aastex'
+		elif fmt == '':
+			fmt = 'ascii.fixed_width_two_line'
+		vt.write(tabfile, format=fmt, overwrite=True)
+	else:
+		print(vt)
+	return vt
+
+def myhelp():
+	print('Help: kinematics.py <epoch1.fits> <epoch2.fits> ...')
+	print('  or: kinematics.py -i "<epoch1.fits> <epoch2.fits> ..." -o <sepvstime.pdf> -t <vel.txt>')
+	print('  or: kinematics.py -r <0.5> -v <1.0> -n <3> -z <1.037> -f latex -o <sepvstime.png> -t <vel.tex> <epoch*.fits>')
+	print('  or: kinematics.py -D <comps.db> -s <source> -o <sepvstime.pdf> -t <vel.txt>')
+
+def main(argv):
+	infiles = []
+	outfile = 'sepvstime.pdf'
+	tabfile = ''
+	radius = 0.5
+	vmax = 1.0
+	nmin = 3
+	z = None
+	fmt = ''
+	core = 'first'
+	figsize = None
+	dpi = 100
+	dbfile = ''
+	source = ''
+
+	try:
+		opts, args = getopt.getopt(argv, "hi:o:t:r:v:n:z:f:c:d:D:s:",
+							 ['help', 'infile=', 'outfile=', 'table=', 'radius=', 'vmax=',
+		 'nmin=', 'redshift=', 'format=', 'core=', 'figsize=', 'dpi=', 'db=', 'source='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-i', '--infile'):
+			infiles = arg.split()
+		elif opt in ('-o', '--outfile'):
+			outfile = arg
+		elif opt in ('-t', '--table'):
+			tabfile = arg
+		elif opt in ('-r', '--radius'):
+			radius = float(arg)
+		elif opt in ('-v', '--vmax'):
+			vmax = float(arg)
+		elif opt in ('-n', '--nmin'):
+			nmin = int(arg)
+		elif opt in ('-z', '--redshift'):
+			z = float(arg)
+		elif opt in ('-f', '--format'):
+			fmt = arg
+		elif opt in ('-c', '--core'):
+			core = arg
+		elif opt in ('--figsize', ):
+			figsize = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-d', '--dpi'):
+			dpi = int(arg)
+		elif opt in ('-D', '--db'):
+			dbfile = arg
+		elif opt in ('-s', '--source'):
+			source = arg
+	epochs = None
+	if dbfile != '':
+		from ccdb import ingest, read_epochs
+		if len(args) > 0:
+			ingest(dbfile, args)
+		epochs = [set_core(*ep, core=core) for ep in read_epochs(dbfile, source)]
+	else:
+		if len(infiles) == 0:
+			infiles = args
+		if len(infiles) < 2:
+			myhelp()
+			sys.exit(2)
+	kinematics(infiles, outfile, tabfile, radius, nmin, z, fmt, core, figsize, dpi, epochs, vmax)
+
+if __name__ == '__main__' :
+	main(sys.argv[1:])
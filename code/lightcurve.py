@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:41:18 2026
+
+This program is use to extract the light curves of the core and jet regions
+from the fits images of many epochs.
+The integrated flux density (Jy) and the peak (Jy/beam) of every region are
+measured on every image, and written to a table sorted by date-obs.
+Only the part of the image that covers the regions is read from the file
+(memory mapping), and the images are measured by a pool of processes.
+You can specify the input images by -i or --infile,
+	region file by -r or --region,
+	output table by -o or --outfile,
+	light curve plot by -p or --plot,
+	number of processes by -j or --nproc
+
+Region file:
+Every line of the region file is a region. The coordinates are relative
+R.A. and Dec. in mas, the same as win in contour.py and mapplot.py.
+	core, C, 0, 0				beam-sized ellipse at (0, 0). An optional 5th value scales the beam.
+	box, J1, 5, -5, -10, 0		box of left, right, bottom, top
+	polygon, J2, x1, y1, x2, y2, x3, y3, ...
+
+Installation:
+1. copy file
+	chmod a+x lightcurve.py
+	cp lightcurve.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	lightcurve.py <epoch1.fits> <epoch2.fits> ...
+	lightcurve.py -r <regions.txt> -o <lc.txt> -p <lc.pdf> <epoch1.fits> <epoch2.fits> ...
+	lightcurve.py -i "<epoch1.fits> <epoch2.fits>" -r <regions.txt> -j 8
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import getopt
+import numpy as np
+from multiprocessing import Pool
+from astropy.io import fits
+from astropy.table import Table
+from astropy.time import Time
+from matplotlib.path import Path
+
+def read_regions(infile=''):
+	regions = []
+	if infile == '':
+		regions.append(('core', 'C', [0.0, 0.0]))
+		return regions
+	with open(infile, 'r') as f:
+		for line in f.readlines():
+			row = [col.strip() for col in line.split(',')]
+			if len(row) < 4 or row[0].startswith('#'):
+				continue
+			typ, name = row[0], row[1]
+			args = np.array(row[2:], dtype=np.float64).tolist()
+			if typ not in ('core', 'box', 'polygon'):
+				print('Unknown region type: %s' % typ)
+				sys.exit(1)
+			regions.append((typ, name, args))
+	return regions
+
+def region_bounds(regions, h):
+# the box (mas) that covers all regions
+	xs, ys = [], []
+	bmaj = h['bmaj'] * 3.6E6
+	for typ, name, args in regions:
+		if typ == 'core':
+			scale = args[2] if len(args) > 2 else 1.0
+			xs += [args[0] - bmaj*scale, args[0] + bmaj*scale]
+			ys += [args[1] - bmaj*scale, args[1] + bmaj*scale]
+		elif typ == 'box':
+			xs += args[:2]
+			ys += args[2:4]
+		else:
+			xs += args[0::2]
+			ys += args[1::2]
+	return [max(xs), min(xs), min(ys), max(ys)]
+
+def world2pix(w, h):
+	x0, x1, y0, y1 = w
+	X0 = h['crpix1'] + x0/(h['cdelt1']*3.6E6)
+	Y0 = h['crpix2'] + y0/(h['cdelt2']*3.6E6)
+	X1 = h['crpix1'] + x1/(h['cdelt1']*3.6E6)
+	Y1 = h['crpix2'] + y1/(h['cdelt2']*3.6E6)
+	X0, X1 = sorted([X0, X1])
+	Y0, Y1 = sorted([Y0, Y1])
+	X0, Y0 = max(int(X0), 0), max(int(Y0), 0)
+	X1, Y1 = min(int(X1)+2, h['naxis1']), min(int(Y1)+2, h['naxis2'])
+	return [X0, X1, Y0, Y1]
+
+def region_mask(typ, args, x, y, h):
+	if typ == 'core':
+		scale = args[2] if len(args) > 2 else 1.0
+		bmaj = h['bmaj'] * 3.6E6 * scale
+		bmin = h['bmin'] * 3.6E6 * scale
+		bpa = np.radians(h['bpa'])
+		dx, dy = x - args[0], y - args[1]
+	# rotate to the beam frame, bpa is east of north
+		u = dx*np.sin(bpa) + dy*np.cos(bpa)
+		v = dx*np.cos(bpa) - dy*np.sin(bpa)
+		return (u/(bmaj/2))**2 + (v/(bmin/2))**2 <= 1.0
+	elif typ == 'box':
+		x0, x1, y0, y1 = args[:4]
+		return (x <= max(x0, x1)) & (x >= min(x0, x1)) & (y >= min(y0, y1)) & (y <= max(y0, y1))
+	else:
+		path = Path(np.reshape(args, (-1, 2)))
+		inside = path.contains_points(np.c_[x.ravel(), y.ravel()])
+		return inside.reshape(x.shape)
+
+def beam_area(h):
+# beam area in pixels
+	bmaj = h['bmaj'] / abs(h['cdelt1'])
+	bmin = h['bmin'] / abs(h['cdelt2'])
+	return np.pi * bmaj * bmin / (4.0 * np.log(2.0))
+
+def measure(args):
+	infile, regions = args
+	with fits.open(infile, memmap=True) as hdul:
+		h = hdul[0].header
+		W = world2pix(region_bounds(regions, h), h)
+	# only the window is read from the file
+		img = np.array(hdul[0].data[0, 0, W[2]:W[3], W[0]:W[1]], dtype=np.float64)
+	Y, X = np.mgrid[W[2]:W[3], W[0]:W[1]]
+	x = h['cdelt1']*3.6E6 * (X-h['crpix1'])
+	y = h['cdelt2']*3.6E6 * (Y-h['crpix2'])
+	area = beam_area(h)
+	res = [infile, str(h['date-obs']), Time(h['date-obs']).decimalyear]
+	for typ, name, rargs in regions:
+		mask = region_mask(typ, rargs, x, y, h)
+		if np.any(mask):
+			res += [np.sum(img[mask]) / area, np.max(img[mask])]
+		else:
+			res += [np.nan, np.nan]
+	return res
+
+def plot_lightcurve(t, regions, outfile, figsize=None, dpi=100):
+	import matplotlib.pyplot as plt
+	if figsize is None:
+		figsize = (7, 4)
+	fig, ax = plt.subplots()
+	fig.set_size_inches(figsize)
+	for typ, name, args in regions:
+		ax.plot(t['epoch'], t['%s_flux' % name], 'o-', ms=4, lw=1, label=name)
+	ax.set_xlabel('Epoch (yr)')
+	ax.set_ylabel('Flux density (Jy)')
+	ax.tick_params(which='both', direction='in', right=True, top=True)
+	ax.minorticks_on()
+	ax.legend(fontsize='small')
+	fig.tight_layout(pad=0.5)
+	if outfile.lower().endswith('.pdf'):
+		plt.savefig(outfile)
+	else:
+		plt.savefig(outfile, dpi=dpi)
+
+def lightcurve(infiles, regionfile='', outfile='', plotfile='', nproc=None,
+			   figsize=None, dpi=100):
+	regions = read_regions(regionfile)
+	if nproc is None:
+		nproc = os.cpu_count()
+	jobs = [(f, regions) for f in infiles]
+	if nproc > 1 and len(jobs) > 1:
+		with Pool(min(nproc, len(jobs))) as pool:
+			rows = pool.map(measure, jobs, chunksize=max(1, len(jobs)//(4*nproc)))
+	else:
+		rows = [measure(job) for job in jobs]
+	names = ['file', 'date-obs', 'epoch']
+	for typ, name, args in regions:
+		names += ['%s_flux' % name, '%s_peak' % name]
+	t = Table(rows=rows, names=names)
+	t.sort('epoch')
+	t['epoch'].info.format = '%.3f'
+	for typ, name, args in regions:
+		t['%s_flux' % name].info.format = '%.4f'
+		t['%s_flux' % name].unit = 'Jy'
+		t['%s_peak' % name].info.format = '%.4f'
+		t['%s_peak' % name].unit = 'Jy/beam'
+	if outfile == '':
+		t.pprint(max_lines=-1, max_width=-1)
+	else:
+		t.write(outfile, format='ascii.fixed_width_two_line', overwrite=True)
+	if plotfile != '':
+		plot_lightcurve(t, regions, plotfile, figsize, dpi)
+	return t
+
+def myhelp():
+	print('Help: lightcurve.py <epoch1.fits> <epoch2.fits> ...')
+	print('  or: lightcurve.py -r <regions.txt> -o <lc.txt> -p <lc.pdf> <epoch1.fits> <epoch2.fits> ...')
+	print('  or: lightcurve.py -i "<epoch1.fits> <epoch2.fits>" -r <regions.txt> -j <8>')
+
+def main(argv):
+	infiles = []
+	regionfile = ''
+	outfile = ''
+	plotfile = ''
+	nproc = None
+	figsize = None
+	dpi = 100
+
+	try:
+		opts, args = getopt.getopt(argv, "hi:r:o:p:j:f:d:",
+							 ['help', 'infile=', 'region=', 'outfile=', 'plot=',
+		 'nproc=', 'figsize=', 'dpi='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-i', '--infile'):
+			infiles = arg.split()
+		elif opt in ('-r', '--region'):
+			regionfile = arg
+		elif opt in ('-o', '--outfile'):
+			outfile = arg
+		elif opt in ('-p', '--plot'):
+			plotfile = arg
+		elif opt in ('-j', '--nproc'):
+			nproc = int(arg)
+		elif opt in ('-f', '--figsize'):
+			figsize = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-d', '--dpi'):
+			dpi = int(arg)
+	if len(infiles) == 0:
+		infiles = args
+	if len(infiles) == 0:
+		myhelp()
+		sys.exit(2)
+	lightcurve(infiles, regionfile, outfile, plotfile, nproc, figsize, dpi)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 10:12:35 2026
+
+This module is the low memory mode of contour.py, mapplot.py and polplot.py.
+It is enabled by --lowmem <MB> of these programs or by the enviroment variable
+VLPY_MEMORY=<MB>, the budget of the peak resident memory of the process.
+An image plane is never read as a whole: the rows are read from the fits file
+in strips, which are as big as the free budget allows, and kept in float32.
+The rms (median of the image and the noise below it) is calculated by
+histograms of the strips, and the source is detected on a boolean mask, which
+is reduced by blocks (any pixel of a block) if its labels do not fit in the
+budget. The window is read and reduced by blocks (mean) strip by strip, by the
+factor of the output (mapplot.py), or by the smallest factor that fits in the
+budget. So a worker of fixed memory can plot a map of any size, with less
+details of a bigger map.
+
+Usage:
+	from lowmem import Plane, calc_rms, detect_source, read_window
+	p = Plane('cta102.fits', plane=(0, 0), budget=512)
+	rms = calc_rms(p)
+	bbox = detect_source(p, 3*rms)
+	img = read_window(p, [100, 400, 100, 400], f=2)
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import numpy as np
+from astropy.io import fits
+
+dtypes = {8: '>u1', 16: '>i2', 32: '>i4', 64: '>i8', -32: '>f4', -64: '>f8'}
+
+def get_budget(budget=None):
+# MB, None if the low memory mode is off
+	if budget is None and os.environ.get('VLPY_MEMORY', '') != '':
+		budget = float(os.environ['VLPY_MEMORY'])
+	return budget
+
+def rss():
+# resident memory of the process (MB)
+	from perflog import proc_status, peak_rss
+	mem = proc_status('VmRSS:')
+	return mem if mem is not None else peak_rss()
+
+def check_budget(budget):
+	from perflog import peak_rss
+	peak = peak_rss()
+	if peak > budget:
+		print('Peak memory %.0f MB is over the budget %.0f MB' % (peak, budget))
+
+class Plane:
+# an image plane of a fits file, read strip by strip
+	def __init__(self, infile, plane=(0, 0), budget=512):
+		with fits.open(infile, memmap=True) as hdul:
+			self.header = hdul[0].header
+			offset = hdul.fileinfo(0)['datLoc']
+		h = self.header
+		self.infile = infile
+		self.budget = budget
+		self.dtype = np.dtype(dtypes[h['bitpix']])
+		self.scale = (h.get('bscale', 1.0), h.get('bzero', 0.0))
+		self.ny, self.nx = h['naxis2'], h['naxis1']
+		nchan = h['naxis3'] if h['naxis'] > 2 else 1
+		self.offset = offset + (plane[1]*nchan + plane[0]) * self.ny * self.nx * self.dtype.itemsize
+
+	def free(self):
+	# bytes of the budget not used
+		return max(self.budget - rss(), 16.0) * 1024**2
+
+	def rows(self, y0, y1):
+		with open(self.infile, 'rb') as f:
+			f.seek(self.offset + y0 * self.nx * self.dtype.itemsize)
+			data = np.fromfile(f, dtype=self.dtype, count=(y1-y0)*self.nx)
+		data = data.astype(np.float32).reshape(y1-y0, self.nx)
+		if self.scale != (1.0, 0.0):
+			data *= self.scale[0]
+			data += self.scale[1]
+		return data
+
+	def strips(self, W=None, step=1, bpp=16):
+	# (y0, y1, rows of the window), rows of a strip is a multiple of step
+		X0, X1, Y0, Y1 = clip_window(W, self.ny, self.nx)
+		n = int(self.free() / 4 / (bpp * self.nx)) // step * step
+		n = max(n, step)
+		for y0 in range(Y0, Y1, n):
+			y1 = min(y0 + n, Y1)
+			yield y0, y1, self.rows(y0, y1)[:, X0:X1]
+
+def clip_window(W, ny, nx):
+	if W is None:
+		return 0, nx, 0, ny
+	return max(W[0], 0), min(W[1], nx), max(W[2], 0), min(W[3], ny)
+
+def window_shape(p, W=None):
+	X0, X1, Y0, Y1 = clip_window(W, p.ny, p.nx)
+	return Y1 - Y0, X1 - X0
+
+def min_factor(p, shape, bpp):
+# the smallest block factor of a window with bpp bytes of every pixel in the budget
+	f = 1
+	while bpp * (shape[0]//f) * (shape[1]//f) > p.free() / 2:
+		f += 1
+	return f
+
+def minmax(p, W=None):
+	vmin, vmax = np.inf, -np.inf
+	for y0, y1, data in p.strips(W):
+		vmin = min(vmin, np.nanmin(data))
+		vmax = max(vmax, np.nanmax(data))
+	return vmin, vmax
+
+def select(p, W, k, lo, hi, nbin=65536):
+# the k-th smallest finite value
+	below = 0
+	while True:
+		below, inside, hist = 0, 0, np.zeros(nbin, dtype=np.int64)
+		for y0, y1, data in p.strips(W):
+			below += np.count_nonzero(data < lo)
+			d = data[(data >= lo) & (data <= hi)]
+			inside += d.size
+			hist += np.histogram(d, nbin, (lo, hi))[0]
+		if inside * 4 < p.free() / 4 or lo == hi:
+			break
+		i = np.searchsorted(np.cumsum(hist), k - below, side='right')
+	# the next range is a little wider than the bin, for the rounding of histogram
+		width = (hi - lo) / nbin
+		lo1, hi1 = max(lo + (i - 0.01)*width, lo), min(lo + (i + 1.01)*width, hi)
+		if (lo1, hi1) == (lo, hi):
+			break
+		lo, hi = lo1, hi1
+	if lo == hi:
+		return lo
+	values = [data[(data >= lo) & (data <= hi)] for y0, y1, data in p.strips(W)]
+	values = np.concatenate(values)
+	return np.partition(values, k - below)[k - below]
+
+def median(p, W=None):
+	n = 0
+	lo, hi = np.inf, -np.inf
+	for y0, y1, data in p.strips(W):
+		d = data[np.isfinite(data)]
+		n += d.size
+		if d.size > 0:
+			lo, hi = min(lo, d.min()), max(hi, d.max())
+	a = select(p, W, (n-1)//2, lo, hi)
+	b = a if n % 2 == 1 else select(p, W, n//2, lo, hi)
+	return np.float32((np.float64(a) + np.float64(b)) / 2)
+
+def calc_rms(p, W=None):
+# the same as calc_rms of contour.py, with the strips of the image
+	mid = median(p, W)
+	var, n = 0.0, 0
+	for y0, y1, data in p.strips(W):
+		d = data[data < mid]
+		d -= mid
+		var += 2 * np.sum(np.square(d, dtype=np.float64))
+		n += d.size
+	return np.sqrt(var/(n-1))
+
+def detect_source(p, thresh, area=500):
+# bbox of the source (detect_source of contour.py) of the mask reduced by b x b blocks
+	from contour import detect_source as detect
+	b = min_factor(p, (p.ny, p.nx), 12)
+	ny, nx = p.ny//b, p.nx//b
+	mask = np.zeros((ny, nx), dtype=np.uint8)
+	for y0, y1, data in p.strips(step=b, bpp=5):
+		m = data[:(y1-y0)//b*b, :nx*b] >= thresh
+		if b > 1:
+			m = m.reshape(-1, b, nx, b).any(axis=(1, 3))
+		mask[y0//b:y0//b+m.shape[0]] = m
+	if b > 1:
+		print('Low memory: detect the source on %d x %d blocks' % (b, b))
+	label_image, bbox = detect(mask, 1, area/b**2)
+	return tuple([v*b for v in bbox])
+
+def read_window(p, W=None, f=1):
+# mean of f x f blocks of the window, the same as block_reduce of mapplot.py
+	shape = window_shape(p, W)
+	ny, nx = shape[0]//f, shape[1]//f
+	img = np.zeros((ny, nx), dtype=np.float32)
+	y = 0
+	for y0, y1, data in p.strips(W, step=f):
+		data = data[:(y1-y0)//f*f, :nx*f]
+		if f > 1:
+			data = data.reshape(-1, f, nx, f).mean(axis=(1, 3))
+		img[y:y+data.shape[0]] = data
+		y += data.shape[0]
+	return img[:y]
@@ -5,13 +5,17 @@ Created on Wed Oct 21 11:11:56 2020
 
 This program is use to plot polarization map from vlbi fits image.
 You should specify the input fits images by -i or --infile,
-	output file by -o or --output,
+	output file by -o or --output, many files with their dpi: "a.pdf a.png:300 a.jpg:50",
 	contour levs by -l or --levs
 	contour base by -c or --cmul
 	polarization parameters by -p or --pol: "icut pcut inc scale"
 	plot window by -w or --win
 	restore beam position by -b or --bpos
 	figsize by -f or --figsize
+	plane of a cube by --plane "chan stokes", moment map of a cube by --moment (cube.py)
+	time and memory of every stage by --profile <file> (JSON lines, perflog.py)
+	peak memory budget (MB) by --lowmem, the image is read in strips (lowmem.py)
+	plot again when the files or the parameters (file) change by --watch <params.txt> (watch.py)
 
 Installation:
 1. copy file
@@ -29,6 +33,12 @@ Running like this:
 Examples:
 	1. mapplot.py -i cta102.fits -o cta102-color.pdf -c 1.8e-3 -w '18 -8 -20 6' -f '7 6' -n 'power 0.5'
 	2. mapplot.py -w '18 -8 -20 6' -f '4.0 6' -n 'power 0.5' cta102.fits 1.8e-3
+	3. mapplot.py -i cta102.fits -o cta102-color.pdf -s 3 -w '18 -8 -20 6' -f '7 6' -n 'power 0.5'
+	4. mapplot.py -i cta102.fits -o cta102-color.pdf -c 1.8e-3 -d 300 --simplify 0.5 --raster 'image low'
+	5. mapplot.py -i cube.fits -o chan12.pdf -c 3e-3 --plane '12 0'
+	6. mapplot.py -i cube.fits -o mom1.pdf -c 0.05 --moment 1
+	7. mapplot.py -i large.fits -o large.png -c 1.8e-3 --lowmem 500
+	8. mapplot.py -i cta102.fits -o cta102.png -c 1.8e-3 --watch params.txt
 
 
 https://matplotlib.org/3.1.1/tutorials/colors/colormaps.html
@@ -40,10 +50,10 @@ E-mail: lixf@shao.ac.cn; 1650152531@qq.com
 """
 
 
+import os
 import sys
 import getopt
 from astropy.io import fits
-from astropy.table import Table
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.patches import Ellipse
@@ -62,6 +72,7 @@ def add_beam(ax, win, h, bpos=None, pad=2.0):
 
 def annotate(ax, notefile=''):
 	if notefile != '':
+		from astropy.table import Table
 		tab = Table.read(notefile, format='csv')
 		for t in tab:
 			ax.text(t['x'], t['y'], t['text'])
@@ -117,32 +128,9 @@ def get_normalize(args, vmin=0.0, vmax=1.0):
 	return norm
 
 def add_annotation(ax, infile=''):
-	if infile == '':
-		return
-	
-	with open(infile, 'r') as f:
-		for line in f.readlines():
-			row = line.split(',')
-			row = [col.strip() for col in row]
-			typ = row[0]
-			args = row[1:]
-			if typ == 'text':
-				x, y, text = args
-				x, y = float(x), float(y)
-				ax.text(x, y, text)
-			elif typ == 'arrow':
-				x1, y1, x2, y2 = np.array(args, dtype='f4')
-				ax.annotate("", xy=(x1, y1), xytext=(x2, y2), 
-				arrowprops=dict(arrowstyle="->", connectionstyle="arc3"))
-			elif typ == 'annotation':
-				x1, y1, x2, y2 = np.array(args[:-1], dtype='f4')
-				text = args[-1]
-				ax.annotate(text, xy=(x1, y1), xytext=(x2, y2),
-				 arrowprops=dict(arrowstyle="->", connectionstyle="arc3"))
-			elif typ == 'ellipse':
-				x, y, majax, minax, pa = np.array(args, dtype='f4')
-				e = Ellipse((x,y), majax, minax, angle=pa, lw=0.5, fc='none', ec='k', ls='-')
-				ax.add_artist(e)
+# all ellipses and arrows in two collections, the texts in the window (annotation.py)
+	from annotation import draw_annotation
+	draw_annotation(ax, infile, ec='k')
 
 def set_axis(ax, w):
 	ax.set_aspect('equal')
@@ -177,23 +165,49 @@ def pix2word(W, h):
 	w = [x0, x1, y0, y1]
 	return w
 
+def block_reduce(img, f):
+# mean of f x f blocks, the edge rows and columns that do not fill a block are dropped
+	if f <= 1:
+		return img
+	ny, nx = img.shape[0]//f*f, img.shape[1]//f*f
+	return img[:ny, :nx].reshape(ny//f, f, nx//f, f).mean(axis=(1, 3))
+
+def reduce_extent(win, shape, f):
+	ny, nx = shape[0]//f*f, shape[1]//f*f
+	x0, x1, y0, y1 = win
+	return [x0, x0 + (x1-x0)*nx/shape[1], y0, y0 + (y1-y0)*ny/shape[0]]
+
+def display_factor(shape, h, figsize, dpi):
+# block size for the color layer and for the contours
+	f = int(min(shape[1]/(figsize[0]*dpi), shape[0]/(figsize[1]*dpi)))
+	f = max(f, 1)
+# keep at least 3 pixels in the beam minor axis for the contours
+	bmin = h['bmin'] / abs(h['cdelt2'])
+	fc = max(min(f, int(bmin/3)), 1)
+	return f, fc
+
 def savefig(outfile, dpi=100):
-	if outfile.lower().endswith('.pdf') :
-		plt.savefig(outfile)
-	elif outfile.lower().endswith('.jpg') or outfile.lower().endswith('.jpeg'):
-		plt.savefig(outfile, dpi=dpi)
-	elif outfile.lower().endswith('.png'):
-		plt.savefig(outfile, dpi=dpi)
-	
+# outfile can be many files with their dpi, e.g. "a.pdf a.png:300 a.jpg:50"
+	from multisave import save_all
+	save_all(plt.gcf(), outfile, dpi)
+
 def mapplot(infile, cmul, outfile='', win=None, levs=None, bpos=None, 
 			figsize=None, dpi=100, annotationfile='', cmap='', N_cut=0, 
-			norm='', fraction=0.05):
+			norm='', fraction=0.05, snr=None, full=False, nproc=None, cache=False,
+			simplify=0.0, raster=None, plane=(0, 0), moment=None, profile='', lowmem=None):
+	if raster == None:
+		raster = []
+	from perflog import get_profile
+	prof = get_profile('mapplot', infile, profile)
+	prof.stage('read')
+	if moment != None:
+		from cube import moments
+		infile = moments(infile, [moment])[0]
+		plane = (0, 0)
 	hdul = fits.open(infile)
 	h = hdul[0].header
 #	img = hdul[0].data[0, 0, :, :]
 	
-	if levs==None:
-		levs = cmul*np.array([-1,1,2,4,8,16,32,64,128,256,512,1024,2048,4096])
 #	print(win)
 	if figsize == None :
 		figsize = (6, 6)
@@ -202,36 +216,114 @@ def mapplot(infile, cmul, outfile='', win=None, levs=None, bpos=None,
 		W = word2pix(None, h)
 	else:
 		W = word2pix(win, h)
-	img = hdul[0].data[0, 0, W[2]:W[3], W[0]:W[1]]
+	from multisave import max_dpi
+	odpi = max_dpi(outfile, dpi)
+	budget = None
+	if lowmem != None or os.environ.get('VLPY_MEMORY', '') != '':
+		from lowmem import get_budget, check_budget, Plane, window_shape, min_factor, read_window, \
+			minmax, median as lowmem_median
+		budget = get_budget(lowmem)
+	if budget != None:
+	# low memory mode, the window is read in strips and reduced by blocks
+		p = Plane(infile, plane, budget)
+		shape = window_shape(p, W)
+	else:
+		img = hdul[0].data[plane[1], plane[0], W[2]:W[3], W[0]:W[1]]
+		shape = img.shape
+	f, fc = 1, 1
+	if not full:
+	# do not draw more pixels than the output can show
+		f, fc = display_factor(shape, h, figsize, odpi)
+	if budget != None:
+		g = min_factor(p, shape, 24)
+		if g > max(f, fc):
+			print('Low memory: reduce the image by %d x %d blocks' % (g, g))
+		f, fc = max(f, g), max(fc, g)
+		rimg = read_window(p, W, f)
+		cimg = rimg if fc == f else read_window(p, W, fc)
+		if snr != None:
+			from noisemap import local_rms
+			rp = Plane(local_rms(infile), budget=budget)
+			rms = read_window(rp, W, fc)
+			if cmul == '':
+				cmul = snr * lowmem_median(rp, W)
+				print('Set cmul = %.2f mJy/beam' % (cmul*1000))
+		# hide the contours where the image is below snr times of the local rms
+			cimg = np.ma.masked_where(np.abs(cimg) < snr*rms, cimg)
+		prof.set(shape=shape, budget=budget)
+	else:
+		cimg = img
+		if snr != None:
+			from noisemap import read_rms
+			rms = read_rms(infile, W)
+			if cmul == '':
+				cmul = snr * np.median(rms)
+				print('Set cmul = %.2f mJy/beam' % (cmul*1000))
+		# hide the contours where the image is below snr times of the local rms
+			cimg = np.ma.masked_where(np.abs(img) < snr*rms, img)
+		rimg, cimg = block_reduce(img, f), block_reduce(cimg, fc)
+		prof.set(shape=shape)
+	prof.stage('scale')
+	if levs==None:
+		levs = cmul*np.array([-1,1,2,4,8,16,32,64,128,256,512,1024,2048,4096])
 	if cmap == '':
 		cmap = 'rainbow'
 	cmap = cut_cmap(cmap, N_cut)
-	vmin, vmax = np.min(img), np.max(img)
+	if budget != None:
+		vmin, vmax = minmax(p, W)
+	else:
+		vmin, vmax = np.min(img), np.max(img)
 	if norm == '':
 		norm = 'linear %.3f %.3f' % (vmin, vmax)
 	norm = get_normalize(norm, vmin, vmax)
+	prof.stage('figure')
 	fig, ax = plt.subplots()
 	fig.set_size_inches(figsize)
 	set_axis(ax, win)
 	add_beam(ax, win, h, bpos=bpos)
 	add_annotation(ax, annotationfile)
-	ax.contour(img, levs, extent=win, 
+	prof.stage('contour')
+	if nproc != None or cache or simplify > 0.0 or 'low' in raster:
+		from ctrace import contour as tcontour
+		key = (infile, W, 'snr %s fc %d plane %d %d' % (snr, fc, plane[0], plane[1])) if cache else None
+		tcontour(ax, cimg, levs, reduce_extent(win, shape, fc),
+			nproc=nproc, cache=key, tol=simplify, dpi=odpi, rasterlow='low' in raster,
+			linewidths=0.5, colors='k')
+	else:
+		ax.contour(cimg, levs, extent=reduce_extent(win, shape, fc), 
 			linewidths=0.5, colors='k')
 
-	pcm = ax.imshow(img, extent=win, origin='lower', 
-				 interpolation='none', cmap=cmap, norm=norm)
+	prof.stage('imshow')
+	pcm = ax.imshow(rimg, extent=reduce_extent(win, shape, f), origin='lower', 
+				 interpolation='none', cmap=cmap, norm=norm, rasterized='image' in raster)
 	cbar = fig.colorbar(pcm, ax=ax, fraction=fraction)
 #	cbar.ax.minorticks_off()
 	cbar.ax.tick_params('both',direction='in',right=True,top=True,which='both')
 	cbar.ax.tick_params(axis='y', labelrotation=90)
+	prof.stage('layout')
 	fig.tight_layout(pad=0.5)
 	if outfile != '':
+		prof.stage('save')
 		savefig(outfile, dpi)
 	hdul.close()
+	if budget != None:
+		check_budget(budget)
+	prof.close()
+# the range of the full image too, for a new norm of the same image (watch.py)
+	return fig, ax, (vmin, vmax)
 
 def myhelp():
 	print('Help: mapplot.py -w "18 -8 -20 6" -f "7 6" -n "power 0.5" <cta102.fits> <1.8e-3>')
 	print('  or: mapplot.py -i cta102.fits -o cta102.png -w "18 -8 -20 6" -f "7 6" -n "power 0.5"')
+	print('  or: mapplot.py -i cta102.fits -o cta102.png -s 3 -w "18 -8 -20 6" -f "7 6" -n "power 0.5"')
+	print('  or: mapplot.py --full -i cta102.fits -o cta102.pdf -w "18 -8 -20 6" -f "7 6" -n "power 0.5"')
+	print('  or: mapplot.py -j 8 --cache -i cta102.fits -o cta102.pdf -c 1.8e-3 -f "7 6" -n "power 0.5"')
+	print('  or: mapplot.py -d 300 --simplify 0.5 --raster "image low" -i cta102.fits -o cta102.pdf -c 1.8e-3')
+	print('  or: mapplot.py --plane "12 0" -i cube.fits -o chan12.pdf -c 3e-3')
+	print('  or: mapplot.py --moment 1 -i cube.fits -o mom1.pdf -c 0.05')
+	print('  or: mapplot.py --profile prof.jsonl -i cta102.fits -o cta102.png -c 1.8e-3')
+	print('  or: mapplot.py --lowmem 500 -i large.fits -o large.png -c 1.8e-3')
+	print('  or: mapplot.py --watch params.txt -i cta102.fits -o cta102.png -c 1.8e-3')
 
 def main(argv):
 #	infile = r'3c66a-calib/circe-beam.fits'
@@ -248,12 +340,24 @@ def main(argv):
 	N_cut = 0
 	norm = ''
 	fraction = 0.05
+	snr = None
+	full = False
+	nproc = None
+	cache = False
+	simplify = 0.0
+	raster = []
+	plane = (0, 0)
+	moment = None
+	profile = ''
+	lowmem = None
+	watchfile = ''
 
 	try:
-		opts, args = getopt.getopt(argv, "hi:c:o:w:l:b:f:d:a:n:N:", 
+		opts, args = getopt.getopt(argv, "hi:c:o:w:l:b:f:d:a:n:N:s:j:", 
 							 ['help', 'infile=', 'cmul=', 'outfile=', 'win=', 
 		 'bpos=', 'figsize=', 'dpi=', 'annotatefile=', 'levs=', 'colormap=', 
-		 'N_cut=', 'norm=', 'fraction='])
+		 'N_cut=', 'norm=', 'fraction=', 'snr=', 'full', 'nproc=', 'cache',
+		 'simplify=', 'raster=', 'plane=', 'moment=', 'profile=', 'lowmem=', 'watch='])
 	except getopt.GetoptError:
 		myhelp()
 		sys.exit(2)
@@ -287,6 +391,28 @@ def main(argv):
 			norm = arg
 		elif opt in ('--fraction',):
 			fraction = float(arg)
+		elif opt in ('-s', '--snr'):
+			snr = float(arg)
+		elif opt in ('--full',):
+			full = True
+		elif opt in ('-j', '--nproc'):
+			nproc = int(arg)
+		elif opt in ('--cache', ):
+			cache = True
+		elif opt in ('--simplify', ):
+			simplify = float(arg)
+		elif opt in ('--raster', ):
+			raster = arg.split()
+		elif opt in ('--plane', ):
+			plane = tuple((list(map(int, arg.split())) + [0])[:2])
+		elif opt in ('--moment', ):
+			moment = int(arg)
+		elif opt in ('--profile', ):
+			profile = arg
+		elif opt in ('--lowmem', ):
+			lowmem = float(arg)
+		elif opt in ('--watch', ):
+			watchfile = arg
 	if infile=='' and len(args)==2:
 		infile, cmul = args
 	if infile=='' and len(args)==3:
@@ -295,12 +421,19 @@ def main(argv):
 		infile, outfile, cmul, win = args
 	if outfile == '':
 		outfile = infile.split('.')[0] + '.pdf'
-	cmul = float(cmul)
+	if cmul != '' or snr == None:
+		cmul = float(cmul)
 	if type(win) == str:
 		win = np.array(win.split(), dtype=np.float64).tolist()
-	mapplot(infile, cmul, outfile=outfile, win=win, levs=levs, bpos=bpos, 
+	kw = dict(infile=infile, cmul=cmul, outfile=outfile, win=win, levs=levs, bpos=bpos, 
 		 figsize=figsize, dpi=dpi, annotationfile=annotationfile, 
-		 cmap=colormap, N_cut=N_cut, norm=norm, fraction=fraction)
+		 cmap=colormap, N_cut=N_cut, norm=norm, fraction=fraction, snr=snr, full=full, nproc=nproc, cache=cache,
+		 simplify=simplify, raster=raster, plane=plane, moment=moment, profile=profile, lowmem=lowmem)
+	if watchfile != '':
+		from watch import watch
+		watch('mapplot', kw, watchfile)
+	else:
+		mapplot(**kw)
 
 if __name__ == '__main__' :
 	main(sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 09:12:40 2026
+
+This module is use to save one prepared figure to many output files.
+The outputs are given as one string, separated by spaces, and every file can
+have its own dpi after a colon, e.g. "cta102.pdf cta102.png:300 cta102.jpg:50".
+The figure is drawn once for every dpi of the raster files (png, jpg), and the
+pixels are encoded by a pool of threads. Vector files (pdf, eps, svg) are
+written by matplotlib, and the dpi of pdf is the dpi of its rasterized layers.
+contour.py, mapplot.py and polplot.py save the figure by this module, so
+-o of these programs accepts many files.
+
+Usage:
+	from multisave import save_all
+	save_all(fig, 'cta102.pdf cta102.png:300 cta102.jpg:50', dpi=100)
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+raster_formats = {'png': 'png', 'jpg': 'jpeg', 'jpeg': 'jpeg', 'tif': 'tiff', 'tiff': 'tiff'}
+
+def parse_outfiles(outfile, dpi=100):
+# list of (file, dpi)
+	res = []
+	for item in outfile.split():
+		name, sep, d = item.rpartition(':')
+		if sep != '' and d.isdigit():
+			res.append((name, int(d)))
+		else:
+			res.append((item, dpi))
+	return res
+
+def file_format(outfile):
+	return os.path.splitext(outfile)[1][1:].lower()
+
+def draw_rgba(fig, dpi):
+# the same pixels as fig.savefig(outfile, dpi=dpi)
+	from matplotlib.backends.backend_agg import FigureCanvasAgg
+	old = fig.dpi
+	canvas = FigureCanvasAgg(fig)
+	try:
+		fig.set_dpi(dpi)
+		canvas.draw()
+		rgba = np.array(canvas.buffer_rgba())
+	finally:
+		fig.set_dpi(old)
+	return rgba
+
+def encode(args):
+	outfile, rgba, dpi = args
+	from PIL import Image
+	fmt = raster_formats[file_format(outfile)]
+	img = Image.fromarray(rgba)
+	if fmt == 'jpeg':
+		img = img.convert('RGB')
+	img.save(outfile, format=fmt, dpi=(dpi, dpi))
+	return outfile
+
+def save_all(fig, outfile, dpi=100, nthread=None):
+	outfiles = parse_outfiles(outfile, dpi)
+	jobs = []
+	pixels = {}
+	for name, d in outfiles:
+		fmt = file_format(name)
+		if fmt in raster_formats:
+			if d not in pixels:
+				pixels[d] = draw_rgba(fig, d)
+			jobs.append((name, pixels[d], d))
+		else:
+			fig.savefig(name, dpi=d)
+	if nthread is None:
+		nthread = min(len(jobs), os.cpu_count())
+	if nthread > 1:
+		with ThreadPoolExecutor(nthread) as pool:
+			list(pool.map(encode, jobs))
+	else:
+		for job in jobs:
+			encode(job)
+	return [name for name, d in outfiles]
+
+def max_dpi(outfile, dpi=100):
+# the finest resolution of all outputs, for the level of detail of the figure
+	return max([dpi] + [d for name, d in parse_outfiles(outfile, dpi)])
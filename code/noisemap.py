@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 10:05:44 2026
+
+This program is use to calculate the local rms map of a vlbi fits image.
+The rms of every pixel is calculated in a box around it with summed-area tables,
+so the time is O(N) of the image size and does not depend on the box size.
+Pixels brighter than clip times the rms are not used (two iterations), and
+pixels without enough noise pixels in the box take the rms of a 3 times bigger box.
+The image is processed in strips of rows, so a 16k x 16k map needs only a few
+strips in memory. The rms map is saved as <input>.rms.fits beside the input
+file and it is used again if the input file, box and clip are not changed.
+contour.py, mapplot.py (-s snr) and polplot.py (-s "isnr psnr") use the rms map.
+You can specify the input image by -i or --infile,
+	output rms map by -o or --outfile,
+	box size (pixels) by -b or --box, the default is 8 times of beam major axis,
+	clip level by -c or --clip,
+	rows of a strip by -t or --tile
+
+Installation:
+1. copy file
+	chmod a+x noisemap.py
+	cp noisemap.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	noisemap.py <input.fits>
+	noisemap.py -b 64 -c 5 -i <input.fits> -o <rms.fits>
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import getopt
+import numpy as np
+from astropy.io import fits
+
+def rms_file(infile):
+	base = infile[:-5] if infile.lower().endswith('.fits') else infile
+	return base + '.rms.fits'
+
+def default_box(h):
+	return max(16, int(8 * h['bmaj'] / abs(h['cdelt2'])))
+
+def sample_rms(data):
+# rms of the image (as calc_rms in contour.py) from a sub-sample of pixels
+	ny, nx = data.shape[-2:]
+	step = max(1, int(np.sqrt(ny * nx / 4.0E6)))
+	img = np.array(data[0, 0, ::step, ::step], dtype=np.float64).ravel()
+	img = img[np.isfinite(img)]
+	mid = np.median(img)
+	img = img[img < mid]
+	return np.sqrt(2 * np.sum((img - mid)**2) / (img.size - 1))
+
+def box_sums(sat, rows, h, ncol):
+# sums in the boxes [row-h, row+h] x [col-h, col+h] for the given rows and all columns
+	nrow = sat.shape[0] - 1
+	r0 = np.clip(rows - h, 0, nrow)
+	r1 = np.clip(rows + h + 1, 0, nrow)
+	cols = np.arange(ncol)
+	c0 = np.clip(cols - h, 0, ncol)
+	c1 = np.clip(cols + h + 1, 0, ncol)
+	return sat[np.ix_(r1, c1)] - sat[np.ix_(r0, c1)] - sat[np.ix_(r1, c0)] + sat[np.ix_(r0, c0)]
+
+def sat_of(v):
+	sat = np.zeros((v.shape[0]+1, v.shape[1]+1))
+	np.cumsum(v, axis=0, out=sat[1:, 1:])
+	np.cumsum(sat[1:, 1:], axis=1, out=sat[1:, 1:])
+	return sat
+
+def strip_rms(img, thresh, rows, h, nmin):
+# rms of the given rows of img, pixels with |img| > thresh are not used
+	good = np.isfinite(img) & (np.abs(img) <= thresh)
+	v = np.where(good, img, 0.0)
+	n = sat_of(good.astype(np.float64))
+	s1 = sat_of(v)
+	s2 = sat_of(v * v)
+	res = []
+	for k in (h, 3*h):
+		cnt = box_sums(n, rows, k, img.shape[1])
+		with np.errstate(invalid='ignore', divide='ignore'):
+			mean = box_sums(s1, rows, k, img.shape[1]) / cnt
+			var = box_sums(s2, rows, k, img.shape[1]) / cnt - mean**2
+		var[cnt < nmin] = np.nan
+		res.append(np.sqrt(np.maximum(var, 0.0)))
+	rms, rms3 = res
+	bad = np.isnan(rms)
+	rms[bad] = rms3[bad]
+	return rms
+
+def local_rms(infile, outfile='', box=None, clip=5.0, tile=256, cache=True):
+	if outfile == '':
+		outfile = rms_file(infile)
+	st = os.stat(infile)
+	with fits.open(infile, memmap=True) as hdul:
+		h = hdul[0].header
+		if box is None:
+			box = default_box(h)
+		half = box // 2
+		if cache and os.path.exists(outfile):
+			hr = fits.getheader(outfile)
+			if hr.get('RMSMTIME') == st.st_mtime and hr.get('RMSSIZE') == st.st_size \
+				and hr.get('RMSBOX') == box and hr.get('RMSCLIP') == clip:
+				return outfile
+		data = hdul[0].data
+		ny = h['naxis2']
+		sigma0 = sample_rms(data)
+		nmin = 0.1 * box * box
+
+		hout = h.copy()
+		hout['BITPIX'] = -32
+		for key in ('BSCALE', 'BZERO', 'BLANK'):
+			hout.remove(key, ignore_missing=True)
+		hout['BUNIT'] = 'JY/BEAM'
+		hout['RMSMTIME'] = (st.st_mtime, 'mtime of the input image')
+		hout['RMSSIZE'] = (st.st_size, 'size of the input image')
+		hout['RMSBOX'] = (box, 'box size (pixels)')
+		hout['RMSCLIP'] = (clip, 'clip level')
+	# StreamingHDU appends to an existing file, so write a new file and replace
+		tmp = '%s.%d.tmp' % (outfile, os.getpid())
+		out = fits.StreamingHDU(tmp, hout)
+		shape = (1,) * (data.ndim - 2)
+		for y0 in range(0, ny, tile):
+			y1 = min(y0 + tile, ny)
+		# the rms of a row uses the rows within 3 half boxes (the bigger box), so the
+		# second iteration needs the first one 3 half boxes around the strip, and that
+		# needs the image 6 half boxes around, and the rms does not depend on tile
+			a, b = max(y0 - 6*half, 0), min(y1 + 6*half, ny)
+			img = np.array(data[(0,)*(data.ndim-2) + (slice(a, b),)], dtype=np.float64)
+			r1 = np.arange(max(y0 - 3*half, 0), min(y1 + 3*half, ny)) - a
+			rms1 = strip_rms(img, clip*sigma0, r1, half, nmin)
+			rms1[np.isnan(rms1)] = sigma0
+			thresh = np.full(img.shape, clip*sigma0)
+			thresh[r1] = clip * rms1
+			rms = strip_rms(img, thresh, np.arange(y0, y1) - a, half, nmin)
+			rms[np.isnan(rms)] = sigma0
+			out.write(rms.astype('>f4').reshape(shape + rms.shape))
+		out.close()
+	os.replace(tmp, outfile)
+	return outfile
+
+def read_rms(infile, W=None, box=None, clip=5.0):
+# rms map cutout [Y0:Y1, X0:X1] of infile, calculated at the first time
+	rmsfile = local_rms(infile, box=box, clip=clip)
+	with fits.open(rmsfile, memmap=True) as hdul:
+		data = hdul[0].data
+		if W is None:
+			return np.array(data[0, 0])
+		return np.array(data[0, 0, W[2]:W[3], W[0]:W[1]])
+
+def myhelp():
+	print('Help: noisemap.py <input.fits>')
+	print('  or: noisemap.py -b <64> -c <5> -i <input.fits> -o <rms.fits>')
+
+def main(argv):
+	infile = ''
+	outfile = ''
+	box = None
+	clip = 5.0
+	tile = 256
+
+	try:
+		opts, args = getopt.getopt(argv, "hi:o:b:c:t:",
+							 ['help', 'infile=', 'outfile=', 'box=', 'clip=', 'tile='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-i', '--infile'):
+			infile = arg
+		elif opt in ('-o', '--outfile'):
+			outfile = arg
+		elif opt in ('-b', '--box'):
+			box = int(arg)
+		elif opt in ('-c', '--clip'):
+			clip = float(arg)
+		elif opt in ('-t', '--tile'):
+			tile = int(arg)
+	if infile == '' and len(args) == 1:
+		infile = args[0]
+	if infile == '' and len(args) == 2:
+		infile, outfile = args
+	if infile == '':
+		myhelp()
+		sys.exit(2)
+	outfile = local_rms(infile, outfile, box, clip, tile, cache=False)
+	print('Write %s' % outfile)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
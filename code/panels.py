@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 15:36:08 2026
+
+This program is use to plot a figure of many panels, e.g. the maps of many
+epochs side by side, or I, polarization and spectral index maps of a source.
+Every panel is a contour map (contour.py), a color map (mapplot.py) or a
+polarization map (polplot.py). The data of all panels are read and prepared
+(window, rms, block reduction and contour tracing) by a pool of processes, and
+the figure is composed at last with shared axes and a shared colorbar.
+You can specify the layout file by -i or --infile,
+	output files by -o or --outfile, the same as mapplot.py,
+	figsize by -f or --figsize, dpi by -d or --dpi,
+	number of processes by -j or --nproc
+
+Layout file:
+Every line is a keyword and its values, separated by commas. The panels are
+placed row by row, in the order of the panel lines.
+	layout, 2, 3					rows and columns
+	win, 18, -8, -20, 6				window of all panels (mas), the same as mapplot.py
+	norm, power 0.5					normalize of the color maps, the same as mapplot.py
+	colormap, gnuplot2				colormap and cut of colormap
+	ncut, 50
+	figsize, 9, 6
+	contour, e0.fits, cmul=1.8e-3, label=2016-01
+	map, e1.fits, cmul=1.8e-3, win=10 -5 -10 5
+	pol, i.fits q.fits u.fits, cmul=1.6e-4, pol=1.28e-3 1.6e-4 3 0.05
+The options of a panel are cmul (default 3 times of the image rms), levs, win,
+label (default date-obs), annotation (annotation file, the same as mapplot.py)
+and pol ("icut pcut inc scale" of polplot.py).
+The panels share the axes if no panel has its own win.
+
+Installation:
+1. copy file
+	chmod a+x panels.py
+	cp panels.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	panels.py <layout.txt> <out.pdf>
+	panels.py -i <layout.txt> -o "<out.pdf> <out.png:300>" -f "9 6" -j 8
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import getopt
+import numpy as np
+from multiprocessing import Pool
+from astropy.io import fits
+import matplotlib.pyplot as plt
+from mapplot import add_beam, add_annotation, set_axis, word2pix, pix2word, \
+	cut_cmap, get_normalize, block_reduce, reduce_extent, display_factor
+
+def read_layout(infile):
+	layout = {'rows': 1, 'cols': 1, 'win': None, 'norm': '', 'colormap': '', 'ncut': 0,
+		'figsize': None}
+	panels = []
+	with open(infile, 'r') as f:
+		for line in f.readlines():
+			row = [col.strip() for col in line.split(',')]
+			if row[0] == '' or row[0].startswith('#'):
+				continue
+			key, args = row[0], row[1:]
+			if key == 'layout':
+				layout['rows'], layout['cols'] = int(args[0]), int(args[1])
+			elif key in ('win', 'figsize'):
+				layout[key] = np.array(args, dtype=np.float64).tolist()
+			elif key in ('norm', 'colormap'):
+				layout[key] = args[0]
+			elif key == 'ncut':
+				layout['ncut'] = int(args[0])
+			elif key in ('contour', 'map', 'pol'):
+				panel = {'type': key, 'files': args[0].split(), 'cmul': None, 'levs': None,
+					'win': None, 'label': None, 'annotation': '', 'pol': [0.0, 0.0, 3, 30.0]}
+				for arg in args[1:]:
+					name, value = [s.strip() for s in arg.split('=', 1)]
+					if name == 'cmul':
+						panel['cmul'] = float(value)
+					elif name in ('levs', 'win', 'pol'):
+						panel[name] = np.array(value.split(), dtype=np.float64).tolist()
+					elif name in ('label', 'annotation'):
+						panel[name] = value
+					else:
+						print('Unknown panel option: %s' % name)
+						sys.exit(1)
+				panels.append(panel)
+			else:
+				print('Unknown layout keyword: %s' % key)
+				sys.exit(1)
+	if len(panels) > layout['rows'] * layout['cols']:
+		print('Too many panels for the layout %d x %d' % (layout['rows'], layout['cols']))
+		sys.exit(1)
+	return layout, panels
+
+def prepare(args):
+# everything of a panel that does not need the figure
+	panel, win, size, dpi = args
+	from contour import calc_rms
+	from ctrace import trace
+	res = {'type': panel['type']}
+	with fits.open(panel['files'][0], memmap=True) as hdul:
+		h = hdul[0].header
+		W = word2pix(win, h)
+		img = np.array(hdul[0].data[0, 0, W[2]:W[3], W[0]:W[1]], dtype=np.float64)
+	if win is None:
+		win = pix2word(W, h)
+	cmul = panel['cmul']
+	if cmul is None:
+		cmul = 3 * calc_rms(img)
+	levs = panel['levs']
+	if levs is None:
+		levs = cmul*np.array([-1,1,2,4,8,16,32,64,128,256,512,1024,2048,4096])
+	f, fc = display_factor(img.shape, h, size, dpi)
+	cimg = block_reduce(img, fc)
+	res.update({'header': h, 'win': win, 'levs': np.asarray(levs), 'cshape': cimg.shape,
+		'cextent': reduce_extent(win, img.shape, fc), 'paths': trace(cimg, levs, 1)})
+	label = panel['label']
+	if label is None:
+		label = str(h.get('date-obs', ''))
+	res['label'] = label
+	if panel['type'] == 'map':
+		res['img'] = block_reduce(img, f)
+		res['extent'] = reduce_extent(win, img.shape, f)
+	elif panel['type'] == 'pol':
+		icut, pcut, inc, scale = panel['pol']
+		inc = int(inc)
+		Q = fits.getdata(panel['files'][1])[0, 0, W[2]:W[3], W[0]:W[1]]
+		U = fits.getdata(panel['files'][2])[0, 0, W[2]:W[3], W[0]:W[1]]
+		P = np.sqrt(Q**2 + U**2)
+		with np.errstate(invalid='ignore', divide='ignore'):
+			fp = P / img
+		mask = np.logical_or(img < icut, P < pcut)
+		fp[mask] = np.nan
+		P[mask] = np.nan
+		chi = 0.5 * np.arctan2(U, Q)
+	# vectors at the pixel centres
+		ny, nx = img.shape
+		x0, x1, y0, y1 = win
+		x = x0 + (np.arange(nx) + 0.5) * (x1 - x0) / nx
+		y = y0 + (np.arange(ny) + 0.5) * (y1 - y0) / ny
+		x, y = np.meshgrid(x[::inc], y[::inc])
+		u = (P * (-np.sin(chi)))[::inc, ::inc]
+		v = (P * np.cos(chi))[::inc, ::inc]
+		res.update({'img': fp, 'extent': win, 'vectors': (x, y, u, v), 'scale': scale})
+	return res
+
+def panels(infile, outfile='', figsize=None, dpi=100, nproc=None):
+	from ctrace import draw
+	layout, plist = read_layout(infile)
+	rows, cols = layout['rows'], layout['cols']
+	if figsize is None:
+		figsize = layout['figsize']
+	if figsize is None:
+		figsize = (3.5*cols + 1.0, 3.5*rows)
+	own = any([p['win'] is not None for p in plist])
+	if outfile != '':
+		from multisave import max_dpi
+		dpi = max_dpi(outfile, dpi)
+	size = (figsize[0]/cols, figsize[1]/rows)
+	jobs = [(p, p['win'] if p['win'] is not None else layout['win'], size, dpi) for p in plist]
+	if nproc is None:
+		nproc = os.cpu_count()
+	if nproc > 1 and len(jobs) > 1:
+		with Pool(min(nproc, len(jobs))) as pool:
+			data = pool.map(prepare, jobs, chunksize=1)
+	else:
+		data = [prepare(job) for job in jobs]
+
+# one normalize for all panels of the same type
+	cmap = cut_cmap(layout['colormap'] if layout['colormap'] != '' else 'rainbow', layout['ncut'])
+	norms = {}
+	for typ in ('map', 'pol'):
+		imgs = [d['img'] for d in data if d['type'] == typ]
+		if len(imgs) == 0:
+			continue
+		vmin = min([np.nanmin(img) for img in imgs])
+		vmax = max([np.nanmax(img) for img in imgs])
+		norm = layout['norm'] if typ == 'map' else ''
+		if norm == '':
+			norm = 'linear %.3f %.3f' % (vmin, vmax)
+		norms[typ] = get_normalize(norm, vmin, vmax)
+
+# constrained layout leaves room for the colorbars of many panels
+	fig, axes = plt.subplots(rows, cols, sharex=not own, sharey=not own, squeeze=False,
+		figsize=figsize, layout='constrained')
+	mappables = {}
+	typeaxes = {}
+	for ax, d, p in zip(axes.ravel(), data, plist):
+		typeaxes.setdefault(d['type'], []).append(ax)
+		set_axis(ax, d['win'])
+		draw(ax, d['paths'], d['levs'], d['cextent'], d['cshape'], colors='k', linewidths=0.5)
+		if d['type'] in norms:
+			mappables[d['type']] = ax.imshow(d['img'], extent=d['extent'], origin='lower',
+				interpolation='none', cmap=cmap, norm=norms[d['type']])
+		if d['type'] == 'pol':
+			x, y, u, v = d['vectors']
+			ax.quiver(x, y, u, v, scale=d['scale'], width=0.003, headlength=0,
+				headaxislength=0, headwidth=0, pivot='middle', lw=0.1)
+		add_beam(ax, d['win'], d['header'])
+		add_annotation(ax, p['annotation'])
+		ax.text(0.05, 0.95, d['label'], transform=ax.transAxes, va='top')
+	for ax in axes.ravel()[len(data):]:
+		ax.set_visible(False)
+	if not own:
+		for ax in axes.ravel():
+			ax.label_outer()
+	labels = {'map': 'Jy/beam', 'pol': 'Fractional polarization'}
+# the colorbar of a type is shared by all panels of the type
+	for typ in mappables:
+		cbar = fig.colorbar(mappables[typ], ax=typeaxes[typ], fraction=0.05, pad=0.02)
+		cbar.ax.tick_params('both', direction='in', right=True, top=True, which='both')
+		cbar.ax.tick_params(axis='y', labelrotation=90)
+		cbar.set_label(labels[typ])
+	if outfile != '':
+		from multisave import save_all
+		save_all(fig, outfile, dpi)
+	return fig, axes
+
+def myhelp():
+	print('Help: panels.py <layout.txt> <out.pdf>')
+	print('  or: panels.py -i <layout.txt> -o "<out.pdf> <out.png:300>" -f "<9 6>" -j <8>')
+
+def main(argv):
+	infile = ''
+	outfile = ''
+	figsize = None
+	dpi = 100
+	nproc = None
+
+	try:
+		opts, args = getopt.getopt(argv, "hi:o:f:d:j:",
+							 ['help', 'infile=', 'outfile=', 'figsize=', 'dpi=', 'nproc='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-i', '--infile'):
+			infile = arg
+		elif opt in ('-o', '--outfile'):
+			outfile = arg
+		elif opt in ('-f', '--figsize'):
+			figsize = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-d', '--dpi'):
+			dpi = int(arg)
+		elif opt in ('-j', '--nproc'):
+			nproc = int(arg)
+	if infile == '' and len(args) == 2:
+		infile, outfile = args
+	if infile == '':
+		myhelp()
+		sys.exit(2)
+	if outfile == '':
+		outfile = os.path.splitext(infile)[0] + '.pdf'
+	panels(infile, outfile, figsize, dpi, nproc)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 15:02:18 2026
+
+This module is use to record the wall time and memory of every stage (fits
+reading, rms, source detection, contours, image, saving ...) of contour(),
+mapplot() and polplot(). It is enabled by --profile <file> of these programs
+or by the enviroment variable VLPY_PROFILE=<file> ('-' for stderr), and a
+render appends one JSON line to the file, e.g.
+	{"tool": "mapplot", "file": "cta102.fits", "shape": [512, 512], "date": ...,
+	"host": ..., "pid": ..., "total": 1.23, "peak_mb": 250.1,
+	"stages": {"read": {"time": 0.01, "mem_mb": 2.3}, "contour": {...}, ...}}
+The memory of a stage is the peak resident memory in the stage above the
+memory at its start. On linux the peak is reset by /proc/self/clear_refs at
+the start of every stage, elsewhere the increase of the peak of the process
+is used. A stage costs about 0.1 ms, so the records can be left on in batch
+runs. Many files of many processes can be appended to one file.
+The programs use get_profile(), which returns a NoProfile (nothing measured) when
+the records are off, and they import lowmem.py only when a memory budget is set.
+The fits data are read (memory map) when they are used for the first time, so
+the time of reading may be in the stage after read.
+As a program, it prints the count, median, 95th percentile and maximum of the
+time and memory of every stage of every program in the files.
+You can specify the program by -t or --tool
+
+Usage:
+	from perflog import get_profile
+	prof = get_profile('mapplot', infile, profile)
+	prof.stage('read')
+	...
+	prof.stage('save')
+	...
+	prof.close()
+
+Running like this:
+	perflog.py <prof.jsonl>
+	perflog.py -t mapplot <prof1.jsonl> <prof2.jsonl>
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import json
+import time
+import getopt
+
+def proc_status(key):
+# MB of a memory line of /proc/self/status, None if not linux
+	try:
+		with open('/proc/self/status', 'r') as f:
+			for line in f:
+				if line.startswith(key):
+					return int(line.split()[1]) / 1024
+	except OSError:
+		pass
+	return None
+
+def reset_peak():
+	try:
+		with open('/proc/self/clear_refs', 'w') as f:
+			f.write('5')
+		return True
+	except OSError:
+		return False
+
+def peak_rss():
+	peak = proc_status('VmHWM:')
+	if peak is None:
+		import resource
+		peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+	return peak
+
+class Profile:
+	def __init__(self, tool, infile='', outfile=''):
+		if outfile == '':
+			outfile = os.environ.get('VLPY_PROFILE', '')
+		self.outfile = outfile
+		self.enabled = outfile != ''
+		self.tool = tool
+		self.infile = infile
+		self.name = ''
+		self.stages = {}
+		self.info = {}
+		if self.enabled:
+			self.t = self.t0 = time.perf_counter()
+			self.peak = 0.0
+
+	def stage(self, name):
+	# the end of the last stage and the start of the next
+		if not self.enabled:
+			return
+		now = time.perf_counter()
+		self.end(now)
+		self.name = name
+		self.t = now
+		rss = proc_status('VmRSS:') if reset_peak() else None
+		self.rss = rss if rss is not None else peak_rss()
+
+	def end(self, now):
+		if self.name == '':
+			return
+		peak = peak_rss()
+		self.peak = max(self.peak, peak)
+		st = self.stages.setdefault(self.name, {'time': 0.0, 'mem_mb': 0.0})
+		st['time'] += now - self.t
+		st['mem_mb'] = max(st['mem_mb'], peak - self.rss)
+		self.name = ''
+
+	def set(self, **kw):
+		if self.enabled:
+			self.info.update(kw)
+
+	def close(self):
+		if not self.enabled:
+			return
+		now = time.perf_counter()
+		self.end(now)
+		rec = {'tool': self.tool, 'file': self.infile}
+		rec.update(self.info)
+		rec.update({'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'host': os.uname()[1],
+			'pid': os.getpid(), 'total': now - self.t0, 'peak_mb': self.peak,
+			'stages': self.stages})
+		line = json.dumps(rec) + '\n'
+		if self.outfile == '-':
+			sys.stderr.write(line)
+		else:
+		# one write of a line, lines of many processes are not mixed
+			fd = os.open(self.outfile, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+			try:
+				os.write(fd, line.encode())
+			finally:
+				os.close(fd)
+		self.enabled = False
+
+class NoProfile:
+# the stages are not recorded when the profile is off
+	def stage(self, name):
+		pass
+
+	def set(self, **kw):
+		pass
+
+	def close(self):
+		pass
+
+def get_profile(tool, infile='', profile=''):
+# Profile if --profile or VLPY_PROFILE is set, else NoProfile
+	if profile == '' and os.environ.get('VLPY_PROFILE', '') == '':
+		return NoProfile()
+	return Profile(tool, infile, profile)
+
+def read_records(infiles, tool=''):
+	res = []
+	for infile in infiles:
+		with open(infile, 'r') as f:
+			for line in f:
+				if not line.startswith('{'):
+					continue
+				rec = json.loads(line)
+				if tool == '' or rec['tool'] == tool:
+					res.append(rec)
+	return res
+
+def summary(records):
+# {tool: {stage: (count, median, p95, max of time, median, p95, max of memory)}}
+	import numpy as np
+	res = {}
+	for tool in sorted(set([rec['tool'] for rec in records])):
+		recs = [rec for rec in records if rec['tool'] == tool]
+		stages = {}
+		for rec in recs:
+			for name, st in list(rec['stages'].items()) + [('total', {'time': rec['total'],
+				'mem_mb': rec['peak_mb']})]:
+				stages.setdefault(name, []).append((st['time'], st['mem_mb']))
+		res[tool] = {}
+		for name, values in stages.items():
+			t, m = np.array(values).T
+			res[tool][name] = (len(t), np.median(t), np.percentile(t, 95), np.max(t),
+				np.median(m), np.percentile(m, 95), np.max(m))
+	return res
+
+def myhelp():
+	print('Help: perflog.py <prof.jsonl>')
+	print('  or: perflog.py -t <mapplot> <prof1.jsonl> <prof2.jsonl>')
+
+def main(argv):
+	tool = ''
+
+	try:
+		opts, args = getopt.getopt(argv, "ht:", ['help', 'tool='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-t', '--tool'):
+			tool = arg
+	if len(args) == 0:
+		myhelp()
+		sys.exit(2)
+	res = summary(read_records(args, tool))
+	for tool in res:
+		print('%s' % tool)
+		print('  %-12s %7s %9s %9s %9s %9s %9s %9s' % ('stage', 'count', 'time(s)', 'p95',
+			'max', 'mem(MB)', 'p95', 'max'))
+		for name, row in res[tool].items():
+			print('  %-12s %7d %9.3f %9.3f %9.3f %9.1f %9.1f %9.1f' % ((name,) + row))
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -5,13 +5,21 @@ Created on Mon Oct 19 16:28:22 2020
 
 This program is use to plot polarization map from vlbi fits image.
 You should specify the input fits images by -i or --infile,
-	output file by -o or --output,
+	output file by -o or --output, many files with their dpi: "a.pdf a.png:300 a.jpg:50",
 	contour levs by -l or --levs
 	contour base by -c or --cmul
 	polarization parameters by -p or --pol: "icut pcut inc scale"
+	cut by the local rms maps by -s or --snr: "isnr psnr", instead of icut and pcut
+	processes of tiled contour tracing by -j or --nproc,
+	cache the contours on disk by --cache,
+	simplify the contours to a tolerance (pixels of the output) by --simplify,
+	rasterize layers in pdf by --raster: "image vectors low" (low contours)
 	plot window by -w or --win
 	restore beam position by -b or --bpos
 	figsize by -f or --figsize
+	time and memory of every stage by --profile <file> (JSON lines, perflog.py)
+	peak memory budget (MB) by --lowmem, the images are read in strips (lowmem.py)
+	plot again when the files or the parameters (file) change by --watch <params.txt> (watch.py)
 
 Installation:
 1. copy file
@@ -30,12 +38,17 @@ Running like this:
 Examples:
 	1. polplot.py -i 'c.fits q.fits u.fits' -o 'pol-zoom.pdf' -c 1.6e-4 -w '5 -5 -5 5' -f '6.8 6' -p '1.28e-3 1.6e-4 3 0.05'
 	2. polplot.py -i 'c.fits q.fits u.fits' -o 'pol.pdf' -c 1.6e-4 -w '10 -5 -25 5' -f '4.0 6' -p '1.28e-3 1.6e-4 3 0.05'
+	3. polplot.py -i 'c.fits q.fits u.fits' -o 'pol.pdf' -c 1.6e-4 -w '10 -5 -25 5' -p '0 0 3 0.05' -s '5 3'
+	4. polplot.py -i 'c.fits q.fits u.fits' -o 'pol.pdf' -c 1.6e-4 -p '1.28e-3 1.6e-4 3 0.05' -d 300 --simplify 0.5 --raster 'image vectors'
+	5. polplot.py -i 'c.fits q.fits u.fits' -o 'pol.pdf' -c 1.6e-4 -p '1.28e-3 1.6e-4 3 0.05' --lowmem 500
+	6. polplot.py -i 'c.fits q.fits u.fits' -o 'pol.png' -c 1.6e-4 -p '1.28e-3 1.6e-4 3 0.05' --watch params.txt
 
 @author: Li, Xiaofeng
 Shanghai Astronomical Observatory, Chinese Academy of Sciences
 E-mail: lixf@shao.ac.cn; 1650152531@qq.com
 """
 
+import os
 import sys
 import getopt
 import numpy as np
@@ -43,7 +56,6 @@ import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 from matplotlib.patches import Ellipse
 from astropy.io import fits
-from astropy.table import Table
 
 def world2pix(w, h):
 	if w == None:
@@ -81,6 +93,7 @@ def add_beam(ax, win, h, bpos=None, pad=2.0):
 
 def annotate(ax, notefile=''):
 	if notefile != '':
+		from astropy.table import Table
 		tab = Table.read(notefile, format='csv')
 		for t in tab:
 			ax.text(t['x'], t['y'], t['text'])
@@ -136,32 +149,9 @@ def get_normalize(args, vmin=0.0, vmax=1.0):
 	return norm
 
 def add_annotation(ax, infile=''):
-	if infile == '':
-		return
-
-	with open(infile, 'r') as f:
-		for line in f.readlines():
-			row = line.split(',')
-			row = [col.strip() for col in row]
-			typ = row[0]
-			args = row[1:]
-			if typ == 'text':
-				x, y, text = args
-				x, y = float(x), float(y)
-				ax.text(x, y, text)
-			elif typ == 'arrow':
-				x1, y1, x2, y2 = np.array(args, dtype='f4')
-				ax.annotate("", xy=(x1, y1), xytext=(x2, y2), 
-				arrowprops=dict(arrowstyle="->", connectionstyle="arc3"))
-			elif typ == 'annotation':
-				x1, y1, x2, y2 = np.array(args[:-1], dtype='f4')
-				text = args[-1]
-				ax.annotate(text, xy=(x1, y1), xytext=(x2, y2),
-				 arrowprops=dict(arrowstyle="->", connectionstyle="arc3"))
-			elif typ == 'ellipse':
-				x, y, majax, minax, pa = np.array(args, dtype='f4')
-				e = Ellipse((x,y), majax, minax, angle=pa, lw=0.5, fc='none', ec='blue')
-				ax.add_artist(e)
+# all ellipses and arrows in two collections, the texts in the window (annotation.py)
+	from annotation import draw_annotation
+	draw_annotation(ax, infile, ec='blue')
 
 def set_axis(ax, w):
 	ax.set_aspect('equal')
@@ -174,22 +164,25 @@ def set_axis(ax, w):
 	ax.minorticks_on()
 
 def savefig(outfile, dpi=300):
-	if outfile.lower().endswith('.pdf') :
-		plt.savefig(outfile)
-	elif outfile.lower().endswith('.jpg') or outfile.lower().endswith('.jpeg'):
-		plt.savefig(outfile, dpi=dpi)
-	elif outfile.lower().endswith('.png'):
-		plt.savefig(outfile, dpi=dpi)
+# outfile can be many files with their dpi, e.g. "a.pdf a.png:300 a.jpg:50"
+	from multisave import save_all
+	save_all(plt.gcf(), outfile, dpi)
 
 def polplot(ifile, qfile, ufile, outfile, cmul, icut, pcut, inc=3, scale=30.0,
 			levs=None, win=None, bpos=None, figsize=None, dpi=100, annotationfile='', 
-			cmap='', ncut=0, norm='', fraction=0.05):
+			cmap='', ncut=0, norm='', fraction=0.05, snr=None, nproc=None, cache=False,
+			simplify=0.0, raster=None, profile='', lowmem=None):
+	if raster == None:
+		raster = []
+	from perflog import get_profile
+	prof = get_profile('polplot', ifile, profile)
 	if levs==None:
 		levs = [-1] + np.logspace(0, 10, 10, base=2).tolist()
 		levs = cmul * np.array(levs)
 	if figsize == None :
 		figsize = (6, 6)
 
+	prof.stage('read')
 	hdul = fits.open(ifile)
 	h = hdul[0].header
 	if win == None:
@@ -197,18 +190,58 @@ def polplot(ifile, qfile, ufile, outfile, cmul, icut, pcut, inc=3, scale=30.0,
 		W = world2pix(None, h)
 	else:
 		W = world2pix(win, h)
-	I = hdul[0].data[0, 0, W[2]:(W[3]+1), W[0]:(W[1]+1)]
-	hdul = fits.open(qfile)
-	Q = hdul[0].data[0, 0, W[2]:(W[3]+1), W[0]:(W[1]+1)]
-	hdul = fits.open(ufile)
-	U = hdul[0].data[0, 0, W[2]:(W[3]+1), W[0]:(W[1]+1)]
-	P = np.sqrt(Q**2+U**2)
+	W1 = [W[0], W[1]+1, W[2], W[3]+1]
+	budget = None
+	if lowmem != None or os.environ.get('VLPY_MEMORY', '') != '':
+		from lowmem import get_budget, check_budget, Plane, window_shape, min_factor, read_window
+		budget = get_budget(lowmem)
+	if budget != None:
+	# low memory mode, I, Q and U are read in strips and reduced by g x g blocks
+		from mapplot import reduce_extent
+		p = Plane(ifile, budget=budget)
+		shape = window_shape(p, W1)
+		g = min_factor(p, shape, 64)
+		if g > 1:
+			print('Low memory: reduce the images by %d x %d blocks' % (g, g))
+		I = read_window(p, W1, g)
+		Q = read_window(Plane(qfile, budget=budget), W1, g)
+		U = read_window(Plane(ufile, budget=budget), W1, g)
+		extent = reduce_extent(win, shape, g)
+		inc = max(int(round(inc/g)), 1)
+		prof.set(shape=shape, budget=budget)
+	else:
+		g = 1
+		I = hdul[0].data[0, 0, W[2]:(W[3]+1), W[0]:(W[1]+1)]
+		hdul = fits.open(qfile)
+		Q = hdul[0].data[0, 0, W[2]:(W[3]+1), W[0]:(W[1]+1)]
+		hdul = fits.open(ufile)
+		U = hdul[0].data[0, 0, W[2]:(W[3]+1), W[0]:(W[1]+1)]
+		extent = win
+		prof.set(shape=I.shape)
+	prof.stage('polarization')
+	P = np.hypot(Q, U)
 	fp = np.divide(P, I)
-	mask = np.logical_or(I<icut, P<pcut)
-	Q[mask] = np.nan
-	U[mask] = np.nan
+	if snr != None:
+		if budget != None:
+			from noisemap import local_rms
+			rms = lambda f: read_window(Plane(local_rms(f), budget=budget), W1, g)
+		else:
+			from noisemap import read_rms
+			rms = lambda f: read_rms(f, W1)
+		mask = I < snr[0]*rms(ifile)
+		prms = np.square(rms(qfile))
+		prms += np.square(rms(ufile))
+		prms *= 0.5
+		np.sqrt(prms, out=prms)
+		mask |= P < snr[1]*prms
+		del prms
+	else:
+		mask = I < icut
+		mask |= P < pcut
+# the vectors of masked pixels are nan by P
 	P[mask] = np.nan
 	fp[mask] = np.nan
+	del mask
 	
 	
 	if cmap == '':
@@ -219,38 +252,67 @@ def polplot(ifile, qfile, ufile, outfile, cmul, icut, pcut, inc=3, scale=30.0,
 		norm = 'linear %.3f %.3f' % (vmin, vmax)
 	norm = get_normalize(norm, vmin, vmax)
 
+	prof.stage('figure')
 	fig, ax = plt.subplots()
 	fig.set_size_inches(figsize)
-	ax.contour(I, levs, extent=win, 	linewidths=0.5, colors='k')
+	prof.stage('contour')
+	if nproc != None or cache or simplify > 0.0 or 'low' in raster:
+		from ctrace import contour as tcontour
+	# the contours of I are not masked, only the reduction of the window changes them
+		key = (ifile, W, 'polplot g %d' % g) if cache else None
+		from multisave import max_dpi
+		tcontour(ax, I, levs, extent, nproc=nproc, cache=key, tol=simplify, dpi=max_dpi(outfile, dpi),
+			rasterlow='low' in raster, linewidths=0.5, colors='k')
+	else:
+		ax.contour(I, levs, extent=extent, linewidths=0.5, colors='k')
 
-	pcm = ax.imshow(fp, extent=win, cmap=cmap, norm=norm, origin='lower', 
-				 interpolation='none')
+	prof.stage('imshow')
+	pcm = ax.imshow(fp, extent=extent, cmap=cmap, norm=norm, origin='lower', 
+				 interpolation='none', rasterized='image' in raster)
 	cbar = fig.colorbar(pcm, ax=ax, fraction=fraction)
 #	cbar.ax.minorticks_off()
 	cbar.ax.tick_params('both',direction='in',right=True,top=True,which='both')
 	cbar.ax.tick_params(axis='y', labelrotation=90)
-	x, y = np.meshgrid(np.arange(win[0], win[1], -0.1), 
-					np.arange(win[2],win[3], 0.1))
-	chi = 0.5 * np.arctan2(U, Q)
-	u = P * (-np.sin(chi))
-	v = P * np.cos(chi)
-	ax.quiver(x[::inc,::inc], y[::inc,::inc], u[::inc,::inc], v[::inc,::inc], 
+	prof.stage('vectors')
+# the angles and vectors of every inc pixels only, at the pixels of the images
+	dx = h['cdelt1']*3.6E6 * g
+	dy = h['cdelt2']*3.6E6 * g
+	x, y = np.meshgrid(win[0] + np.arange(0, I.shape[1], inc)*dx,
+					win[2] + np.arange(0, I.shape[0], inc)*dy)
+	chi = 0.5 * np.arctan2(U[::inc,::inc], Q[::inc,::inc])
+	u = P[::inc,::inc] * (-np.sin(chi))
+	v = P[::inc,::inc] * np.cos(chi)
+	ax.quiver(x, y, u, v, 
 		   scale=scale, width=0.003, headlength=0, 
-		   headaxislength=0, headwidth=0, pivot='middle', lw=0.1)
+		   headaxislength=0, headwidth=0, pivot='middle', lw=0.1,
+		   rasterized='vectors' in raster)
 
+	prof.stage('layout')
 	set_axis(ax, win)
 	add_beam(ax, win, h, bpos=bpos)
 #	add_annotate(ax, h)
 	add_annotation(ax, annotationfile)
 	fig.tight_layout(pad=0.5)
 	if outfile != '':
+		prof.stage('save')
 		savefig(outfile, dpi)
 	hdul.close()
+	if budget != None:
+		check_budget(budget)
+	prof.close()
+# the range of the full image too, for a new norm of the same image (watch.py)
+	return fig, ax, (vmin, vmax)
 
 def myhelp():
 	print('Error: polplot.py -c <1.2e-3> -w  "<10 -5 -25 5>" -p "<1.28e-3 1.6e-4 3 0.05>" <i.fits> <q.fits> <u.fits>')
 	print('  or: polplot.py -c <1.2e-3> -w  "<10 -5 -25 5>" -p "<1.28e-3 1.6e-4 3 0.05>" <i.fits> <q.fits> <u.fits> <out.pdf>')
 	print('  or: polplot.py -i "<i.fits q.fits u.fits>" -o "<out.pdf>" -c <1.2e-3> -w <10 -5 -25 5> -p "<1.28e-3 1.6e-4 3 0.05>"')
+	print('  or: polplot.py -i "<i.fits q.fits u.fits>" -o "<out.pdf>" -c <1.2e-3> -w <10 -5 -25 5> -p "<0 0 3 0.05>" -s "<5 3>"')
+	print('  or: polplot.py -j <8> --cache -i "<i.fits q.fits u.fits>" -o "<out.pdf>" -c <1.2e-3> -p "<1.28e-3 1.6e-4 3 0.05>"')
+	print('  or: polplot.py -d <300> --simplify <0.5> --raster "<image vectors low>" -i "<i.fits q.fits u.fits>" -o "<out.pdf>" -c <1.2e-3> -p "<1.28e-3 1.6e-4 3 0.05>"')
+	print('  or: polplot.py --profile <prof.jsonl> -i "<i.fits q.fits u.fits>" -o "<out.pdf>" -c <1.2e-3> -p "<1.28e-3 1.6e-4 3 0.05>"')
+	print('  or: polplot.py --lowmem <500> -i "<i.fits q.fits u.fits>" -o "<out.pdf>" -c <1.2e-3> -p "<1.28e-3 1.6e-4 3 0.05>"')
+	print('  or: polplot.py --watch <params.txt> -i "<i.fits q.fits u.fits>" -o "<out.png>" -c <1.2e-3> -p "<1.28e-3 1.6e-4 3 0.05>"')
 	
 def main(argv):
 	ifile = ''
@@ -272,12 +334,20 @@ def main(argv):
 	ncut = 0
 	norm = ''
 	fraction = 0.05
+	snr = None
+	nproc = None
+	cache = False
+	simplify = 0.0
+	raster = []
+	profile = ''
+	lowmem = None
+	watchfile = ''
 
 	try:
-		opts, args = getopt.getopt(argv, "hi:o:f:d:w:b:l:c:l:p:a:n:N:", 
+		opts, args = getopt.getopt(argv, "hi:o:f:d:w:b:l:c:l:p:a:n:N:s:j:", 
 							 ['help', 'infile=', 'outfile=', 'figsize=', 'dpi=', 'win=', 
 		 'bpos=', 'cmul=', 'levs=', 'pol=', 'annotatefile=', 'colormap=', 
-		 'ncut=', 'norm=', 'fraction='])
+		 'ncut=', 'norm=', 'fraction=', 'snr=', 'nproc=', 'cache', 'simplify=', 'raster=', 'profile=', 'lowmem=', 'watch='])
 	except getopt.GetoptError:
 		myhelp()
 		sys.exit(2)
@@ -315,6 +385,22 @@ def main(argv):
 			norm = arg
 		elif opt in ('--fraction',):
 			fraction = float(arg)
+		elif opt in ('-s', '--snr'):
+			snr = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-j', '--nproc'):
+			nproc = int(arg)
+		elif opt in ('--cache', ):
+			cache = True
+		elif opt in ('--simplify', ):
+			simplify = float(arg)
+		elif opt in ('--raster', ):
+			raster = arg.split()
+		elif opt in ('--profile', ):
+			profile = arg
+		elif opt in ('--lowmem', ):
+			lowmem = float(arg)
+		elif opt in ('--watch', ):
+			watchfile = arg
 
 	if ifile=='' and len(args)==3:
 		ifile, qfile, ufile = args.split()
@@ -323,10 +409,16 @@ def main(argv):
 	if outfile == '' :
 		outfile == 'out.pdf'
 
-	polplot(ifile, qfile, ufile, outfile, cmul, icut, pcut, inc=inc, 
+	kw = dict(ifile=ifile, qfile=qfile, ufile=ufile, outfile=outfile, cmul=cmul, icut=icut, pcut=pcut, inc=inc, 
 		 scale=scale, levs=levs, win=win, bpos=bpos, figsize=figsize, dpi=dpi,
 		 annotationfile=annotationfile, cmap=colormap, ncut=ncut, 
-		 norm=norm, fraction=fraction)
+		 norm=norm, fraction=fraction, snr=snr, nproc=nproc, cache=cache,
+		 simplify=simplify, raster=raster, profile=profile, lowmem=lowmem)
+	if watchfile != '':
+		from watch import watch
+		watch('polplot', kw, watchfile)
+	else:
+		polplot(**kw)
 
 if __name__ == '__main__' :
 	main(sys.argv[1:])
\ No newline at end of file
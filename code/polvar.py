@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Nov  2 15:47:18 2026
+
+This program is use to calculate the polarization variability maps of many
+epochs: the mean and the standard deviation of the fractional polarization,
+and the circular mean and the circular standard deviation of the EVPA, of
+every pixel. The epochs (I, Q and U fits images) are read one by one, put on
+the grid of the first epoch and convolved to a common beam as diffmap.py, and
+added to one-pass (Welford) accumulators, so only the accumulators of a few
+maps are in memory for any number of epochs. The pixels of an epoch below
+icut (I) or pcut (polarized intensity) are not used, the same as polplot.py.
+The EVPA is averaged as the unit vector of 2 chi (Q/P, U/P), the mean EVPA is
+half of its angle, and the standard deviation of the EVPA is half of the
+circular standard deviation of 2 chi, sqrt(-2 ln R)/2, R the length of the
+mean vector. The pixels with less than -m epochs are nan.
+The maps are saved as xxx.fpmean.fits, xxx.fpstd.fits, xxx.evpa.fits,
+xxx.evpastd.fits (deg) and xxx.nepoch.fits (number of epochs of the pixels),
+and plotted as polplot.py: the contours of the mean I, one of the maps in
+color (the std of the fractional polarization by default), and the vectors of
+the mean EVPA with the length of the mean polarized intensity.
+You can specify the epochs by -i or --infile: "i1.fits q1.fits u1.fits i2.fits ...",
+	or by -l or --list, a file of one epoch "i.fits q.fits u.fits" per line,
+	output figure by -o or --outfile, output fits files by -F or --fits (xxx),
+	polarization parameters by -p or --pol: "icut pcut inc scale",
+	minimum epochs of a pixel by -m or --min (default 2),
+	common beam by -b or --beam "bmaj bmin bpa" (mas, deg),
+	map in color by --color: fpmean, fpstd, evpa, evpastd or nepoch,
+	contour base by -c or --cmul (default 3 rms of the mean I), plot window by -w or --win,
+	normalize by -n or --norm and colormap by --colormap and -N or --ncut,
+	figsize by -f or --figsize and dpi by -d or --dpi
+
+Installation:
+1. copy file
+	chmod a+x polvar.py
+	cp polvar.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	polvar.py -l <epochs.txt> -o <polvar.pdf> -F <cta102> -c 1.6e-4 -p '1.28e-3 1.6e-4 3 0.05'
+	polvar.py -i "<i1.fits> <q1.fits> <u1.fits> <i2.fits> <q2.fits> <u2.fits>" -o <polvar.pdf> -p '1.28e-3 1.6e-4 3 0.05' --color evpastd
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import getopt
+import numpy as np
+from astropy.io import fits
+
+names = ('fpmean', 'fpstd', 'evpa', 'evpastd', 'nepoch')
+units = {'fpmean': '', 'fpstd': '', 'evpa': 'DEGREE', 'evpastd': 'DEGREE', 'nepoch': ''}
+
+class PolStats:
+# one-pass statistics of the epochs, the means are updated as Welford
+	def __init__(self, shape):
+		self.n = np.zeros(shape)
+		self.nI = np.zeros(shape)
+		self.I = np.zeros(shape)
+		self.P = np.zeros(shape)
+		self.fp = np.zeros(shape)
+		self.m2 = np.zeros(shape)
+		self.c = np.zeros(shape)
+		self.s = np.zeros(shape)
+
+	def add(self, I, Q, U, icut, pcut):
+		good = np.isfinite(I)
+		self.nI += good
+		update(self.I, np.where(good, I, 0.0), self.nI, good)
+		P = np.hypot(Q, U)
+		with np.errstate(invalid='ignore', divide='ignore'):
+			ok = good & (I >= icut) & (P >= pcut) & (P > 0)
+			fp = np.where(ok, P / I, 0.0)
+			c = np.where(ok, Q / P, 0.0)
+			s = np.where(ok, U / P, 0.0)
+		self.n += ok
+		update(self.P, np.where(ok, P, 0.0), self.n, ok)
+		delta = update(self.fp, fp, self.n, ok)
+		self.m2 += np.where(ok, delta * (fp - self.fp), 0.0)
+		update(self.c, c, self.n, ok)
+		update(self.s, s, self.n, ok)
+		return np.count_nonzero(ok)
+
+	def maps(self, nmin=2):
+		bad = self.n < max(nmin, 1)
+		with np.errstate(invalid='ignore', divide='ignore'):
+			fpstd = np.sqrt(self.m2 / (self.n - 1))
+			R = np.minimum(np.hypot(self.c, self.s), 1.0)
+			evpastd = np.degrees(0.5 * np.sqrt(-2 * np.log(R)))
+		res = {'fpmean': self.fp.copy(), 'fpstd': fpstd,
+			'evpa': np.degrees(0.5 * np.arctan2(self.s, self.c)), 'evpastd': evpastd}
+		for key in res:
+			res[key][bad] = np.nan
+		res['nepoch'] = self.n.copy()
+		return res
+
+def update(mean, x, n, ok):
+# mean += (x - mean) / n of the pixels ok, returns x - old mean
+	delta = x - mean
+	mean += np.divide(delta, n, out=np.zeros_like(mean), where=ok)
+	return delta
+
+def read_epochs(listfile):
+	epochs = []
+	with open(listfile, 'r') as f:
+		for line in f:
+			row = line.split()
+			if len(row) >= 3 and not line.startswith('#'):
+				epochs.append(row[:3])
+	return epochs
+
+def load_epoch(files, ht, beam):
+# I, Q, U of an epoch on the grid ht and the common beam
+	from diffmap import beam_of, convolve, regrid
+	res = []
+	for infile in files:
+		with fits.open(infile) as hdul:
+			h = hdul[0].header
+			img = np.array(hdul[0].data[0, 0], dtype=np.float64)
+		img = convolve(img, h, beam_of(h), beam)
+		res.append(regrid(img, h, ht))
+	return res, h
+
+def write_maps(base, maps, ht, epochs, icut, pcut):
+	outfiles = []
+	for key in names:
+		h = ht.copy()
+		h['BITPIX'] = -32
+		for k in ('BSCALE', 'BZERO', 'BLANK'):
+			h.remove(k, ignore_missing=True)
+		h['BUNIT'] = units[key]
+		h['PVNEPOCH'] = (len(epochs), 'number of epochs')
+		h['PVICUT'] = (icut, 'cut of I (Jy/beam)')
+		h['PVPCUT'] = (pcut, 'cut of polarized intensity (Jy/beam)')
+		for e in epochs:
+			h.add_history('polvar.py: %s %s %s' % tuple(e))
+		outfile = '%s.%s.fits' % (base, key)
+		fits.writeto(outfile, maps[key].astype(np.float32).reshape((1, 1) + maps[key].shape), h,
+			overwrite=True)
+		outfiles.append(outfile)
+	return outfiles
+
+def plot_polvar(maps, I, P, ht, outfile, cmul, inc=3, scale=30.0, win=None, color='fpstd',
+				norm='', cmap='', ncut=0, figsize=(6, 6), dpi=100, title=''):
+	import matplotlib.pyplot as plt
+	from polplot import world2pix, pix2world, add_beam, set_axis, cut_cmap, get_normalize, savefig
+	if win == None:
+		win = pix2world(None, ht)
+		W = world2pix(None, ht)
+	else:
+		W = world2pix(win, ht)
+	sub = lambda a: a[W[2]:(W[3]+1), W[0]:(W[1]+1)]
+	img = sub(maps[color])
+	vmin, vmax = np.nanmin(img), np.nanmax(img)
+	if norm == '':
+		norm = 'linear %.3f %.3f' % (vmin, vmax)
+	norm = get_normalize(norm, vmin, vmax)
+	if cmap == '':
+		cmap = 'rainbow'
+	fig, ax = plt.subplots()
+	fig.set_size_inches(figsize)
+	levs = cmul * np.array([-1] + np.logspace(0, 10, 10, base=2).tolist())
+	ax.contour(sub(I), levs, extent=win, linewidths=0.5, colors='k')
+	pcm = ax.imshow(img, extent=win, cmap=cut_cmap(cmap, ncut), norm=norm, origin='lower',
+		interpolation='none')
+	cbar = fig.colorbar(pcm, ax=ax, fraction=0.05)
+	cbar.ax.tick_params('both',direction='in',right=True,top=True,which='both')
+	cbar.ax.tick_params(axis='y', labelrotation=90)
+	cbar.set_label(color)
+# the vectors of the mean EVPA, with the length of the mean polarized intensity
+	chi = np.radians(sub(maps['evpa'])[::inc,::inc])
+	p = np.where(np.isfinite(chi), sub(P)[::inc,::inc], np.nan)
+	dx = ht['cdelt1']*3.6E6
+	dy = ht['cdelt2']*3.6E6
+	x, y = np.meshgrid(win[0] + np.arange(0, img.shape[1], inc)*dx,
+					win[2] + np.arange(0, img.shape[0], inc)*dy)
+	ax.quiver(x, y, p * (-np.sin(chi)), p * np.cos(chi),
+		   scale=scale, width=0.003, headlength=0,
+		   headaxislength=0, headwidth=0, pivot='middle', lw=0.1)
+	set_axis(ax, win)
+	add_beam(ax, win, ht)
+	ax.text(0.03, 0.95, title, transform=ax.transAxes)
+	fig.tight_layout(pad=0.5)
+	if outfile != '':
+		savefig(outfile, dpi)
+	return fig, ax
+
+def polvar(epochs, outfile='', fitsbase='', cmul=None, icut=0.0, pcut=0.0, inc=3, scale=30.0,
+		   nmin=2, beam=None, win=None, color='fpstd', norm='', cmap='', ncut=0,
+		   figsize=(6, 6), dpi=100):
+# epochs: [(i.fits, q.fits, u.fits), ...], read one by one
+	from diffmap import common_beam
+	headers = [fits.getheader(e[0]) for e in epochs]
+	if beam == None:
+		beam = common_beam(headers)
+	ht = headers[0].copy()
+	ht['bmaj'], ht['bmin'], ht['bpa'] = beam[0]/3.6E6, beam[1]/3.6E6, beam[2]
+	print('%d epochs, common beam: %.3f x %.3f mas, %.1f deg' % ((len(epochs), ) + tuple(beam)))
+	stats = PolStats((ht['naxis2'], ht['naxis1']))
+	dates = []
+	for e in epochs:
+		(I, Q, U), h = load_epoch(e, ht, beam)
+		npix = stats.add(I, Q, U, icut, pcut)
+		dates.append(h.get('date-obs', os.path.basename(e[0])))
+		print('%s: %d polarized pixels' % (dates[-1], npix))
+		del I, Q, U
+	maps = stats.maps(nmin)
+	if fitsbase != '':
+		for f in write_maps(fitsbase, maps, ht, epochs, icut, pcut):
+			print('Write %s' % f)
+	if outfile != '':
+		if cmul == None:
+			from contour import calc_rms
+			cmul = 3 * calc_rms(stats.I[np.isfinite(stats.I)])
+			print('Set cmul = %.2f mJy/beam' % (cmul*1000))
+		title = '%s - %s, %d epochs' % (min(dates), max(dates), len(epochs))
+		plot_polvar(maps, stats.I, stats.P, ht, outfile, cmul, inc, scale, win, color,
+			norm, cmap, ncut, figsize, dpi, title)
+	return maps
+
+def myhelp():
+	print("Help: polvar.py -l <epochs.txt> -o <polvar.pdf> -F <cta102> -c 1.6e-4 -p '1.28e-3 1.6e-4 3 0.05'")
+	print('  or: polvar.py -i "<i1.fits> <q1.fits> <u1.fits> <i2.fits> <q2.fits> <u2.fits>" -o <polvar.pdf> -p "<1.28e-3 1.6e-4 3 0.05>" --color evpastd')
+
+def main(argv):
+	infiles = []
+	listfile = ''
+	outfile = ''
+	fitsbase = ''
+	cmul = None
+	icut = 0.0
+	pcut = 0.0
+	inc = 3
+	scale = 30.0
+	nmin = 2
+	beam = None
+	win = None
+	color = 'fpstd'
+	norm = ''
+	colormap = ''
+	ncut = 0
+	figsize = (6, 6)
+	dpi = 100
+
+	try:
+		opts, args = getopt.getopt(argv, "hi:l:o:F:c:p:m:b:w:n:N:f:d:",
+							 ['help', 'infile=', 'list=', 'outfile=', 'fits=', 'cmul=', 'pol=',
+		 'min=', 'beam=', 'win=', 'color=', 'norm=', 'colormap=', 'ncut=', 'figsize=', 'dpi='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-i', '--infile'):
+			infiles = arg.split()
+		elif opt in ('-l', '--list'):
+			listfile = arg
+		elif opt in ('-o', '--outfile'):
+			outfile = arg
+		elif opt in ('-F', '--fits'):
+			fitsbase = arg
+		elif opt in ('-c', '--cmul'):
+			cmul = float(arg)
+		elif opt in ('-p', '--pol'):
+			icut, pcut, inc, scale = np.array(arg.split(), dtype=np.float64).tolist()
+			inc = int(inc)
+		elif opt in ('-m', '--min'):
+			nmin = int(arg)
+		elif opt in ('-b', '--beam'):
+			beam = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-w', '--win'):
+			win = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('--color', ):
+			color = arg
+		elif opt in ('-n', '--norm'):
+			norm = arg
+		elif opt in ('--colormap', ):
+			colormap = arg
+		elif opt in ('-N', '--ncut'):
+			ncut = int(arg)
+		elif opt in ('-f', '--figsize'):
+			figsize = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-d', '--dpi'):
+			dpi = int(arg)
+	if len(infiles) == 0:
+		infiles = args
+	epochs = [infiles[i:i+3] for i in range(0, len(infiles) - 2, 3)]
+	if listfile != '':
+		epochs += read_epochs(listfile)
+	if len(epochs) < 2 or color not in names:
+		myhelp()
+		sys.exit(2)
+	if outfile == '' and fitsbase == '':
+		outfile = 'polvar.pdf'
+	polvar(epochs, outfile, fitsbase, cmul, icut, pcut, inc, scale, nmin, beam, win, color,
+		norm, colormap, ncut, figsize, dpi)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
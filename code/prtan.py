@@ -29,7 +29,6 @@ E-mail: lixf@shao.ac.cn; 1650152531@qq.com
 import sys
 import getopt
 import numpy as np
-from astropy.io import fits
 
 def prtrow(anname, x):
 	re, im = x[::2], x[1::2]
@@ -44,19 +43,17 @@ def prtrow(anname, x):
 	return line
 
 def prtan(infile, outfile, ver=1):
-	hdul = fits.open(infile)
-	for hdu in hdul:
-		if hdu.name == 'AIPS AN' and hdu.ver == ver:
-			break
-
-	if hdu.name != 'AIPS AN' or hdu.ver != ver:
-		print("AN %d doesn't exist!!!")
+	from fitstab import read_table
+	try:
+		an = read_table(infile, 'AIPS AN', ver)
+	except KeyError:
+		print("AN %d doesn't exist!!!" % ver)
 		sys.exit(1)
 
 	text = ''
-	for an in hdu.data:
-		text += prtrow(an['anname'], an['polcala'])
-		text += prtrow('  ', an['polcalb'])
+	for i in range(len(an['ANNAME'])):
+		text += prtrow(an['ANNAME'][i], an['POLCALA'][i])
+		text += prtrow('  ', an['POLCALB'][i])
 
 	if outfile != '':
 		with open(outfile, 'w') as f:
@@ -65,8 +62,6 @@ def prtan(infile, outfile, ver=1):
 		text = text.replace('\\','').replace('&', '|')
 		print(text)
 
-	hdul.close()
-
 def myhelp():
 	print('Error: prtan.py <test.fits>')
 	print(' or: prtan.py <test.fits> <out.txt>')
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 15:26:09 2026
+
+This program is use to extract the ridge line and the transverse profiles of a jet.
+The jet is described by a polyline in relative R.A. and Dec. (mas). The image is
+sampled along the polyline and along transverse cuts at many positions of the
+polyline; all samples of an image are interpolated in one call. A Gaussian is
+fitted to every cut, its center gives the ridge line and its FWHM gives the jet
+width (also deconvolved with the beam along the cut).
+The same cuts are applied to all input epochs by a pool of processes.
+You can specify the input images by -i or --infile,
+	jet polyline by -l or --line: "x1 y1 x2 y2 ...",
+	distance between cuts (mas) by -s or --step,
+	half length of cuts (mas) by -w or --width,
+	samples of a cut by -n or --nsample,
+	output table of the cuts by -o or --outfile,
+	output table of the profile along the polyline by -p or --profile,
+	contour plot with the cuts and ridge line by -O or --overlay
+
+Installation:
+1. copy file
+	chmod a+x ridge.py
+	cp ridge.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	ridge.py -l "0 0 2 -5 6 -14" <input.fits>
+	ridge.py -l "0 0 2 -5 6 -14" -s 0.5 -w 3 -o cuts.txt -O ridge.pdf <epoch1.fits> <epoch2.fits> ...
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import getopt
+import numpy as np
+from multiprocessing import Pool
+from astropy.io import fits
+from astropy.table import Table, vstack
+from astropy.time import Time
+from scipy.ndimage import map_coordinates
+
+def polyline_points(line, step):
+# points and unit tangents every step (mas) along the polyline
+	line = np.reshape(line, (-1, 2))
+	seg = np.diff(line, axis=0)
+	seglen = np.hypot(seg[:, 0], seg[:, 1])
+	cum = np.r_[0, np.cumsum(seglen)]
+	dist = np.arange(0, cum[-1] + 0.5*step, step)
+	dist = dist[dist <= cum[-1]]
+	k = np.clip(np.searchsorted(cum, dist, side='right') - 1, 0, seg.shape[0]-1)
+	tangent = seg[k] / seglen[k, None]
+	points = line[k] + tangent * (dist - cum[k])[:, None]
+	return dist, points, tangent
+
+def make_cuts(line, step=0.5, width=3.0, nsample=61):
+	dist, center, tangent = polyline_points(line, step)
+	normal = np.c_[tangent[:, 1], -tangent[:, 0]]
+	offset = np.linspace(-width, width, nsample)
+	cuts = center[:, None, :] + offset[None, :, None] * normal[:, None, :]
+	return dist, center, normal, offset, cuts
+
+def sample_image(infile, points):
+# interpolate the image at points (..., 2) in mas, in one call
+	with fits.open(infile, memmap=True) as hdul:
+		h = hdul[0].header
+		X = h['crpix1'] + points[..., 0]/(h['cdelt1']*3.6E6)
+		Y = h['crpix2'] + points[..., 1]/(h['cdelt2']*3.6E6)
+		x0 = max(int(np.floor(np.min(X))) - 1, 0)
+		x1 = min(int(np.ceil(np.max(X))) + 2, h['naxis1'])
+		y0 = max(int(np.floor(np.min(Y))) - 1, 0)
+		y1 = min(int(np.ceil(np.max(Y))) + 2, h['naxis2'])
+		img = np.array(hdul[0].data[0, 0, y0:y1, x0:x1], dtype=np.float64)
+	values = map_coordinates(img, [Y - y0, X - x0], order=1, mode='constant', cval=np.nan)
+	return values, h
+
+def fit_gaussian(offset, prof, frac=0.2):
+# weighted fit of ln(prof) with a parabola for all cuts at once (Caruana's algorithm)
+	peak = np.nanmax(prof, axis=1)
+	ok = np.isfinite(prof) & (prof > frac * peak[:, None]) & (prof > 0)
+	y = np.where(ok, prof, 1.0)
+	w = np.where(ok, y**2, 0.0)
+	s = offset[None, :]
+	m = [np.ones_like(prof), np.broadcast_to(s, prof.shape), np.broadcast_to(s**2, prof.shape)]
+	A = np.empty(prof.shape[:1] + (3, 3))
+	b = np.empty(prof.shape[:1] + (3,))
+	for i in range(3):
+		b[:, i] = np.sum(w * m[i] * np.log(y), axis=1)
+		for j in range(3):
+			A[:, i, j] = np.sum(w * m[i] * m[j], axis=1)
+	good = (np.sum(ok, axis=1) >= 3) & (np.abs(np.linalg.det(A)) > 0)
+	c = np.full(b.shape, np.nan)
+	c[good] = np.linalg.solve(A[good], b[good][..., None])[..., 0]
+	with np.errstate(invalid='ignore', divide='ignore'):
+		c[c[:, 2] >= 0] = np.nan
+		sigma = np.sqrt(-1.0 / (2.0 * c[:, 2]))
+		center = -c[:, 1] / (2.0 * c[:, 2])
+		amp = np.exp(c[:, 0] - c[:, 1]**2 / (4.0 * c[:, 2]))
+	return amp, center, 2.0 * np.sqrt(2.0 * np.log(2.0)) * sigma
+
+def beam_along(h, normal):
+# FWHM of the beam along the cut directions
+	bmaj = h['bmaj'] * 3.6E6
+	bmin = h['bmin'] * 3.6E6
+	phi = np.arctan2(normal[:, 0], normal[:, 1]) - np.radians(h['bpa'])
+	return 1.0 / np.sqrt(np.cos(phi)**2/bmaj**2 + np.sin(phi)**2/bmin**2)
+
+def measure(args):
+	infile, line, step, width, nsample, frac = args
+	dist, center, normal, offset, cuts = make_cuts(line, step, width, nsample)
+	ncut = cuts.shape[0]
+	pts = np.concatenate([cuts.reshape(-1, 2), center])
+	values, h = sample_image(infile, pts)
+	prof = values[:ncut*nsample].reshape(ncut, nsample)
+	along = values[ncut*nsample:]
+	amp, off, fwhm = fit_gaussian(offset, prof, frac)
+	beam = beam_along(h, normal)
+	epoch = Time(h['date-obs']).decimalyear
+	t = Table()
+	t['file'] = [infile] * ncut
+	t['epoch'] = np.full(ncut, epoch)
+	t['dist'] = dist
+	t['x'] = center[:, 0] + off * normal[:, 0]
+	t['y'] = center[:, 1] + off * normal[:, 1]
+	t['peak'] = amp
+	t['fwhm'] = fwhm
+	with np.errstate(invalid='ignore'):
+		t['width'] = np.sqrt(fwhm**2 - beam**2)
+	p = Table()
+	p['file'] = [infile] * ncut
+	p['epoch'] = np.full(ncut, epoch)
+	p['dist'] = dist
+	p['flux'] = along
+	return t, p
+
+def overlay(infile, line, cuts, t, outfile, cmul='', win=None, figsize=None):
+	from contour import contour, savefig
+	fig, ax = contour(infile, cmul, outfile='', win=win, figsize=figsize)
+	line = np.reshape(line, (-1, 2))
+	for cut in cuts:
+		ax.plot(cut[[0, -1], 0], cut[[0, -1], 1], '-', color='gray', lw=0.3)
+	ax.plot(line[:, 0], line[:, 1], '--', color='b', lw=0.8)
+	s = t[t['file'] == infile]
+	ax.plot(s['x'], s['y'], 'r.-', ms=3, lw=0.8)
+	savefig(outfile)
+
+def profile(infiles, line, step=0.5, width=3.0, nsample=61, outfile='', proffile='',
+			overfile='', cmul='', win=None, figsize=None, frac=0.2, nproc=None):
+	if nproc is None:
+		nproc = os.cpu_count()
+	jobs = [(f, line, step, width, nsample, frac) for f in infiles]
+	if nproc > 1 and len(jobs) > 1:
+		with Pool(min(nproc, len(jobs))) as pool:
+			res = pool.map(measure, jobs)
+	else:
+		res = [measure(job) for job in jobs]
+	t = vstack([r[0] for r in res])
+	p = vstack([r[1] for r in res])
+	t.sort(['epoch', 'dist'])
+	p.sort(['epoch', 'dist'])
+	for tab in (t, p):
+		tab['epoch'].info.format = '%.3f'
+		tab['dist'].info.format = '%.3f'
+		tab['dist'].unit = 'mas'
+	for col in ('x', 'y', 'fwhm', 'width'):
+		t[col].info.format = '%.3f'
+		t[col].unit = 'mas'
+	t['peak'].info.format = '%.4f'
+	t['peak'].unit = 'Jy/beam'
+	p['flux'].info.format = '%.4f'
+	p['flux'].unit = 'Jy/beam'
+	if outfile == '':
+		t.pprint(max_lines=-1, max_width=-1)
+	else:
+		t.write(outfile, format='ascii.fixed_width_two_line', overwrite=True)
+	if proffile != '':
+		p.write(proffile, format='ascii.fixed_width_two_line', overwrite=True)
+	if overfile != '':
+		cuts = make_cuts(line, step, width, nsample)[4]
+		overlay(infiles[0], line, cuts, t, overfile, cmul, win, figsize)
+	return t, p
+
+def myhelp():
+	print('Help: ridge.py -l "<x1 y1 x2 y2 ...>" <input.fits>')
+	print('  or: ridge.py -l "<x1 y1 x2 y2 ...>" -s <0.5> -w <3> -o <cuts.txt> -O <ridge.pdf> <epoch1.fits> <epoch2.fits> ...')
+
+def main(argv):
+	infiles = []
+	line = None
+	step = 0.5
+	width = 3.0
+	nsample = 61
+	frac = 0.2
+	outfile = ''
+	proffile = ''
+	overfile = ''
+	cmul = ''
+	win = None
+	figsize = None
+	nproc = None
+
+	try:
+		opts, args = getopt.getopt(argv, "hi:l:s:w:n:o:p:O:c:W:f:j:",
+							 ['help', 'infile=', 'line=', 'step=', 'width=', 'nsample=',
+		 'outfile=', 'profile=', 'overlay=', 'cmul=', 'win=', 'figsize=', 'nproc=',
+		 'frac='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-i', '--infile'):
+			infiles = arg.split()
+		elif opt in ('-l', '--line'):
+			line = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-s', '--step'):
+			step = float(arg)
+		elif opt in ('-w', '--width'):
+			width = float(arg)
+		elif opt in ('-n', '--nsample'):
+			nsample = int(arg)
+		elif opt in ('-o', '--outfile'):
+			outfile = arg
+		elif opt in ('-p', '--profile'):
+			proffile = arg
+		elif opt in ('-O', '--overlay'):
+			overfile = arg
+		elif opt in ('-c', '--cmul'):
+			cmul = arg
+		elif opt in ('-W', '--win'):
+			win = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-f', '--figsize'):
+			figsize = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-j', '--nproc'):
+			nproc = int(arg)
+		elif opt in ('--frac', ):
+			frac = float(arg)
+	if len(infiles) == 0:
+		infiles = args
+	if len(infiles) == 0 or line is None or len(line) < 4 or len(line) % 2 != 0:
+		myhelp()
+		sys.exit(2)
+	profile(infiles, line, step, width, nsample, outfile, proffile, overfile,
+		 cmul, win, figsize, frac, nproc)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 09:32:50 2026
+
+This program is use to make color thumbnails of vlbi fits images quickly.
+The normalizations of mapplot.py (linear, power, log, symlog, twoslope) and the
+colormap of cut_cmap() are applied to the image with numpy, and the PNG file is
+written directly without matplotlib figure, axes, ticks or colorbar.
+Contours and the restoring beam can be burned into the thumbnail.
+You can specify the input images by -i or --infile,
+	output file by -o or --outfile (one input) or output directory by -O or --outdir,
+	thumbnail size (pixels) by -s or --size,
+	plot window by -w or --win,
+	normalize by -n or --norm, the same as mapplot.py,
+	colormap by --colormap and cut of colormap by -N or --ncut,
+	contour base by -c or --cmul, "auto" is 3 times of the image rms,
+	no beam by --nobeam
+
+Installation:
+1. copy file
+	chmod a+x thumb.py
+	cp thumb.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	thumb.py <input.fits>
+	thumb.py -i <input.fits> -o <thumb.png> -s 256 -n 'power 0.5' --colormap gnuplot2 -N 50
+	thumb.py -O thumbs -s 128 -c auto */*.icn.fits
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import getopt
+import zlib
+import struct
+import numpy as np
+from astropy.io import fits
+from mapplot import cut_cmap, block_reduce, word2pix
+
+def normalize(img, args, vmin=0.0, vmax=1.0):
+# the same as get_normalize() in mapplot.py, but applied to img with numpy, except that
+# log uses vmax*1e-4 for a vmin <= 0 (LogNorm of matplotlib fails on it)
+	args = args.split(' ') if args != '' else ['linear']
+	name = args[0]
+	if name == 'linear':
+		if len(args)==3:
+			vmin, vmax = np.array(args[1:], dtype='f4')
+		x = (img - vmin) / (vmax - vmin)
+	elif name == 'power':
+		gamma = 0.5
+		if len(args)==2:
+			gamma = float(args[1])
+		elif len(args)==4:
+			gamma, vmin, vmax = np.array(args[1:], dtype='f4')
+		if gamma < 1.0 and vmin < 0.0:
+			vmin = 0.0
+		x = np.clip((img - vmin) / (vmax - vmin), 0.0, 1.0) ** gamma
+	elif name == 'log':
+		if len(args)==3:
+			vmin, vmax = np.array(args[1:], dtype='f4')
+		if vmin <= 0.0:
+			vmin = vmax * 1.0E-4
+		with np.errstate(invalid='ignore', divide='ignore'):
+			x = (np.log10(img) - np.log10(vmin)) / (np.log10(vmax) - np.log10(vmin))
+	# the pixels <= 0 are masked by LogNorm, colorize() draws them in the bad color
+		x[img <= 0] = np.nan
+	elif name == 'symlog':
+		linscale = 1.0
+		if len(args)==2:
+			linthresh = float(args[1])
+		elif len(args)==3:
+			linthresh, linscale = np.array(args[1:], dtype='f4')
+		elif len(args)==5:
+			linthresh, linscale, vmin, vmax = np.array(args[1:], dtype='f4')
+		def symlog(a):
+			a = np.asarray(a, dtype=np.float64)
+			c = linscale / (1.0 - 0.1)
+			with np.errstate(invalid='ignore', divide='ignore'):
+				y = np.sign(a) * linthresh * (c + np.log10(np.abs(a) / linthresh))
+			return np.where(np.abs(a) > linthresh, y, a * c)
+		lo, hi = symlog(vmin), symlog(vmax)
+		x = (symlog(img) - lo) / (hi - lo)
+	elif name == 'twoslope':
+		vcenter = 0.0
+		if len(args)==2:
+			vcenter = float(args[1])
+		elif len(args)==4:
+			vcenter, vmin, vmax = np.array(args[1:], dtype='f4')
+		x = np.interp(img, [vmin, vcenter, vmax], [0.0, 0.5, 1.0])
+	else:
+		print('Unknown normalize: %s' % name)
+		sys.exit(1)
+	return x
+
+def make_lut(cmap='', ncut=0):
+	if cmap == '':
+		cmap = 'rainbow'
+	cmap = cut_cmap(cmap, ncut)
+	return np.round(np.asarray(cmap.colors)[:, :3] * 255).astype(np.uint8)
+
+def colorize(x, lut, bad=(255, 255, 255)):
+	n = lut.shape[0]
+	good = np.isfinite(x)
+	idx = np.clip(np.where(good, x, 0.0) * n, 0, n - 1).astype(np.intp)
+	rgb = lut[idx]
+	rgb[~good] = bad
+	return rgb
+
+def burn_contours(rgb, img, levs, color=(0, 0, 0)):
+# mark the pixels where any level lies between a pixel and its neighbours
+	k = np.searchsorted(np.sort(levs), img)
+	edge = np.zeros(img.shape, dtype=bool)
+	edge[:, :-1] |= k[:, :-1] != k[:, 1:]
+	edge[:-1, :] |= k[:-1, :] != k[1:, :]
+	rgb[edge] = color
+
+def burn_beam(rgb, h, f, pad=2.0):
+# restoring beam at the bottom left corner, f is the pixel size of the thumbnail
+	bmaj = h['bmaj'] / abs(h['cdelt1']) / f
+	bmin = h['bmin'] / abs(h['cdelt2']) / f
+	bpa = np.radians(h['bpa'])
+	r = int(np.ceil(bmaj / 2.0)) + 1
+	x0, y0 = int(pad * bmaj / 2.0) + r, int(pad * bmaj / 2.0) + r
+	y, x = np.mgrid[-r:r+1, -r:r+1]
+# x is R.A., which increases to the left
+	u = -x*np.sin(bpa) + y*np.cos(bpa)
+	v = -x*np.cos(bpa) - y*np.sin(bpa)
+	inside = (u/(bmaj/2.0))**2 + (v/(bmin/2.0))**2 <= 1.0
+	ys, xs = np.nonzero(inside)
+	ys, xs = ys + y0 - r, xs + x0 - r
+	ok = (ys >= 0) & (ys < rgb.shape[0]) & (xs >= 0) & (xs < rgb.shape[1])
+	rgb[ys[ok], xs[ok]] = (128, 128, 128)
+
+def write_png(outfile, rgb, level=1):
+# rgb is (rows, cols, 3) uint8 with the first row at the top
+	ny, nx = rgb.shape[:2]
+	raw = np.empty((ny, nx*3 + 1), dtype=np.uint8)
+	raw[:, 0] = 0
+	raw[:, 1:] = rgb.reshape(ny, nx*3)
+	def chunk(tag, data):
+		return struct.pack('>I', len(data)) + tag + data + \
+			struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+	png = b'\x89PNG\r\n\x1a\n'
+	png += chunk(b'IHDR', struct.pack('>IIBBBBB', nx, ny, 8, 2, 0, 0, 0))
+	png += chunk(b'IDAT', zlib.compress(raw.tobytes(), level))
+	png += chunk(b'IEND', b'')
+	with open(outfile, 'wb') as f:
+		f.write(png)
+
+def render(img, h=None, f=1, norm='', cmap='', ncut=0, levs=None, beam=True, lut=None):
+# rgb array of img (origin at lower left), the first row of the result is the top
+	vmin, vmax = np.nanmin(img), np.nanmax(img)
+	if norm == '':
+		norm = 'linear %.3f %.3f' % (vmin, vmax)
+	if lut is None:
+		lut = make_lut(cmap, ncut)
+	rgb = colorize(normalize(img, norm, vmin, vmax), lut)
+	if levs is not None:
+		burn_contours(rgb, img, levs)
+	if beam and h is not None:
+		burn_beam(rgb, h, f)
+	return rgb[::-1]
+
+def thumbnail(infile, outfile='', size=256, win=None, norm='', cmap='', ncut=0,
+			  cmul=None, beam=True, lut=None):
+	with fits.open(infile, memmap=True) as hdul:
+		h = hdul[0].header
+		W = word2pix(win, h)
+		img = np.array(hdul[0].data[0, 0, W[2]:W[3], W[0]:W[1]], dtype=np.float32)
+	if cmul == 'auto':
+		from contour import calc_rms
+		cmul = 3 * calc_rms(img)
+	f = max(1, int(np.ceil(max(img.shape) / float(size))))
+	img = block_reduce(img, f)
+	levs = None
+	if cmul is not None:
+		levs = cmul * np.array([-1,1,2,4,8,16,32,64,128,256,512,1024,2048,4096])
+	rgb = render(img, h, f, norm, cmap, ncut, levs, beam, lut)
+	if outfile == '':
+		outfile = (infile[:-5] if infile.lower().endswith('.fits') else infile) + '.png'
+	write_png(outfile, rgb)
+	return outfile
+
+def myhelp():
+	print('Help: thumb.py <input.fits>')
+	print('  or: thumb.py -i <input.fits> -o <thumb.png> -s <256> -n "power 0.5" --colormap gnuplot2 -N 50')
+	print('  or: thumb.py -O <thumbs> -s <128> -c auto <file1.fits> <file2.fits> ...')
+
+def main(argv):
+	infiles = []
+	outfile = ''
+	outdir = ''
+	size = 256
+	win = None
+	norm = ''
+	colormap = ''
+	ncut = 0
+	cmul = None
+	beam = True
+
+	try:
+		opts, args = getopt.getopt(argv, "hi:o:O:s:w:n:N:c:",
+							 ['help', 'infile=', 'outfile=', 'outdir=', 'size=', 'win=',
+		 'norm=', 'ncut=', 'colormap=', 'cmul=', 'nobeam'])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-i', '--infile'):
+			infiles = arg.split()
+		elif opt in ('-o', '--outfile'):
+			outfile = arg
+		elif opt in ('-O', '--outdir'):
+			outdir = arg
+		elif opt in ('-s', '--size'):
+			size = int(arg)
+		elif opt in ('-w', '--win'):
+			win = np.array(arg.split(), dtype=np.float64).tolist()
+		elif opt in ('-n', '--norm'):
+			norm = arg
+		elif opt in ('-N', '--ncut'):
+			ncut = int(arg)
+		elif opt in ('--colormap', ):
+			colormap = arg
+		elif opt in ('-c', '--cmul'):
+			cmul = arg if arg == 'auto' else float(arg)
+		elif opt in ('--nobeam', ):
+			beam = False
+	if len(infiles) == 0:
+		infiles = args
+	if len(infiles) == 0:
+		myhelp()
+		sys.exit(2)
+	if outdir != '' and not os.path.exists(outdir):
+		os.makedirs(outdir)
+	lut = make_lut(colormap, ncut)
+	for infile in infiles:
+		out = outfile
+		if outdir != '':
+			name = os.path.basename(infile)
+			name = name[:-5] if name.lower().endswith('.fits') else name
+			out = os.path.join(outdir, name + '.png')
+		thumbnail(infile, out, size, win, norm, colormap, ncut, cmul, beam, lut)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Nov  1 11:26:39 2026
+
+This program is use to export a very large fits map as a pyramid of PNG tiles
+(XYZ layout, <outdir>/<z>/<x>/<y>.png, 256 x 256 pixels, y from the top),
+with a static viewer page <outdir>/index.html to pan and zoom the map in a
+browser, which loads only the tiles in the view.
+The level z = zmax is the full resolution, and every lower level is the mean
+of 2 x 2 blocks of the level above, down to the level 0 of one tile. The map
+is read from the fits file one row of tiles at a time (lowmem.py), and every
+row is reduced to the lower levels at once, so the map is never in memory as
+a whole, only one row of tiles of every level. The rows are reduced in pairs
+across the strips, an odd last row of a strip waits for the next strip, and
+only the last row of the map is padded. The tiles are colored by the
+normalizations and colormaps of mapplot.py with numpy (thumb.py), and written
+by a pool of processes. The range of the image (for the default linear norm
+and the norms without vmin and vmax) is found by a first pass of the file.
+You can specify the input fits image by -i or --infile,
+	output directory by -o or --outdir,
+	normalize by -n or --norm, the same as mapplot.py,
+	colormap by --colormap and cut of colormap by -N or --ncut,
+	plane of a cube by --plane "chan stokes",
+	number of processes by -j or --nproc
+
+Installation:
+1. copy file
+	chmod a+x tiles.py
+	cp tiles.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	tiles.py <input.fits> <outdir>
+	tiles.py -i <input.fits> -o <outdir> -n 'power 0.5' --colormap gnuplot2 -N 50 -j 8
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import json
+import getopt
+import numpy as np
+
+TILE = 256
+
+viewer = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>%(title)s</title>
+<style>
+html, body {margin: 0; height: 100%%; overflow: hidden; background: #fff;}
+#map {position: absolute; left: 0; top: 0; right: 0; bottom: 0; cursor: grab;}
+#map img {position: absolute; image-rendering: pixelated; user-select: none;}
+#pos {position: absolute; left: 8px; bottom: 8px; padding: 2px 6px; background: #fff;
+	border: 1px solid #888; font: 12px monospace;}
+</style>
+</head>
+<body>
+<div id="map"></div>
+<div id="pos">%(title)s</div>
+<script>
+var M = %(meta)s;
+var map = document.getElementById('map'), pos = document.getElementById('pos');
+// screen pixels of a pixel of the map, and the pixel of the map (y from the top) in the center
+var scale = Math.min(map.clientWidth / M.nx, map.clientHeight / M.ny);
+var cx = M.nx / 2, cy = M.ny / 2;
+var tiles = {};
+function draw() {
+	var z = Math.max(0, Math.min(M.zmax, M.zmax + Math.ceil(Math.log2(scale))));
+	var f = Math.pow(2, M.zmax - z), size = M.tile * f * scale;
+	var W = map.clientWidth, H = map.clientHeight;
+	var x0 = W / 2 - cx * scale, y0 = H / 2 - cy * scale;
+	var n = Math.ceil(M.nx / f / M.tile), m = Math.ceil(M.ny / f / M.tile);
+	var keep = {};
+	for (var ty = Math.max(0, Math.floor(-y0 / size)); ty < Math.min(m, Math.ceil((H - y0) / size)); ty++) {
+		for (var tx = Math.max(0, Math.floor(-x0 / size)); tx < Math.min(n, Math.ceil((W - x0) / size)); tx++) {
+			var key = z + '/' + tx + '/' + ty;
+			if (!(key in tiles)) {
+				tiles[key] = document.createElement('img');
+				tiles[key].src = key + '.png';
+				tiles[key].draggable = false;
+				map.appendChild(tiles[key]);
+			}
+			var s = tiles[key].style;
+			s.left = (x0 + tx * size) + 'px';
+			s.top = (y0 + ty * size) + 'px';
+			s.width = s.height = size + 'px';
+			keep[key] = true;
+		}
+	}
+	for (var key in tiles) {
+		if (!keep[key]) {
+			map.removeChild(tiles[key]);
+			delete tiles[key];
+		}
+	}
+}
+function position(e) {
+// relative R.A. and Dec. (mas) of the mouse
+	var x = cx + (e.clientX - map.clientWidth / 2) / scale;
+	var y = M.ny - (cy + (e.clientY - map.clientHeight / 2) / scale);
+	pos.textContent = M.title + '  ' + (M.dx * (x - M.crpix1)).toFixed(2) + ' ' +
+		(M.dy * (y - M.crpix2)).toFixed(2) + ' mas';
+}
+var drag = null;
+map.onmousedown = function(e) { drag = [e.clientX, e.clientY]; };
+window.onmouseup = function(e) { drag = null; };
+window.onmousemove = function(e) {
+	position(e);
+	if (drag) {
+		cx -= (e.clientX - drag[0]) / scale;
+		cy -= (e.clientY - drag[1]) / scale;
+		drag = [e.clientX, e.clientY];
+		draw();
+	}
+};
+map.onwheel = function(e) {
+	e.preventDefault();
+	var dx = e.clientX - map.clientWidth / 2, dy = e.clientY - map.clientHeight / 2;
+	var px = cx + dx / scale, py = cy + dy / scale;
+	scale *= e.deltaY < 0 ? 1.25 : 0.8;
+	cx = px - dx / scale;
+	cy = py - dy / scale;
+	draw();
+};
+window.onresize = draw;
+draw();
+</script>
+</body>
+</html>
+"""
+
+def init_worker(args):
+	global tile_args
+	tile_args = args
+
+def write_tile(z, tx, ty, data):
+	from thumb import normalize, colorize, write_png
+	outdir, norm, vmin, vmax, lut = tile_args
+	d = os.path.join(outdir, str(z), str(tx))
+	os.makedirs(d, exist_ok=True)
+	with np.errstate(invalid='ignore'):
+		x = normalize(data, norm, vmin, vmax)
+	write_png(os.path.join(d, '%d.png' % ty), colorize(x, lut))
+
+def reduce2(data):
+# mean of 2 x 2 blocks (nan ignored), odd rows and columns are padded with nan
+	ny, nx = data.shape
+	if ny % 2 or nx % 2:
+		pad = np.full((ny + ny % 2, nx + nx % 2), np.nan, dtype=data.dtype)
+		pad[:ny, :nx] = data
+		data = pad
+	data = data.reshape(data.shape[0]//2, 2, data.shape[1]//2, 2)
+	n = np.isfinite(data).sum(axis=(1, 3))
+	s = np.nansum(data, axis=(1, 3))
+	with np.errstate(invalid='ignore', divide='ignore'):
+		return (s / n).astype(np.float32)
+
+class Level:
+# rows of a level not written yet, the first row is the top, and the odd row not
+# reduced to the level below yet
+	def __init__(self, z, nx):
+		self.z = z
+		self.nx = nx
+		self.buf = np.zeros((0, nx), dtype=np.float32)
+		self.carry = np.zeros((0, nx), dtype=np.float32)
+		self.ty = 0
+
+	def tiles(self, rows):
+		n = (self.nx + TILE - 1) // TILE
+		data = np.full((TILE, n*TILE), np.nan, dtype=np.float32)
+		data[:rows.shape[0], :self.nx] = rows
+		jobs = [(self.z, tx, self.ty, data[:, tx*TILE:(tx+1)*TILE]) for tx in range(n)]
+		self.ty += 1
+		return jobs
+
+def push(levels, z, strip):
+# tiles of the strip at the level z and all levels below
+	lv = levels[z]
+	lv.buf = np.vstack([lv.buf, strip])
+	jobs = []
+	while lv.buf.shape[0] >= TILE:
+		jobs += lv.tiles(lv.buf[:TILE])
+		lv.buf = lv.buf[TILE:]
+	if z > 0:
+		rows = np.vstack([lv.carry, strip])
+		n = rows.shape[0] - rows.shape[0] % 2
+		lv.carry = rows[n:]
+		if n > 0:
+			jobs += push(levels, z-1, reduce2(rows[:n]))
+	return jobs
+
+def flush(levels):
+# the odd last rows (padded at the edge of the map) and the last tiles of every level
+	jobs = []
+	for z in range(len(levels)-1, 0, -1):
+		lv = levels[z]
+		if lv.carry.shape[0] > 0:
+			rows, lv.carry = lv.carry, lv.carry[:0]
+			jobs += push(levels, z-1, reduce2(rows))
+	for lv in levels:
+		if lv.buf.shape[0] > 0:
+			jobs += lv.tiles(lv.buf)
+	return jobs
+
+def make_levels(nx, ny):
+# the levels from 0 (one tile) to zmax (full resolution)
+	zmax = max(0, int(np.ceil(np.log2(max(nx, ny) / TILE))))
+	levels = []
+	for z in range(zmax, -1, -1):
+		levels.insert(0, Level(z, nx))
+		nx = (nx + 1) // 2
+	return levels
+
+def export_tiles(infile, outdir, norm='', cmap='', ncut=0, plane=(0, 0), nproc=None):
+	from multiprocessing import Pool
+	from lowmem import Plane, get_budget, minmax
+	from thumb import make_lut
+	p = Plane(infile, plane, get_budget(256))
+	h = p.header
+	ny, nx = p.ny, p.nx
+	levels = make_levels(nx, ny)
+	zmax = len(levels) - 1
+	vmin, vmax = minmax(p)
+	if norm == '':
+		norm = 'linear %.6g %.6g' % (vmin, vmax)
+	print('%s: %d x %d pixels, %d levels, range %.6g %.6g' % (infile, nx, ny, zmax+1, vmin, vmax))
+	os.makedirs(outdir, exist_ok=True)
+	args = (outdir, norm, vmin, vmax, make_lut(cmap, ncut))
+	ntile = 0
+	with Pool(nproc, initializer=init_worker, initargs=(args,)) as pool:
+	# rows of tiles from the top of the map
+		for t in range((ny + TILE - 1) // TILE):
+			y1 = ny - t*TILE
+			y0 = max(y1 - TILE, 0)
+			jobs = push(levels, zmax, p.rows(y0, y1)[::-1])
+			pool.starmap(write_tile, jobs)
+			ntile += len(jobs)
+		jobs = flush(levels)
+		pool.starmap(write_tile, jobs)
+		ntile += len(jobs)
+	title = str(h.get('object', os.path.basename(infile))).strip()
+	meta = {'title': title, 'nx': nx, 'ny': ny, 'tile': TILE, 'zmax': zmax,
+		'crpix1': h['crpix1'], 'crpix2': h['crpix2'],
+		'dx': h['cdelt1']*3.6E6, 'dy': h['cdelt2']*3.6E6, 'norm': norm, 'cmap': cmap}
+	with open(os.path.join(outdir, 'tiles.json'), 'w') as f:
+		json.dump(meta, f, indent=1)
+	with open(os.path.join(outdir, 'index.html'), 'w') as f:
+		f.write(viewer % {'title': title, 'meta': json.dumps(meta)})
+	print('%d tiles in %s' % (ntile, outdir))
+	return ntile
+
+def myhelp():
+	print('Help: tiles.py <input.fits> <outdir>')
+	print("  or: tiles.py -i <input.fits> -o <outdir> -n 'power 0.5' --colormap gnuplot2 -N 50 -j 8")
+
+def main(argv):
+	infile = ''
+	outdir = ''
+	norm = ''
+	colormap = ''
+	ncut = 0
+	plane = (0, 0)
+	nproc = None
+
+	try:
+		opts, args = getopt.getopt(argv, "hi:o:n:N:j:",
+							 ['help', 'infile=', 'outdir=', 'norm=', 'colormap=', 'ncut=',
+		 'plane=', 'nproc='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-i', '--infile'):
+			infile = arg
+		elif opt in ('-o', '--outdir'):
+			outdir = arg
+		elif opt in ('-n', '--norm'):
+			norm = arg
+		elif opt in ('--colormap', ):
+			colormap = arg
+		elif opt in ('-N', '--ncut'):
+			ncut = int(arg)
+		elif opt in ('--plane', ):
+			plane = tuple((list(map(int, arg.split())) + [0])[:2])
+		elif opt in ('-j', '--nproc'):
+			nproc = int(arg)
+	if infile == '' and len(args) >= 1:
+		infile = args[0]
+		if len(args) == 2:
+			outdir = args[1]
+	if infile == '':
+		myhelp()
+		sys.exit(2)
+	if outdir == '':
+		outdir = (infile[:-5] if infile.lower().endswith('.fits') else infile) + '.tiles'
+	export_tiles(infile, outdir, norm, colormap, ncut, plane, nproc)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
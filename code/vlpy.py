@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 16:48:09 2026
+
+This program is one command of all programs of vlpy, e.g.
+	vlpy contour -i cta102.fits -o cta102.pdf -c 1.8e-3
+is the same as
+	contour.py -i cta102.fits -o cta102.pdf -c 1.8e-3
+Only the module of the command is imported, and the modules import astropy,
+matplotlib or skimage only when they are needed, so a table conversion
+(cc2mod, prtan) starts in about 0.1 s.
+You can print the import time of the command by -t or --timing, the time of
+	every package imported (self time of its modules), the total import time
+	and the wall time of the command, e.g. vlpy -t cc2mod cta102.fits
+
+Installation:
+1. copy file
+	chmod a+x vlpy.py
+	cp vlpy.py ~/myapp
+	ln -s ~/myapp/vlpy.py ~/myapp/vlpy
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	vlpy <command> <options of the command>
+	vlpy -t map -i cta102.fits -o cta102.png
+	vlpy help
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import getopt
+
+# command: (module, description)
+COMMANDS = {
+	'contour': ('contour', 'plot contour map'),
+	'map': ('mapplot', 'plot color map'),
+	'pol': ('polplot', 'plot polarization image'),
+	'cc2mod': ('cc2mod', 'AIPS CC table to Difmap mod file'),
+	'cc2tex': ('cc2tex', 'convert AIPS CC table to latex table'),
+	'cc2ann': ('cc2annotation', 'create annotation file of AIPS CC table'),
+	'prtan': ('prtan', 'print AN table in uvfits file'),
+	'dluv': ('dluv', 'download uvfits and images of MOJAVE'),
+	'cube': ('cube', 'plot channel maps and calculate moment maps of a cube'),
+	'panels': ('panels', 'plot a figure of many maps'),
+	'noisemap': ('noisemap', 'calculate the local rms map of an image'),
+	'thumb': ('thumb', 'make color thumbnails'),
+	'gallery': ('gallery', 'make a static HTML gallery of an archive'),
+	'kinematics': ('kinematics', 'fit proper motions of model components'),
+	'ccdb': ('ccdb', 'store model components in a SQLite database'),
+	'lightcurve': ('lightcurve', 'extract light curves of many epochs'),
+	'ridge': ('ridge', 'extract the jet ridge line of many epochs'),
+	'diff': ('diffmap', 'plot difference maps of two images or of many epochs'),
+	'tiles': ('tiles', 'export a huge map as a pyramid of tiles with a viewer'),
+	'polvar': ('polvar', 'calculate polarization variability maps of many epochs'),
+}
+
+def run(command, argv):
+	import importlib
+	importlib.import_module(COMMANDS[command][0]).main(argv)
+
+def import_times(lines):
+# self time of every top package (s) and the other lines of stderr
+	times = {}
+	others = []
+	for line in lines:
+		if not line.startswith('import time:'):
+			others.append(line)
+			continue
+		cols = line[len('import time:'):].split('|')
+		if not cols[0].strip().isdigit():
+			continue
+		package = cols[2].strip().split('.')[0]
+		times[package] = times.get(package, 0.0) + int(cols[0]) / 1.0E6
+	return times, others
+
+def timing(argv, ntop=10):
+# run the command again with python -X importtime
+	import time
+	import subprocess
+	t0 = time.time()
+	p = subprocess.run([sys.executable, '-X', 'importtime', os.path.abspath(__file__)] + argv,
+		stderr=subprocess.PIPE, text=True)
+	wall = time.time() - t0
+	times, others = import_times(p.stderr.splitlines())
+	for line in others:
+		print(line, file=sys.stderr)
+	total = sum(times.values())
+	print('Import time of %s: %.3f s, wall time %.3f s' % (argv[0], total, wall), file=sys.stderr)
+	items = sorted(times.items(), key=lambda item: -item[1])
+	for package, t in items[:ntop]:
+		print('  %-20s %7.3f s' % (package, t), file=sys.stderr)
+	if len(items) > ntop:
+		print('  %-20s %7.3f s' % ('%d others' % (len(items) - ntop),
+			sum([t for package, t in items[ntop:]])), file=sys.stderr)
+	return p.returncode
+
+def myhelp():
+	print('Help: vlpy <command> <options of the command>')
+	print('  or: vlpy -t <command> <options of the command>')
+	print('commands:')
+	for command in COMMANDS:
+		print('  %-12s %s' % (command, COMMANDS[command][1]))
+
+def main(argv):
+	show_time = False
+
+	try:
+		opts, args = getopt.getopt(argv, "ht", ['help', 'timing'])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-t', '--timing'):
+			show_time = True
+	if len(args) > 0 and args[0] == 'help':
+		myhelp()
+		sys.exit(0)
+	if len(args) == 0 or args[0] not in COMMANDS:
+		myhelp()
+		sys.exit(2)
+	if show_time:
+		sys.exit(timing(args))
+	run(args[0], args[1:])
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 10:41:17 2026
+
+This program is the client of vlpyd.py. It sends a job of contour.py,
+mapplot.py (map), polplot.py (pol), cube.py or panels.py to the render service
+and prints the output of the job. The options are the same as the programs.
+The client imports nothing but the standard library, so it starts quickly. If
+the service is not running, the job is run by the client itself.
+You can specify the socket by -s or --socket (before the program),
+	status of the service by status, stop the service by stop
+
+Installation:
+1. copy file
+	chmod a+x vlpyc.py
+	cp vlpyc.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	vlpyc.py contour -i <input.fits> -o <output.pdf> -c 1.8e-3
+	vlpyc.py map -i <input.fits> -o <output.png> -n 'power 0.5'
+	vlpyc.py -s /tmp/vlpyd.sock status
+	vlpyc.py stop
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import json
+import getopt
+import socket
+from vlpyd import TOOLS, socket_path
+
+def request(job, path=''):
+# exit status of the job, None if the service is not running
+	if path == '':
+		path = socket_path()
+	s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		s.connect(path)
+	except (ConnectionRefusedError, FileNotFoundError):
+		s.close()
+		return None
+	with s:
+		s.sendall((json.dumps(job) + '\n').encode())
+		for line in s.makefile('r'):
+			msg = json.loads(line)
+			if 'exit' in msg:
+				return msg['exit']
+			sys.stdout.write(msg['out'])
+			sys.stdout.flush()
+	print('vlpyd closed the connection')
+	return 1
+
+def run_local(tool, argv):
+	import importlib
+	importlib.import_module(TOOLS[tool]).main(argv)
+	return 0
+
+def myhelp():
+	print('Help: vlpyc.py <program> <options of the program>')
+	print('  or: vlpyc.py -s <vlpyd.sock> <status|stop>')
+	print('programs: %s' % ' '.join(sorted(TOOLS)))
+
+def main(argv):
+	path = ''
+
+	try:
+		opts, args = getopt.getopt(argv, "hs:", ['help', 'socket='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-s', '--socket'):
+			path = arg
+	if len(args) == 0 or args[0] not in list(TOOLS) + ['status', 'stop']:
+		myhelp()
+		sys.exit(2)
+	tool = args[0]
+	status = request({'tool': tool, 'argv': args[1:], 'cwd': os.getcwd()}, path)
+	if status is None:
+		if tool in ('status', 'stop'):
+			print('vlpyd is not running')
+			sys.exit(1)
+		status = run_local(tool, args[1:])
+	sys.exit(status)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 10:05:31 2026
+
+This program is a render service of contour.py, mapplot.py, polplot.py,
+cube.py and panels.py. It imports astropy and matplotlib once, and keeps the
+recently used fits files in memory, so a script that plots thousands of maps
+does not pay the start of python and the import of the modules for every map.
+The jobs are sent by vlpyc.py over a unix socket, with the same options as the
+programs, and run one after another in the directory of the client. The output
+of a job (print of the program) is sent back to the client.
+Only files smaller than 1/4 of the cache are kept in memory; a bigger file
+(e.g. a large cube of cube.py) is read from the disk as before. A file changed
+on the disk (size or mtime) is read again. Restart the service after updating
+the programs.
+You can specify the socket by -s or --socket (default $VLPY_SOCKET or
+		~/.cache/vlpy/vlpyd.sock),
+	size of the fits cache by -m or --cache (MB, default 512)
+Stop the service by vlpyc.py stop.
+
+Installation:
+1. copy file
+	chmod a+x vlpyd.py
+	cp vlpyd.py ~/myapp
+2. set envioment parameters
+	Add the following line to ~/.bashrc
+	export PATH=$PATH:/home/usename/myapp
+	source ~/.bashrc
+
+Running like this:
+	vlpyd.py &
+	vlpyd.py -s /tmp/vlpyd.sock -m 2048 &
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import json
+import getopt
+import socket
+import traceback
+from collections import OrderedDict
+
+# name of a job: module of the program
+TOOLS = {'contour': 'contour', 'map': 'mapplot', 'mapplot': 'mapplot', 'pol': 'polplot',
+	'polplot': 'polplot', 'cube': 'cube', 'panels': 'panels'}
+
+def socket_path():
+	d = os.path.join(os.path.expanduser('~'), '.cache', 'vlpy')
+	path = os.environ.get('VLPY_SOCKET', os.path.join(os.environ.get('VLPY_CACHE', d), 'vlpyd.sock'))
+	if not os.path.exists(os.path.dirname(path)):
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+	return path
+
+class WarmFits:
+# fits.open of the service: a copy of the file in memory, read again if changed
+	def __init__(self, fitsopen, maxsize=512):
+		self.fitsopen = fitsopen
+		self.maxsize = maxsize * 1024**2
+		self.size = 0
+		self.files = OrderedDict()
+
+	def open(self, name, mode='readonly', *args, **kw):
+		from astropy.io import fits
+		if mode != 'readonly' or len(args) > 0 or set(kw) - {'memmap'} \
+			or not isinstance(name, (str, os.PathLike)):
+			return self.fitsopen(name, mode, *args, **kw)
+		path = os.path.abspath(name)
+		st = os.stat(path)
+		if st.st_size > self.maxsize / 4:
+			return self.fitsopen(name, mode, *args, **kw)
+		key = (path, st.st_size, st.st_mtime_ns)
+		if key in self.files:
+			self.files.move_to_end(key)
+		else:
+			for old in [k for k in self.files if k[0] == path]:
+				self.drop(old)
+			hdul = self.fitsopen(path, memmap=False, lazy_load_hdus=False)
+			for hdu in hdul:
+				hdu.data
+			hdul.close()
+			self.files[key] = hdul
+			self.size += st.st_size
+			while self.size > self.maxsize:
+				self.drop(next(iter(self.files)))
+	# the programs may change the data in place
+		return fits.HDUList([hdu.copy() for hdu in self.files[key]])
+
+	def drop(self, key):
+		del self.files[key]
+		self.size -= key[1]
+
+class Output:
+# print of a job, sent to the client line by line
+	def __init__(self, conn):
+		self.conn = conn
+
+	def write(self, s):
+		if s != '':
+			self.conn.sendall((json.dumps({'out': s}) + '\n').encode())
+		return len(s)
+
+	def flush(self):
+		pass
+
+def warm_up(maxsize):
+	import matplotlib
+	matplotlib.use('Agg')
+	import importlib
+	import io
+	import matplotlib.pyplot as plt
+	from astropy.io import fits
+	for name in sorted(set(TOOLS.values())) + ['ctrace', 'multisave', 'noisemap']:
+		importlib.import_module(name)
+# fonts and the agg canvas are loaded by the first figure
+	fig, ax = plt.subplots()
+	ax.set_title('vlpyd')
+	fig.savefig(io.BytesIO(), format='png')
+	plt.close(fig)
+	cache = WarmFits(fits.open, maxsize)
+	fits.open = cache.open
+	return cache
+
+def run_job(job, out, cache):
+	import importlib
+	import contextlib
+	import matplotlib.pyplot as plt
+	tool = job.get('tool', '')
+	if tool == 'status':
+		print('vlpyd %d: %d jobs, %d files (%.1f MB) in memory' % (os.getpid(), run_job.njob,
+			len(cache.files), cache.size/1024**2), file=out)
+		return 0
+	if tool not in TOOLS:
+		print('Unknown program: %s (%s)' % (tool, ' '.join(sorted(TOOLS))), file=out)
+		return 2
+	run_job.njob += 1
+	status = 0
+	with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+		try:
+			os.chdir(job.get('cwd', os.getcwd()))
+			importlib.import_module(TOOLS[tool]).main(job.get('argv', []))
+		except SystemExit as e:
+			status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+		except Exception:
+			traceback.print_exc()
+			status = 1
+		finally:
+			plt.close('all')
+	return status
+run_job.njob = 0
+
+def serve(path='', maxsize=512):
+	if path == '':
+		path = socket_path()
+	if os.path.exists(path):
+		try:
+			with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+				s.connect(path)
+			print('vlpyd is already running on %s' % path)
+			sys.exit(1)
+		except (ConnectionRefusedError, FileNotFoundError):
+			os.remove(path)
+	cache = warm_up(maxsize)
+	server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	server.bind(path)
+	os.chmod(path, 0o600)
+	server.listen(16)
+	print('vlpyd %d is ready on %s' % (os.getpid(), path))
+	sys.stdout.flush()
+	try:
+		while True:
+			conn, addr = server.accept()
+			with conn:
+				try:
+					job = json.loads(conn.makefile('r').readline())
+				except ValueError:
+					continue
+				if job.get('tool') == 'stop':
+					conn.sendall((json.dumps({'out': 'vlpyd %d stopped\n' % os.getpid()}) + '\n'
+						+ json.dumps({'exit': 0}) + '\n').encode())
+					break
+				try:
+					status = run_job(job, Output(conn), cache)
+					conn.sendall((json.dumps({'exit': status}) + '\n').encode())
+				except (BrokenPipeError, ConnectionResetError):
+					pass
+	finally:
+		server.close()
+		os.remove(path)
+
+def myhelp():
+	print('Help: vlpyd.py &')
+	print('  or: vlpyd.py -s <vlpyd.sock> -m <512> &')
+
+def main(argv):
+	path = ''
+	maxsize = 512
+
+	try:
+		opts, args = getopt.getopt(argv, "hs:m:", ['help', 'socket=', 'cache='])
+	except getopt.GetoptError:
+		myhelp()
+		sys.exit(2)
+
+	for opt, arg in opts:
+		if opt in ('-h', '--help'):
+			myhelp()
+			sys.exit(0)
+		elif opt in ('-s', '--socket'):
+			path = arg
+		elif opt in ('-m', '--cache'):
+			maxsize = float(arg)
+	serve(path, maxsize)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 29 14:21:07 2026
+
+This module is the watch mode of contour.py, mapplot.py and polplot.py, to
+tune a map without running the program again and again. It is enabled by
+--watch <params.txt> of these programs: the map is plotted once, and then the
+fits files, the annotation file and the parameter file are checked every
+0.3 s. The parameter file has one parameter of the function per line, e.g.
+	win = 8 -4 -9.5 2.5
+	cmul = 1.2e-3
+	norm = power 0.5
+	annotationfile = cta102-note.txt
+	pol = 1.28e-3 1.6e-4 3 0.05      (polplot.py: icut pcut inc scale)
+and overrides the options of the command line. The names are the arguments of
+contour(), mapplot() and polplot(), e.g. cmap and N_cut of mapplot(), cmap and
+ncut of polplot(). Lines starting with # are comments.
+Only the layers of a change are drawn again:
+	annotation file or annotationfile: the annotations
+	norm, cmap, N_cut, ncut: the colors of the image (norm of the drawn image)
+	outfile, dpi: nothing, the figure is saved again
+	others (win, cmul, levs, pol ...) or a fits file: the whole map
+The program stays in memory with the fits files (vlpyd.py), so even the whole
+map is plotted again without the start of python and the reading of files.
+Stop it by Ctrl-C.
+
+Usage:
+	contour.py -i cta102.fits -o cta102.png --watch params.txt
+	mapplot.py -i cta102.fits -o cta102.png -c 1.8e-3 --watch params.txt
+
+@author: Li, Xiaofeng
+Shanghai Astronomical Observatory, Chinese Academy of Sciences
+E-mail: lixf@shao.ac.cn; 1650152531@qq.com
+"""
+
+import os
+import sys
+import time
+import traceback
+import numpy as np
+
+lists = ('win', 'levs', 'bpos', 'figsize')
+ints = ('dpi', 'N_cut', 'ncut', 'inc', 'nproc')
+floats = ('cmul', 'icut', 'pcut', 'scale', 'fraction', 'simplify', 'lowmem')
+# parameters of the layers drawn again
+ANNOTATION = ('annotationfile', )
+COLOR = ('norm', 'cmap', 'N_cut', 'ncut')
+OUTPUT = ('outfile', 'dpi')
+
+def read_params(infile):
+	par = {}
+	if not os.path.exists(infile):
+		return par
+	with open(infile, 'r') as f:
+		for line in f:
+			line = line.strip()
+			if line == '' or line.startswith('#') or '=' not in line:
+				continue
+			key, value = [s.strip() for s in line.split('=', 1)]
+			if key == 'pol':
+				icut, pcut, inc, scale = np.array(value.split(), dtype=np.float64).tolist()
+				par.update({'icut': icut, 'pcut': pcut, 'inc': int(inc), 'scale': scale})
+			elif key in lists or (key == 'snr' and len(value.split()) > 1):
+				par[key] = np.array(value.split(), dtype=np.float64).tolist()
+			elif key in ints:
+				par[key] = int(value)
+			elif key in floats or key == 'snr':
+				par[key] = float(value)
+			elif key == 'plane':
+				par[key] = tuple((list(map(int, value.split())) + [0])[:2])
+			elif key == 'raster':
+				par[key] = value.split()
+			else:
+				par[key] = value
+	return par
+
+def file_state(files):
+	res = {}
+	for f in files:
+		try:
+			st = os.stat(f)
+			res[f] = (st.st_size, st.st_mtime_ns)
+		except OSError:
+			res[f] = None
+	return res
+
+def redraw_annotation(module, ax, infile):
+	for a in ax.get_children():
+		if a.get_gid() == 'annotation':
+			a.remove()
+	module.add_annotation(ax, infile)
+
+def redraw_color(module, ax, kw, vrange):
+# vrange: (vmin, vmax) of the image before the block reduction, as the full render
+	if len(ax.images) == 0 or vrange is None:
+		return
+	im = ax.images[0]
+	cmap = kw['cmap'] if kw['cmap'] != '' else 'rainbow'
+	im.set_cmap(module.cut_cmap(cmap, kw.get('N_cut', kw.get('ncut', 0))))
+	vmin, vmax = vrange
+	norm = kw['norm'] if kw['norm'] != '' else 'linear %.3f %.3f' % (vmin, vmax)
+	im.set_norm(module.get_normalize(norm, vmin, vmax))
+
+def layers(kw, old, changed):
+# layers to draw again of the changed parameters, None for the whole map
+	res = set()
+	for key in changed:
+		if key in ANNOTATION and old[key] != '' and kw[key] != '':
+			res.add('annotation')
+		elif key in COLOR:
+			res.add('color')
+		elif key not in OUTPUT:
+			return None
+	return res
+
+def watch(tool, kw, parfile, interval=0.3):
+	import importlib
+	import matplotlib.pyplot as plt
+	from astropy.io import fits
+	module = importlib.import_module(tool)
+	func = getattr(module, tool)
+	if kw.get('lowmem') == None:
+	# keep the fits files in memory
+		from vlpyd import WarmFits
+		fits.open = WarmFits(fits.open, 1024).open
+	datafiles = [kw[key] for key in ('infile', 'ifile', 'qfile', 'ufile') if key in kw]
+	par = {}
+	state = {}
+	fig, ax, vrange = None, None, None
+	print('Watching %s and %s, Ctrl-C to stop' % (' '.join(datafiles), parfile))
+	while True:
+		new = read_params(parfile)
+		unknown = [key for key in new if key not in kw]
+		for key in unknown:
+			del new[key]
+		args = dict(kw, **new)
+		prev = dict(kw, **par)
+		annfile = args.get('annotationfile', '')
+		st = file_state(datafiles + [parfile] + ([annfile] if annfile != '' else []))
+		if st != state:
+			for key in unknown:
+				print('Unknown parameter of %s(): %s' % (tool, key))
+			if fig is None or any([st[f] != state.get(f) for f in datafiles]):
+				todo = None
+			else:
+				todo = layers(args, prev, [key for key in args if args[key] != prev[key]])
+				if todo is not None and annfile != '' and st[annfile] != state.get(annfile):
+					todo.add('annotation')
+			t = time.time()
+			try:
+				if todo is None:
+					plt.close('all')
+				# mapplot() and polplot() return the range of the image too
+					res = func(**args)
+					fig, ax = res[:2]
+					vrange = res[2] if len(res) > 2 else None
+				else:
+					if 'annotation' in todo:
+						redraw_annotation(module, ax, annfile)
+					if 'color' in todo:
+						redraw_color(module, ax, args, vrange)
+					if args['outfile'] != '':
+						module.savefig(args['outfile'], args['dpi'])
+				print('Plot %s (%s) in %.2f s' % (args['outfile'], 'all' if todo is None else
+					' '.join(sorted(todo)) if len(todo) > 0 else 'save', time.time() - t))
+			except Exception:
+				traceback.print_exc()
+			sys.stdout.flush()
+			par = new
+			state = st
+		try:
+			time.sleep(interval)
+		except KeyboardInterrupt:
+			break
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test of the tiled contours of ctrace.py: a noisy map traced by many processes
+in small tiles and stitched must give the same paths as the serial trace of
+the whole map.
+
+Running like this:
+	python -m pytest tests
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+from ctrace import trace
+
+def noisy_map(n=600, noise=1e-3):
+# two gaussians and noise, with many small contours of the noise at the lowest level
+	y, x = np.mgrid[:n, :n]
+	img = np.exp(-0.5 * ((x - 250)**2 + (y - 300)**2) / 30.0**2)
+	img += 0.3 * np.exp(-0.5 * ((x - 420)**2 + (y - 200)**2) / 15.0**2)
+	img += np.random.default_rng(2).normal(0, noise, (n, n))
+	return img
+
+def summary(paths, nlev):
+# number of paths and vertices of every level, and the vertices (a closed loop may start
+# at another vertex of the tiled trace, and repeats its first vertex at the end)
+	npath = np.zeros(nlev, dtype=int)
+	nvert = np.zeros(nlev, dtype=int)
+	for k, p in paths:
+		npath[k] += 1
+		nvert[k] += len(p)
+	xy = np.concatenate([np.column_stack([np.full(len(p), k), p]) for k, p in paths])
+	return npath, nvert, np.unique(np.round(xy, 6), axis=0)
+
+def test_tiled_equals_serial():
+	img = noisy_map()
+	levs = 3e-3 * np.array([-1, 1, 2, 4, 8, 16, 32, 64, 128, 256])
+	serial = trace(img, levs, nproc=1, tile=4096)
+	tiled = trace(img, levs, nproc=4, tile=64)
+	n1, v1, xy1 = summary(serial, len(levs))
+	n2, v2, xy2 = summary(tiled, len(levs))
+	assert np.sum(n1) > 100
+	assert np.array_equal(n1, n2)
+	assert np.array_equal(v1, v2)
+	assert xy1.shape == xy2.shape
+	assert np.allclose(xy1, xy2, atol=1e-6)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test of the regrid of diffmap.py (also used by polvar.py): a model sampled on
+two grids of different pixel scales and reference pixels is regridded from
+one to the other, and the residual must be at the level of the noise.
+A zero difference, or a window without data, must still be plotted.
+
+Running like this:
+	python -m pytest tests
+"""
+
+import os
+import sys
+import numpy as np
+from astropy.io import fits
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+from diffmap import regrid, plot_diff
+
+def header(n, cdelt, crpix):
+# cdelt in mas, crpix 1-based as in the fits files
+	h = fits.Header()
+	h['naxis1'] = h['naxis2'] = n
+	h['cdelt1'] = -cdelt / 3.6E6
+	h['cdelt2'] = cdelt / 3.6E6
+	h['crpix1'] = crpix[0]
+	h['crpix2'] = crpix[1]
+	return h
+
+def model(h):
+# a gaussian of 1 Jy at (0.3, -0.2) mas, 0.5 mas wide, on the grid of h
+	n = h['naxis1']
+	x = (np.arange(n) + 1 - h['crpix1']) * h['cdelt1'] * 3.6E6
+	y = (np.arange(n) + 1 - h['crpix2']) * h['cdelt2'] * 3.6E6
+	x, y = np.meshgrid(x, y)
+	return np.exp(-0.5 * ((x - 0.3)**2 + (y + 0.2)**2) / 0.5**2)
+
+def test_regrid_pixel_scales():
+	noise = 1e-3
+	h = header(256, 0.1, (129, 129))
+	ht = header(400, 0.05, (201.5, 199))
+	img = model(h) + np.random.default_rng(1).normal(0, noise, (256, 256))
+	res = regrid(img, h, ht) - model(ht)
+	assert np.all(np.isfinite(res))
+	assert np.std(res) < 2*noise
+	assert np.max(np.abs(res)) < 10*noise
+
+def test_regrid_same_grid():
+	h = header(64, 0.1, (33, 33))
+	img = model(h)
+	assert regrid(img, h, h.copy()) is img
+
+def test_plot_zero_difference(tmp_path):
+# the same images, and a window without any pixel of the difference
+	h = header(64, 0.1, (33, 33))
+	h['bmaj'], h['bmin'], h['bpa'] = 1.0/3.6E6, 1.0/3.6E6, 0.0
+	img = model(h)
+	for diff in (np.zeros_like(img), np.full_like(img, np.nan)):
+		outfile = str(tmp_path / 'diff.png')
+		plot_diff(diff, img, h, None, 0.01, outfile, rms=1e-3)
+		assert os.path.exists(outfile)
+		os.remove(outfile)
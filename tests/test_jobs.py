@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test of jobs.py with local processes in place of the nodes: the items of a
+small archive are run by 2 worker processes, including tiles, which starts a
+pool of its own, and every item must be done once.
+
+Running like this:
+	python -m pytest tests
+"""
+
+import os
+import sys
+import pytest
+import numpy as np
+from astropy.io import fits
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+import jobs
+
+def write_map(infile, seed):
+# a gaussian of 1 Jy/beam with noise, 256 x 256 pixels of 0.1 mas
+	n = 256
+	y, x = np.mgrid[:n, :n] - n/2
+	img = np.exp(-0.5 * (x**2 + y**2) / 8.0**2)
+	img += np.random.default_rng(seed).normal(0, 1e-3, (n, n))
+	h = fits.Header()
+	h['ctype1'], h['cdelt1'], h['crpix1'], h['crval1'] = 'RA---SIN', -0.1/3.6E6, n/2 + 1, 0.0
+	h['ctype2'], h['cdelt2'], h['crpix2'], h['crval2'] = 'DEC--SIN', 0.1/3.6E6, n/2 + 1, 0.0
+	h['ctype3'], h['cdelt3'], h['crpix3'], h['crval3'] = 'FREQ', 1.0E6, 1, 15.0E9
+	h['ctype4'], h['cdelt4'], h['crpix4'], h['crval4'] = 'STOKES', 1.0, 1, 1.0
+	h['bmaj'], h['bmin'], h['bpa'] = 1.0/3.6E6, 0.5/3.6E6, -5.0
+	h['object'] = 'TEST'
+	h['date-obs'] = '2020-01-0%d' % (seed + 1)
+	fits.writeto(infile, img.reshape(1, 1, n, n).astype(np.float32), h)
+
+def test_run_local_processes(tmp_path):
+	indir = tmp_path / 'archive'
+	indir.mkdir()
+	for k in range(2):
+		write_map(str(indir / ('e%d.icn.fits' % k)), k)
+	out = str(tmp_path / 'out')
+	jobdirs = [str(tmp_path / 'tiles'), str(tmp_path / 'thumb')]
+	items = jobs.make_manifest(jobdirs[0], str(indir), out, ['tiles'], {'default': '-i {infile} -o {out}'})
+	items += jobs.make_manifest(jobdirs[1], str(indir), out, ['thumb'], jobs.read_sets())
+	assert len(items) == 4
+	for jobdir in jobdirs:
+		jobs.run(jobdir, nproc=2, retry=0)
+		assert os.listdir(os.path.join(jobdir, 'failed')) == []
+		assert len(os.listdir(os.path.join(jobdir, 'done'))) == 2
+		assert os.listdir(os.path.join(jobdir, 'lock')) == []
+	for item in items:
+		if item['tool'] == 'tiles':
+			assert os.path.exists(os.path.join(item['out'], 'index.html'))
+		else:
+			assert os.path.exists(item['out'] + '.png')
+
+def test_make_rejects_incomplete_set(tmp_path):
+	indir = tmp_path / 'archive'
+	indir.mkdir()
+	write_map(str(indir / 'e0.icn.fits'), 0)
+	with pytest.raises(ValueError):
+		jobs.make_manifest(str(tmp_path / 'jobs'), str(indir), str(tmp_path / 'out'), ['map'],
+			jobs.read_sets())
+	items = jobs.make_manifest(str(tmp_path / 'jobs'), str(indir), str(tmp_path / 'out'),
+		['map'], {'deep': '-i {infile} -o {out}.png -c 1e-3'})
+	assert len(items) == 1
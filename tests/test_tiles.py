@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test of the tile pyramid of tiles.py: a tall map pushed strip by strip must
+give every level the rows of the 2 x 2 means of the full map, also at the
+levels where a strip is reduced to a single row.
+
+Running like this:
+	python -m pytest tests
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+from tiles import TILE, make_levels, push, flush, reduce2
+
+def pyramid(img):
+# {z: rows of the level} of the map pushed in strips of TILE rows from the top
+	ny, nx = img.shape
+	levels = make_levels(nx, ny)
+	jobs = []
+	for t in range((ny + TILE - 1) // TILE):
+		jobs += push(levels, len(levels) - 1, img[t*TILE:(t+1)*TILE])
+	jobs += flush(levels)
+	res = {}
+	for z, tx, ty, data in sorted(jobs, key=lambda job: job[:3]):
+		if tx == 0:
+			res.setdefault(z, []).append(data)
+	return levels, {z: np.vstack(res[z]) for z in res}
+
+def test_tall_map_levels():
+	ny, nx = 70000, 8
+	img = np.arange(ny*nx, dtype=np.float32).reshape(ny, nx) / (ny*nx)
+	levels, rows = pyramid(img)
+	zmax = len(levels) - 1
+	ref = img
+	for z in range(zmax, -1, -1):
+		n = ref.shape[0]
+		assert rows[z].shape[0] == (n + TILE - 1) // TILE * TILE
+		assert np.allclose(rows[z][:n, :ref.shape[1]], ref, rtol=1e-5)
+		assert np.all(np.isnan(rows[z][n:]))
+		ref = reduce2(ref)
+	assert rows[0].shape[0] == TILE
+	assert np.sum(np.isfinite(rows[0][:, 0])) == 137